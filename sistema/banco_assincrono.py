@@ -0,0 +1,113 @@
+"""
+Banco Assíncrono - Sistema Arvoredo
+Executa as funções de database.py fora da thread da interface
+
+Uso nas telas (handlers async do Flet):
+    from banco_assincrono import bd
+    vendas = await bd.listar_vendas_pagina(50, chave="vendas")
+
+Cada chamada roda numa thread do executor, que empresta sua própria conexão
+do pool (conexao.py); a interface só espera o resultado. Chamadas com a
+mesma `chave` se substituem: a anterior é descartada se ainda estiver na
+fila, ou tem o resultado ignorado se já estiver rodando, e o `await` dela
+levanta RequisicaoObsoleta. Use `chave` só em leituras.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import database
+
+# Leituras rodam em paralelo (WAL); escritas se serializam no BEGIN IMMEDIATE
+TRABALHADORES = 2
+
+
+class RequisicaoObsoleta(asyncio.CancelledError):
+    """A chamada foi substituída por outra mais nova com a mesma chave"""
+
+
+class ExecutorBanco:
+    """Threads dedicadas ao banco com descarte de requisições obsoletas"""
+
+    def __init__(self, trabalhadores: int = TRABALHADORES):
+        self._executor = ThreadPoolExecutor(trabalhadores, thread_name_prefix="banco")
+        self._trava = threading.Lock()
+        self._ultimas: Dict[str, Future] = {}
+
+    async def executar(
+        self, funcao: Callable, *args, chave: Optional[str] = None, **kwargs
+    ):
+        """Executa `funcao(*args, **kwargs)` no executor e aguarda o resultado"""
+        futuro = self._executor.submit(funcao, *args, **kwargs)
+        if chave is not None:
+            with self._trava:
+                anterior, self._ultimas[chave] = self._ultimas.get(chave), futuro
+            if anterior is not None:
+                anterior.cancel()  # só tem efeito se ainda não começou
+
+        try:
+            resultado = await asyncio.wrap_future(futuro)
+        except asyncio.CancelledError:
+            if futuro.cancelled():
+                raise RequisicaoObsoleta(chave)
+            raise
+        finally:
+            obsoleta = False
+            if chave is not None:
+                with self._trava:
+                    if self._ultimas.get(chave) is futuro:
+                        del self._ultimas[chave]
+                    else:
+                        obsoleta = True
+
+        if obsoleta:
+            raise RequisicaoObsoleta(chave)
+        return resultado
+
+    def encerrar(self):
+        """Descarta a fila e espera as chamadas em andamento"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_executor: Optional[ExecutorBanco] = None
+_executor_trava = threading.Lock()
+
+
+def obter_executor() -> ExecutorBanco:
+    """Retorna o executor global, criando-o na primeira chamada"""
+    global _executor
+    if _executor is None:
+        with _executor_trava:
+            if _executor is None:
+                _executor = ExecutorBanco()
+    return _executor
+
+
+def encerrar():
+    """Encerra o executor global (ex.: ao fechar a aplicação)"""
+    global _executor
+    with _executor_trava:
+        anterior, _executor = _executor, None
+    if anterior is not None:
+        anterior.encerrar()
+
+
+class _Fachada:
+    """`await bd.nome(...)` executa database.nome(...) no executor global"""
+
+    def __getattr__(self, nome: str):
+        funcao = getattr(database, nome)
+        if not callable(funcao):
+            raise AttributeError(nome)
+
+        async def chamada(*args, chave: Optional[str] = None, **kwargs):
+            return await obter_executor().executar(funcao, *args, chave=chave, **kwargs)
+
+        chamada.__name__ = nome
+        chamada.__doc__ = funcao.__doc__
+        return chamada
+
+
+bd = _Fachada()
@@ -0,0 +1 @@
+# Benchmarks - Camada de dados Arvoredo
@@ -0,0 +1,97 @@
+"""
+Benchmark: lista de clientes com N+1 consultas vs. consulta agregada
+
+Uso (a partir da pasta sistema/):
+    python -m benchmarks.bench_clientes [--clientes 5000] [--pedidos 200000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import conexao
+import database
+
+
+def _popular(clientes: int, pedidos: int):
+    """Clientes (1 em 3 de fiado) e pedidos espalhados por um ano"""
+    aleatorio = random.Random(42)
+    with conexao.transacao("clientes", "pedidos") as conn:
+        conn.executemany(
+            "INSERT INTO clientes (nome, fiando, data_criacao) VALUES (?, ?, ?)",
+            (
+                (f"Cliente {i:05d}", int(i % 3 == 0), "2026-01-01 08:00:00")
+                for i in range(clientes)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO pedidos (cliente_id, data_hora, status, total) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    aleatorio.randint(1, clientes),
+                    f"2025-{aleatorio.randint(1, 12):02d}-{aleatorio.randint(1, 28):02d} "
+                    f"{aleatorio.randint(8, 19):02d}:00:00",
+                    "finalizado",
+                    round(aleatorio.uniform(1, 200), 2),
+                )
+                for _ in range(pedidos)
+            ),
+        )
+
+
+def _n_mais_um():
+    """Caminho antigo: a lista de clientes e os pedidos de cada um"""
+    resumo = []
+    for cliente in database.listar_clientes():
+        pedidos = database.listar_pedidos_cliente(cliente["id"])
+        resumo.append(
+            (
+                cliente["id"],
+                len(pedidos),
+                sum(p["total"] for p in pedidos),
+                max((p["data_hora"] for p in pedidos), default=None),
+            )
+        )
+    return resumo
+
+
+def _medir(fn, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        fn()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clientes", type=int, default=5000)
+    parser.add_argument("--pedidos", type=int, default=200_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        conexao.configurar(os.path.join(pasta, "bench.db"))
+        database.inicializar_db()
+        _popular(args.clientes, args.pedidos)
+
+        casos = (
+            ("N+1 (listar_pedidos_cliente)", _n_mais_um),
+            ("listar_clientes_resumo", database.listar_clientes_resumo),
+            ("listar_clientes_resumo fiado", lambda: database.listar_clientes_resumo(True)),
+            ("listar_clientes_resumo 100", lambda: database.listar_clientes_resumo(limite=100)),
+            ("listar_clientes (conta corrente)", database.listar_clientes),
+        )
+        base = None
+        print(f"{'consulta':<34} {'ms':>9} {'ganho':>7}")
+        for nome, fn in casos:
+            ms = _medir(fn, args.repeticoes)
+            base = base or ms
+            print(f"{nome:<34} {ms:>9.2f} {base / ms:>6.1f}x")
+
+        conexao.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: custo por chamada de conexão nova vs. pool de conexões
+
+A comparação usa listar_marcas_produto sem o cache de leitura (só consulta);
+o custo com o cache ligado, em que quase toda chamada é um acerto, é
+medido à parte.
+
+Uso (a partir da pasta sistema/):
+    python -m benchmarks.bench_conexao [--chamadas 2000]
+"""
+
+import argparse
+import inspect
+import os
+import sqlite3
+import tempfile
+import time
+
+import conexao
+import database
+from cache_leitura import estatisticas_cache, limpar_cache
+
+
+def _popular(produtos: int = 50, marcas_por_produto: int = 3):
+    """Cria um catálogo pequeno para as consultas do benchmark"""
+    for i in range(produtos):
+        _, _, produto_id = database.inserir_produto(f"Produto {i}", "Mercado")
+        for j in range(marcas_por_produto):
+            database.inserir_marca_produto(
+                produto_id, f"C{i}-{j}", f"Marca {j}", 1.5 + j, ""
+            )
+
+
+def _por_chamada_sem_pool(caminho: str, produto_id: int):
+    """Reproduz o padrão antigo: connect/close a cada chamada"""
+    conn = sqlite3.connect(caminho)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT pm.id, pm.codigo, pm.marca, pm.preco_unitario, pm.quantidade, pm.data_cadastro, pm.data_validade
+        FROM produto_marcas pm
+        WHERE pm.produto_id = ?
+        ORDER BY pm.marca
+    """,
+        (produto_id,),
+    )
+    marcas = cursor.fetchall()
+    conn.close()
+    return marcas
+
+
+def _medir(fn, chamadas: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(chamadas):
+        fn(i % 50 + 1)
+    return (time.perf_counter() - inicio) / chamadas * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chamadas", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        conexao.configurar(caminho)
+        database.inicializar_db()
+        _popular()
+
+        # Sem os embrulhos de em_cache (e do perfil): toda chamada vai ao banco
+        sem_cache = inspect.unwrap(database.listar_marcas_produto)
+        antes = _medir(lambda pid: _por_chamada_sem_pool(caminho, pid), args.chamadas)
+        depois = _medir(sem_cache, args.chamadas)
+
+        limpar_cache(estatisticas=True)
+        com_cache = _medir(database.listar_marcas_produto, args.chamadas)
+        taxa = estatisticas_cache()["taxa_acerto"]
+        conexao.fechar_conexoes()
+
+    print(f"Chamadas: {args.chamadas} x listar_marcas_produto")
+    print(f"  conexão por chamada: {antes:8.1f} µs/chamada")
+    print(f"  pool de conexões:    {depois:8.1f} µs/chamada")
+    print(f"  ganho:               {antes / depois:8.1f}x")
+    print(f"Cache de leitura (acertos: {taxa:.0%})")
+    print(f"  pool + cache:        {com_cache:8.1f} µs/chamada")
+    print(f"  ganho sobre o pool:  {depois / com_cache:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark: importação de catálogo em lotes por tamanho de lote
+
+Uso (a partir da pasta sistema/):
+    python -m benchmarks.bench_importacao [--linhas 100000]
+"""
+
+import argparse
+import os
+import tempfile
+
+import conexao
+import database
+import importador
+
+TAMANHOS_LOTE = (100, 1000, 5000)
+
+
+def _gerar_csv(caminho: str, linhas: int):
+    """Catálogo sintético: 5 marcas por produto, códigos únicos"""
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write("nome;categoria;codigo;marca;preco;quantidade;validade\n")
+        for i in range(linhas):
+            arquivo.write(
+                f"Produto {i // 5};Mercado;789{i:010d};Marca {i % 5};"
+                f"{i % 100},90;{i % 30};31/12/2030\n"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        catalogo = os.path.join(pasta, "catalogo.csv")
+        _gerar_csv(catalogo, args.linhas)
+
+        print(f"{'lote':>6} {'inserção (s)':>13} {'upsert (s)':>11} {'linhas/s':>10}")
+        for tamanho in TAMANHOS_LOTE:
+            conexao.configurar(os.path.join(pasta, f"bench_{tamanho}.db"))
+            database.inicializar_db()
+            novo = importador.importar(importador.ler_csv(catalogo), tamanho)
+            # Segunda passada: todos os códigos já existem
+            repetido = importador.importar(importador.ler_csv(catalogo), tamanho)
+            print(
+                f"{tamanho:>6} {novo.segundos:>13.2f} {repetido.segundos:>11.2f} "
+                f"{novo.linhas_por_segundo:>10.0f}"
+            )
+
+        conexao.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
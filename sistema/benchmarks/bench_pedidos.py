@@ -0,0 +1,76 @@
+"""
+Benchmark: gravação de pedidos item a item vs. inserir_pedido_completo
+
+Uso (a partir da pasta sistema/):
+    python -m benchmarks.bench_pedidos [--repeticoes 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import conexao
+import database
+
+TAMANHOS_PEDIDO = (1, 10, 100)
+
+
+def _preparar(marcas: int = 100):
+    """Cria um cliente e um catálogo com estoque para os pedidos"""
+    _, _, cliente_id = database.inserir_cliente("Cliente Benchmark")
+    _, _, produto_id = database.inserir_produto("Produto Benchmark", "Mercado")
+    marca_ids = []
+    for i in range(marcas):
+        _, _, marca_id = database.inserir_marca_produto(
+            produto_id, f"B{i}", f"Marca {i}", 2.5, ""
+        )
+        database.atualizar_quantidade_marca(marca_id, 1_000_000)
+        marca_ids.append(marca_id)
+    return cliente_id, marca_ids
+
+
+def _item_a_item(cliente_id: int, itens: list):
+    """Caminho antigo: uma transação para o pedido e uma por item"""
+    _, _, pedido_id = database.inserir_pedido(cliente_id)
+    for item in itens:
+        database.adicionar_item_pedido(
+            pedido_id, item["marca_id"], item["qtd"], item["preco"]
+        )
+
+
+def _medir(fn, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        fn()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        conexao.configurar(os.path.join(pasta, "bench.db"))
+        database.inicializar_db()
+        cliente_id, marca_ids = _preparar(max(TAMANHOS_PEDIDO))
+
+        print(f"{'itens':>6} {'item a item (ms)':>18} {'completo (ms)':>15} {'ganho':>7}")
+        for tamanho in TAMANHOS_PEDIDO:
+            itens = [
+                {"marca_id": marca_id, "qtd": 1, "preco": 2.5}
+                for marca_id in marca_ids[:tamanho]
+            ]
+            antes = _medir(lambda: _item_a_item(cliente_id, itens), args.repeticoes)
+            depois = _medir(
+                lambda: database.inserir_pedido_completo(cliente_id, itens),
+                args.repeticoes,
+            )
+            print(f"{tamanho:>6} {antes:>18.2f} {depois:>15.2f} {antes / depois:>6.1f}x")
+
+        conexao.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
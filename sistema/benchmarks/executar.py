@@ -0,0 +1,409 @@
+"""
+Benchmark: todas as funções públicas de database.py e a carga de cada tela
+
+Uso (a partir da pasta sistema/):
+    python -m benchmarks.executar [--escalas 1k,10k,100k,1M] [--saida resultado.json]
+    python -m benchmarks.executar --saida novo.json --comparar anterior.json
+    python -m benchmarks.executar --memoria   # banco em memória em vez de arquivo
+
+Para cada escala um banco temporário é populado por benchmarks.gerador (mesma
+semente, mesmos dados) e cada caso é medido algumas vezes, dentro de um
+orçamento de tempo. Os resultados saem em JSON (na saída padrão ou em
+--saida) para comparar execuções; as tabelas legíveis vão para stderr. Um caso
+por função pública: funções novas sem caso aparecem em "sem_caso".
+"""
+
+import argparse
+import asyncio
+import inspect
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import banco_assincrono
+import conexao
+import database
+from banco_assincrono import bd
+from benchmarks.gerador import (
+    DATA_FINAL,
+    SEMENTE,
+    gerar,
+    ler_escala,
+    volumes_para_escala,
+)
+from cache_leitura import estatisticas_cache, limpar_cache
+from datas import FORMATO_BR_DATA, agora
+
+ESCALAS = "1k,10k,100k,1M"
+REPETICOES = 5
+TEMPO_MAXIMO = 2.0  # segundos por caso; ao menos uma chamada é sempre medida
+VERSAO_FORMATO = 1
+
+# Mesmos tamanhos usados pelas telas (ui/telas/*.py)
+PAGINA_CLIENTES = 100
+PAGINA_VENDAS = 50
+LIMITE_BUSCA_EDITAR = 50
+LIMITE_BUSCA_PEDIDOS = 10
+TOP_MARCAS = 10
+DIAS_PAINEL = 30
+
+
+class Caso(NamedTuple):
+    """Uma medição: `funcao(*preparar())`; só a chamada de `funcao` é cronometrada"""
+
+    nome: str
+    tipo: str  # "funcao" ou "tela"
+    funcao: Callable
+    preparar: Callable[[], tuple]
+
+
+def _fixo(*args) -> Callable[[], tuple]:
+    return lambda: args
+
+
+def _sem_cache(preparar: Callable[[], tuple]) -> Callable[[], tuple]:
+    """Esvazia o cache de leitura antes de cada chamada (mede a consulta)"""
+
+    def preparar_frio():
+        limpar_cache()
+        return preparar()
+
+    return preparar_frio
+
+
+def _amostra() -> Dict[str, object]:
+    """Ids representativos do banco gerado para os argumentos dos casos"""
+    with conexao.conexao() as conn:
+
+        def valor(sql):
+            return conn.execute(sql).fetchone()[0]
+
+        return {
+            "produto": valor("SELECT id FROM produtos ORDER BY total_marcas DESC, id LIMIT 1"),
+            "produtos": [
+                linha[0]
+                for linha in conn.execute("SELECT id FROM produtos ORDER BY id LIMIT 100")
+            ],
+            "marca": valor(
+                """SELECT produto_marca_id FROM pedido_itens
+                   GROUP BY produto_marca_id ORDER BY COUNT(*) DESC LIMIT 1"""
+            ),
+            "cliente": valor("SELECT id FROM clientes ORDER BY total_pedidos DESC LIMIT 1"),
+            "pedido": valor(
+                """SELECT pedido_id FROM pedido_itens
+                   GROUP BY pedido_id ORDER BY COUNT(*) DESC LIMIT 1"""
+            ),
+            "nome_produto": valor("SELECT nome FROM produtos ORDER BY id LIMIT 1"),
+            "busca": valor("SELECT nome FROM produtos ORDER BY id LIMIT 1").split()[0],
+            "ultima_venda": tuple(
+                conn.execute(
+                    """SELECT pe.data_hora, pi.id FROM pedido_itens pi
+                       JOIN pedidos pe ON pi.pedido_id = pe.id
+                       ORDER BY pe.data_hora DESC, pi.id DESC LIMIT 1 OFFSET ?""",
+                    (PAGINA_VENDAS - 1,),
+                ).fetchone()
+            ),
+            "inicio_painel": (DATA_FINAL - timedelta(days=DIAS_PAINEL)).strftime(
+                FORMATO_BR_DATA
+            ),
+        }
+
+
+def _casos_funcoes(amostra: dict) -> List[Caso]:
+    """Um caso por função pública de database.py: leituras, escritas e manutenção"""
+    contador = itertools.count(1)
+    produto, marca, cliente = amostra["produto"], amostra["marca"], amostra["cliente"]
+    inicio = amostra["inicio_painel"]
+
+    def nova_marca(quantidade: int = 0) -> int:
+        n = next(contador)
+        return database.inserir_marca_produto(
+            produto, f"BENCH{n}", f"Marca {n}", 9.9, "", quantidade
+        )[2]
+
+    def novo_produto() -> int:
+        produto_id = database.inserir_produto(f"Produto Bench {next(contador)}", "Mercado")[2]
+        database.inserir_marca_produto(produto_id, f"BENCH{next(contador)}", "Marca", 1.0)
+        return produto_id
+
+    def itens_pedido():
+        return ([{"marca_id": marca, "qtd": 1, "preco": 9.9}] * 5,)
+
+    casos = [
+        # Leituras
+        ("obter_produto", _fixo(produto)),
+        ("buscar_produto_por_nome", _fixo(amostra["nome_produto"])),
+        ("listar_produtos", _fixo()),
+        ("listar_marcas_produto", _fixo(produto)),
+        ("listar_produtos_marcas", _fixo("Nome", True)),
+        ("listar_marcas_dos_produtos", _fixo(amostra["produtos"])),
+        ("buscar_produtos", _fixo(amostra["busca"], LIMITE_BUSCA_EDITAR)),
+        ("listar_historico_marca", _fixo(marca)),
+        ("listar_clientes", _fixo()),
+        ("listar_clientes_resumo", _fixo(False, "", PAGINA_CLIENTES + 1)),
+        ("obter_cliente", _fixo(cliente)),
+        ("listar_pagamentos_cliente", _fixo(cliente)),
+        ("listar_pedidos_cliente", _fixo(cliente)),
+        ("obter_pedido", _fixo(amostra["pedido"])),
+        ("listar_itens_pedido", _fixo(amostra["pedido"])),
+        ("listar_vendas", _fixo(inicio)),
+        ("listar_vendas_pagina", _fixo(PAGINA_VENDAS, amostra["ultima_venda"])),
+        ("resumo_vendas", _fixo(inicio, "", "dia")),
+        ("marcas_mais_vendidas", _fixo(inicio, "", TOP_MARCAS)),
+        ("vendas_por_categoria", _fixo(inicio)),
+        # Escritas
+        ("inserir_produto", lambda: (f"Produto Bench {next(contador)}", "Mercado")),
+        (
+            "inserir_marca_produto",
+            lambda: (produto, f"BENCH{next(contador)}", "Marca Bench", 9.9, "", 10),
+        ),
+        (
+            "atualizar_produto",
+            lambda: (amostra["produtos"][-1], f"Produto Bench {next(contador)}", "Mercado"),
+        ),
+        ("atualizar_marca", _fixo(marca, 9.9, "")),
+        ("movimentar_estoque", _fixo(marca, 10, "Benchmark")),
+        ("atualizar_quantidade_marca", lambda: (marca, 1000 + next(contador))),
+        ("adicionar_historico", _fixo(marca, database.ENTRADA, 10, "Benchmark")),
+        ("inserir_cliente", lambda: (f"Cliente Bench {next(contador)}",)),
+        ("registrar_pagamento", _fixo(cliente, 1.0)),
+        ("inserir_pedido", _fixo(cliente)),
+        (
+            "adicionar_item_pedido",
+            lambda: (database.inserir_pedido(cliente)[2], marca, 1, 9.9),
+        ),
+        ("inserir_pedido_completo", lambda: (cliente, *itens_pedido())),
+        ("deletar_marca", lambda: (nova_marca(),)),
+        ("deletar_marcas", lambda: ([nova_marca(5) for _ in range(10)],)),
+        ("deletar_produto", lambda: (novo_produto(),)),
+        # Manutenção
+        ("inicializar_db", _fixo()),
+        ("verificar_agregados", _fixo()),
+        ("verificar_estoque", _fixo()),
+        ("verificar_chaves", _fixo()),
+        ("verificar_nomes_produtos", _fixo()),
+        ("verificar_saldos_clientes", _fixo()),
+        ("reindexar_busca", _fixo()),
+        ("reconstruir_resumo_vendas", _fixo()),
+    ]
+    # Funções com cache de leitura também são medidas com o cache vazio
+    casos += [
+        (f"{nome}.sem_cache", _sem_cache(preparar))
+        for nome, preparar in casos
+        if hasattr(getattr(database, nome), "tabelas_cache")
+    ]
+    return [
+        Caso(nome, "funcao", getattr(database, nome.split(".")[0]), preparar)
+        for nome, preparar in casos
+    ]
+
+
+def _casos_telas(amostra: dict, laco: asyncio.AbstractEventLoop) -> List[Caso]:
+    """As consultas que cada tela faz ao abrir, pelo mesmo caminho (bd, fora da thread)"""
+    inicio = amostra["inicio_painel"]
+
+    async def cadastro():
+        await bd.listar_produtos()
+        await bd.listar_produtos_marcas("Marca")
+
+    async def clientes():
+        await bd.listar_clientes_resumo(False, "", PAGINA_CLIENTES + 1, 0)
+
+    async def dashboard():
+        await bd.resumo_vendas(inicio, "", "dia")
+        await bd.marcas_mais_vendidas(inicio, "", TOP_MARCAS)
+        await bd.vendas_por_categoria(inicio, "")
+
+    async def editar():
+        await bd.listar_produtos_marcas("Nome", True)
+
+    async def editar_busca():
+        await bd.buscar_produtos(amostra["busca"], LIMITE_BUSCA_EDITAR, None, True)
+
+    async def pedidos():
+        await bd.listar_clientes()
+        await bd.listar_produtos()
+
+    async def pedidos_busca():
+        await bd.buscar_produtos(amostra["busca"], LIMITE_BUSCA_PEDIDOS)
+
+    async def vendas():
+        await bd.listar_vendas_pagina(PAGINA_VENDAS)
+
+    telas = (cadastro, clientes, dashboard, editar, editar_busca, pedidos, pedidos_busca, vendas)
+    return [
+        Caso(
+            f"tela.{tela.__name__}",
+            "tela",
+            lambda tela=tela: laco.run_until_complete(tela()),
+            _fixo(),
+        )
+        for tela in telas
+    ]
+
+
+def _linhas(resultado) -> Optional[int]:
+    return len(resultado) if isinstance(resultado, list) else None
+
+
+def medir(caso: Caso, repeticoes: int, tempo_maximo: float) -> dict:
+    """Aquece uma vez e mede até `repeticoes` chamadas (ou até o tempo acabar)"""
+    caso.funcao(*caso.preparar())
+    tempos, linhas = [], None
+    limite = time.perf_counter() + tempo_maximo
+    while len(tempos) < repeticoes and (not tempos or time.perf_counter() < limite):
+        args = caso.preparar()
+        inicio = time.perf_counter()
+        resultado = caso.funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        linhas = _linhas(resultado)
+    ordenados = sorted(tempos)
+    return {
+        "nome": caso.nome,
+        "tipo": caso.tipo,
+        "chamadas": len(tempos),
+        "min_ms": round(ordenados[0], 3),
+        "mediana_ms": round(statistics.median(ordenados), 3),
+        "p95_ms": round(ordenados[max(0, round(0.95 * len(ordenados)) - 1)], 3),
+        "max_ms": round(ordenados[-1], 3),
+        "linhas": linhas,
+    }
+
+
+def funcoes_publicas() -> List[str]:
+    """Funções públicas definidas em database.py"""
+    return sorted(
+        nome
+        for nome, objeto in vars(database).items()
+        if not nome.startswith("_")
+        and inspect.isfunction(objeto)
+        and objeto.__module__ == database.__name__
+    )
+
+
+def executar_escala(
+    escala: int, semente: int, repeticoes: int, tempo_maximo: float, memoria: bool
+) -> dict:
+    """Gera o banco da escala e mede todos os casos"""
+    volumes = volumes_para_escala(escala)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = conexao.MEMORIA if memoria else os.path.join(pasta, "bench.db")
+        conexao.configurar(caminho, memoria=False)
+        laco = asyncio.new_event_loop()
+        limpar_cache(estatisticas=True)
+        try:
+            inicio = time.perf_counter()
+            linhas = gerar(volumes, semente)
+            geracao = time.perf_counter() - inicio
+
+            amostra = _amostra()
+            resultados = []
+            for caso in _casos_funcoes(amostra) + _casos_telas(amostra, laco):
+                resultado = medir(caso, repeticoes, tempo_maximo)
+                resultados.append(resultado)
+                print(
+                    f"{escala:>9} {caso.nome:<30} {resultado['mediana_ms']:>10.2f} "
+                    f"{resultado['p95_ms']:>10.2f} {resultado['chamadas']:>4}",
+                    file=sys.stderr,
+                )
+            cache = estatisticas_cache()
+        finally:
+            laco.close()
+            banco_assincrono.encerrar()
+            conexao.fechar_conexoes()
+    return {
+        "escala": escala,
+        "volumes": volumes._asdict(),
+        "linhas": linhas,
+        "geracao_s": round(geracao, 2),
+        "resultados": resultados,
+        "cache": cache,
+    }
+
+
+def comparar(anterior: dict, atual: dict, tolerancia: float = 1.2):
+    """Imprime (em stderr) a razão atual/anterior das medianas dos casos em comum"""
+    medianas = {
+        (escala["escala"], r["nome"]): r["mediana_ms"]
+        for escala in anterior["escalas"]
+        for r in escala["resultados"]
+    }
+    print(
+        f"{'escala':>9} {'caso':<30} {'antes ms':>10} {'agora ms':>10} {'razão':>7}",
+        file=sys.stderr,
+    )
+    for escala in atual["escalas"]:
+        for r in escala["resultados"]:
+            antes = medianas.get((escala["escala"], r["nome"]))
+            if antes is None:
+                continue
+            razao = r["mediana_ms"] / antes if antes else float("inf")
+            alerta = " ⚠️" if razao > tolerancia else (" ✅" if razao < 1 / tolerancia else "")
+            print(
+                f"{escala['escala']:>9} {r['nome']:<30} {antes:>10.2f} "
+                f"{r['mediana_ms']:>10.2f} {razao:>6.2f}x{alerta}",
+                file=sys.stderr,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--escalas", default=ESCALAS, help="ex.: 1k,10k,100k,1M")
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument(
+        "--tempo", type=float, default=TEMPO_MAXIMO, help="segundos por caso"
+    )
+    parser.add_argument(
+        "--memoria", action="store_true", help="banco em memória em vez de arquivo"
+    )
+    parser.add_argument("--saida", help="arquivo JSON (padrão: saída padrão)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    print(
+        f"{'escala':>9} {'caso':<30} {'mediana ms':>10} {'p95 ms':>10} {'n':>4}",
+        file=sys.stderr,
+    )
+    resultado = {
+        "versao": VERSAO_FORMATO,
+        "data_hora": agora(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "semente": args.semente,
+        "banco": "memoria" if args.memoria else "arquivo",
+        "escalas": [
+            executar_escala(
+                ler_escala(escala), args.semente, args.repeticoes, args.tempo, args.memoria
+            )
+            for escala in args.escalas.split(",")
+        ],
+    }
+    cobertas = {r["nome"] for r in resultado["escalas"][0]["resultados"]}
+    resultado["sem_caso"] = [nome for nome in funcoes_publicas() if nome not in cobertas]
+    if resultado["sem_caso"]:
+        print(f"⚠️ Funções sem caso: {', '.join(resultado['sem_caso'])}", file=sys.stderr)
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(json.load(arquivo), resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Gerador de dados sintéticos - Sistema Arvoredo
+Popula um banco vazio com volumes realistas, reproduzíveis pela semente
+
+Uso (a partir da pasta sistema/):
+    python -m benchmarks.gerador --escala 100k [--db arvoredo.db] [--semente 42]
+    python -m benchmarks.gerador --produtos 2000 --marcas 3 --clientes 500 --pedidos 20000
+
+A escala é o número aproximado de itens vendidos (pedido_itens), a maior
+tabela junto com o histórico; os demais volumes saem dela (ver
+volumes_para_escala). Com a mesma semente e os mesmos volumes o banco gerado
+é sempre o mesmo. Triggers mantêm os totais de produtos, a busca, o resumo
+diário de vendas e a conta corrente dos clientes, como no uso normal.
+"""
+
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple
+
+import conexao
+from datas import FORMATO_DATA, FORMATO_DATA_HORA
+from database import inicializar_db
+from texto import normalizar_nome
+
+SEMENTE = 42
+# Fim do período de vendas: fixo, para que o banco não dependa do dia da geração
+DATA_FINAL = datetime(2026, 1, 1)
+DIAS = 365
+HORARIO = (8, 20)  # horário comercial dos pedidos
+PEDIDOS_POR_LOTE = 5000
+
+CATEGORIAS = {
+    "Mercado": (
+        "Arroz", "Feijão", "Açúcar", "Café", "Farinha", "Óleo", "Sabão", "Macarrão",
+    ),
+    "Lancheria": (
+        "Pastel", "Coxinha", "Sanduíche", "Pão de Queijo", "Empada", "Cachorro-Quente",
+    ),
+    "Bebidas": ("Refrigerante", "Suco", "Água", "Cerveja", "Energético", "Chá Gelado"),
+    "Alimentos": ("Biscoito", "Chocolate", "Bolacha", "Salgadinho", "Bala", "Iogurte"),
+}
+MARCAS = (
+    "Tio João", "Camil", "Pilão", "Nestlé", "Coca-Cola", "Ambev", "Sadia",
+    "Seara", "Vigor", "Piracanjuba", "Italac", "Dona Benta", "Renata", "Yoki",
+)
+TAMANHOS = ("200g", "500g", "1kg", "2kg", "5kg", "350ml", "600ml", "1L", "2L", "un")
+NOMES = (
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique",
+    "Isabela", "João", "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael",
+)
+SOBRENOMES = (
+    "Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa",
+    "Ferreira", "Rodrigues", "Almeida", "Nascimento", "Carvalho",
+)
+
+# Fração dos clientes que compra fiado e fração do fiado que já foi paga
+FRACAO_FIADO = 1 / 3
+FRACAO_PAGA = 0.8
+
+
+class Volumes(NamedTuple):
+    """Tamanho do banco gerado"""
+
+    produtos: int
+    marcas_por_produto: int
+    clientes: int
+    pedidos: int
+    itens_por_pedido: float = 4.0  # média; a distribuição tem cauda longa
+
+
+def volumes_para_escala(escala: int) -> Volumes:
+    """Volumes para ~`escala` itens vendidos (1k, 10k, 100k, 1M...)"""
+    marcas_por_produto = 3
+    marcas = max(30, escala // 20)
+    return Volumes(
+        produtos=marcas // marcas_por_produto,
+        marcas_por_produto=marcas_por_produto,
+        clientes=max(10, escala // 100),
+        pedidos=max(1, round(escala / 4.0)),
+    )
+
+
+def ler_escala(texto: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000"""
+    texto = texto.strip()
+    multiplicador = {"k": 1_000, "m": 1_000_000}.get(texto[-1:].lower(), 1)
+    numero = texto[:-1] if multiplicador > 1 else texto
+    return int(float(numero) * multiplicador)
+
+
+def contar_linhas(*tabelas: str) -> Dict[str, int]:
+    """Linhas de cada tabela (todas as tabelas de dados sem argumentos)"""
+    tabelas = tabelas or (
+        "produtos",
+        "produto_marcas",
+        "clientes",
+        "pedidos",
+        "pedido_itens",
+        "historico_movimentacao",
+        "pagamentos",
+        "vendas_diarias",
+    )
+    with conexao.conexao() as conn:
+        return {
+            tabela: conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+            for tabela in tabelas
+        }
+
+
+def _quantidade_itens(aleatorio: random.Random, media: float) -> int:
+    """Itens num pedido: a maioria poucos, alguns pedidos grandes"""
+    return min(60, 1 + round(aleatorio.expovariate(1 / max(media - 1, 0.01))))
+
+
+def gerar(volumes: Volumes, semente: int = SEMENTE) -> Dict[str, int]:
+    """Popula o banco configurado em conexao.py, que deve estar vazio.
+
+    Retorna as linhas de cada tabela ao final.
+    """
+    inicializar_db()
+    if any(contar_linhas("produtos", "clientes", "pedidos").values()):
+        raise ValueError("O banco já tem dados; o gerador só popula bancos vazios")
+
+    aleatorio = random.Random(semente)
+    inicio_periodo = DATA_FINAL - timedelta(days=DIAS)
+    cadastro = (inicio_periodo - timedelta(days=30)).strftime(FORMATO_DATA_HORA)
+
+    # Catálogo: produtos com nome único por categoria e marcas com código EAN
+    produtos, marcas = [], []
+    nomes_usados = set()
+    for produto_id in range(1, volumes.produtos + 1):
+        categoria = aleatorio.choice(list(CATEGORIAS))
+        nome = f"{aleatorio.choice(CATEGORIAS[categoria])} {aleatorio.choice(TAMANHOS)}"
+        if normalizar_nome(nome) in nomes_usados:
+            nome = f"{nome} {produto_id}"
+        nomes_usados.add(normalizar_nome(nome))
+        produtos.append((produto_id, nome, normalizar_nome(nome), categoria, cadastro))
+        for marca in aleatorio.sample(MARCAS, min(volumes.marcas_por_produto, len(MARCAS))):
+            validade = DATA_FINAL + timedelta(days=aleatorio.randint(-30, 720))
+            marcas.append(
+                (
+                    len(marcas) + 1,
+                    produto_id,
+                    f"789{len(marcas) + 1:010d}",
+                    marca,
+                    round(aleatorio.uniform(1.5, 60), 2),
+                    cadastro,
+                    validade.strftime(FORMATO_DATA),
+                )
+            )
+    precos = {marca[0]: marca[4] for marca in marcas}
+
+    clientes = [
+        (
+            cliente_id,
+            f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {cliente_id}",
+            int(aleatorio.random() < FRACAO_FIADO),
+            cadastro,
+        )
+        for cliente_id in range(1, volumes.clientes + 1)
+    ]
+
+    with conexao.transacao("produtos", "produto_marcas", "clientes") as conn:
+        conn.executemany(
+            """INSERT INTO produtos (id, nome, nome_normalizado, categoria, data_criacao)
+               VALUES (?, ?, ?, ?, ?)""",
+            produtos,
+        )
+        conn.executemany(
+            """INSERT INTO produto_marcas (id, produto_id, codigo, marca, preco_unitario, data_cadastro, data_validade)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            marcas,
+        )
+        conn.executemany(
+            "INSERT INTO clientes (id, nome, fiando, data_criacao) VALUES (?, ?, ?, ?)",
+            clientes,
+        )
+
+    # Popularidade com cauda longa: poucas marcas e clientes concentram as vendas
+    marca_ids = list(precos)
+    aleatorio.shuffle(marca_ids)
+    pesos_marcas = list(
+        itertools.accumulate(1 / (i + 1) ** 0.8 for i in range(len(marca_ids)))
+    )
+    cliente_ids = [cliente[0] for cliente in clientes]
+    aleatorio.shuffle(cliente_ids)
+    pesos_clientes = list(
+        itertools.accumulate(1 / (i + 1) ** 0.5 for i in range(len(cliente_ids)))
+    )
+
+    # Pedidos em ordem de data (ids crescem com o tempo, como no uso real)
+    segundos_dia = (HORARIO[1] - HORARIO[0]) * 3600
+    instantes = sorted(
+        aleatorio.randrange(DIAS * segundos_dia) for _ in range(volumes.pedidos)
+    )
+
+    vendidas: Dict[int, int] = {}
+    fiado: Dict[int, float] = {}
+    fiando = {cliente[0]: cliente[2] for cliente in clientes}
+    item_id = 0
+    for inicio_lote in range(0, volumes.pedidos, PEDIDOS_POR_LOTE):
+        pedidos, itens, historico = [], [], []
+        for pedido_id in range(
+            inicio_lote + 1, min(inicio_lote + PEDIDOS_POR_LOTE, volumes.pedidos) + 1
+        ):
+            dia, segundo = divmod(instantes[pedido_id - 1], segundos_dia)
+            data_hora = (
+                inicio_periodo + timedelta(days=dia, hours=HORARIO[0], seconds=segundo)
+            ).strftime(FORMATO_DATA_HORA)
+            cliente_id = aleatorio.choices(cliente_ids, cum_weights=pesos_clientes)[0]
+            quantidade_itens = min(
+                _quantidade_itens(aleatorio, volumes.itens_por_pedido), len(marca_ids)
+            )
+            escolhidas = set()
+            while len(escolhidas) < quantidade_itens:
+                escolhidas.add(aleatorio.choices(marca_ids, cum_weights=pesos_marcas)[0])
+            total = 0.0
+            for marca_id in sorted(escolhidas):
+                quantidade = 1 + int(aleatorio.expovariate(0.7))
+                subtotal = quantidade * precos[marca_id]
+                total += subtotal
+                item_id += 1
+                itens.append(
+                    (item_id, pedido_id, marca_id, quantidade, precos[marca_id], subtotal, "")
+                )
+                historico.append(
+                    (marca_id, "saida", quantidade, data_hora, f"Pedido #{pedido_id}")
+                )
+                vendidas[marca_id] = vendidas.get(marca_id, 0) + quantidade
+            if fiando[cliente_id]:
+                fiado[cliente_id] = fiado.get(cliente_id, 0.0) + total
+            pedidos.append((pedido_id, cliente_id, data_hora, total))
+
+        with conexao.transacao(
+            "pedidos", "pedido_itens", "clientes", "historico_movimentacao"
+        ) as conn:
+            conn.executemany(
+                "INSERT INTO pedidos (id, cliente_id, data_hora, total) VALUES (?, ?, ?, ?)",
+                pedidos,
+            )
+            conn.executemany(
+                """INSERT INTO pedido_itens (id, pedido_id, produto_marca_id, quantidade, preco_unitario, subtotal, observacao)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                itens,
+            )
+            conn.executemany(
+                """INSERT INTO historico_movimentacao (produto_marca_id, tipo, quantidade, data_hora, motivo)
+                   VALUES (?, ?, ?, ?, ?)""",
+                historico,
+            )
+
+    # Estoque inicial = vendido + o que sobrou na prateleira, datado no cadastro;
+    # assim o estoque final bate com o saldo do histórico
+    estoque = {marca_id: aleatorio.randint(0, 200) for marca_id in sorted(precos)}
+    with conexao.transacao("produto_marcas", "produtos", "historico_movimentacao") as conn:
+        conn.executemany(
+            """INSERT INTO historico_movimentacao (produto_marca_id, tipo, quantidade, data_hora, motivo)
+               VALUES (?, 'entrada', ?, ?, 'Estoque inicial')""",
+            (
+                (marca_id, restante + vendidas.get(marca_id, 0), cadastro)
+                for marca_id, restante in estoque.items()
+                if restante + vendidas.get(marca_id, 0)
+            ),
+        )
+        conn.executemany(
+            "UPDATE produto_marcas SET quantidade = ? WHERE id = ?",
+            ((restante, marca_id) for marca_id, restante in estoque.items()),
+        )
+
+    # Pagamentos do fiado: parcelas que quitam parte do que foi comprado
+    pagamentos = []
+    for cliente_id in sorted(fiado):
+        pago = round(fiado[cliente_id] * FRACAO_PAGA * aleatorio.random(), 2)
+        parcelas = aleatorio.randint(1, 6)
+        for parcela in range(parcelas):
+            data_hora = inicio_periodo + timedelta(
+                days=DIAS * (parcela + 1) / (parcelas + 1), hours=aleatorio.randint(0, 10)
+            )
+            pagamentos.append(
+                (
+                    cliente_id,
+                    round(pago / parcelas, 2),
+                    data_hora.strftime(FORMATO_DATA_HORA),
+                )
+            )
+    with conexao.transacao("pagamentos", "clientes") as conn:
+        conn.executemany(
+            """INSERT INTO pagamentos (cliente_id, valor, data_hora, observacao)
+               VALUES (?, ?, ?, '')""",
+            pagamentos,
+        )
+        conn.execute("ANALYZE")
+
+    return contar_linhas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--db", help="arquivo do banco (padrão: $ARVOREDO_DB ou arvoredo.db do sistema)"
+    )
+    parser.add_argument("--escala", type=ler_escala, help="ex.: 1k, 10k, 100k, 1M")
+    parser.add_argument("--produtos", type=int)
+    parser.add_argument("--marcas", type=int, help="marcas por produto")
+    parser.add_argument("--clientes", type=int)
+    parser.add_argument("--pedidos", type=int)
+    parser.add_argument("--itens", type=float, help="média de itens por pedido")
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    args = parser.parse_args()
+
+    volumes = volumes_para_escala(args.escala or 10_000)
+    volumes = volumes._replace(
+        **{
+            campo: valor
+            for campo, valor in (
+                ("produtos", args.produtos),
+                ("marcas_por_produto", args.marcas),
+                ("clientes", args.clientes),
+                ("pedidos", args.pedidos),
+                ("itens_por_pedido", args.itens),
+            )
+            if valor is not None
+        }
+    )
+
+    pool = conexao.configurar(args.db)
+    inicio = time.perf_counter()
+    try:
+        linhas = gerar(volumes, args.semente)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    segundos = time.perf_counter() - inicio
+    for tabela, quantidade in linhas.items():
+        print(f"{tabela:<24} {quantidade:>10}")
+    print(f"✅ {sum(linhas.values())} linhas em {segundos:.2f}s ({pool.caminho})")
+    conexao.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Cache de Leitura - Sistema Arvoredo
+Cache LRU das consultas de catálogo e clientes, invalidado pelas gerações
+
+Cada entrada guarda as gerações (conexao.geracoes) das tabelas que a
+consulta lê; qualquer transação confirmada que altere uma delas renova a
+geração e a entrada deixa de valer. Assim nenhuma leitura devolve dados
+anteriores a uma escrita já confirmada neste processo. Escritas de outros
+processos no mesmo arquivo (ex.: manutencao.py) não são vistas.
+
+    ARVOREDO_CACHE_MB=32    limite de memória estimada (0 desliga o cache)
+"""
+
+import functools
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from conexao import geracoes
+
+LIMITE_BYTES = int(float(os.environ.get("ARVOREDO_CACHE_MB", "32")) * 1024 * 1024)
+
+# Linhas medidas para estimar o tamanho de um resultado (o resto é extrapolado)
+AMOSTRA_TAMANHO = 32
+
+
+def _tamanho(valor) -> int:
+    """Estimativa em bytes de uma lista de linhas (sqlite3.Row, dict ou tupla)"""
+    if not isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor)
+    total = sys.getsizeof(valor)
+    if not valor:
+        return total
+    amostra = valor[:AMOSTRA_TAMANHO]
+    por_linha = sum(
+        sys.getsizeof(linha)
+        + sum(
+            sys.getsizeof(campo)
+            for campo in (linha.values() if isinstance(linha, dict) else linha)
+        )
+        for linha in amostra
+    ) / len(amostra)
+    return total + int(por_linha * len(valor))
+
+
+def _taxa(acertos: int, faltas: int) -> float:
+    return acertos / (acertos + faltas) if acertos + faltas else 0.0
+
+
+class _Entrada:
+    __slots__ = ("geracao", "valor", "tamanho")
+
+    def __init__(self, geracao, valor, tamanho):
+        self.geracao = geracao
+        self.valor = valor
+        self.tamanho = tamanho
+
+
+class CacheLeitura:
+    """LRU com limite de memória; cada entrada vale enquanto suas tabelas não mudam"""
+
+    def __init__(self, limite_bytes: int = LIMITE_BYTES):
+        self.limite_bytes = limite_bytes
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        # nome -> [acertos, faltas, invalidadas]
+        self._contadores: Dict[str, list] = {}
+        self._descartadas = 0
+
+    def _contar(self, nome: str, indice: int):
+        contadores = self._contadores.get(nome)
+        if contadores is None:
+            contadores = self._contadores[nome] = [0, 0, 0]
+        contadores[indice] += 1
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave)
+        self._bytes -= entrada.tamanho
+
+    def obter(
+        self, nome: str, chave: Hashable, tabelas: Tuple[str, ...], carregar: Callable
+    ):
+        """Valor em cache de `chave`, ou `carregar()` guardado com as gerações atuais"""
+        # Geração lida antes da consulta: uma escrita concorrente deixa a
+        # entrada marcada como desatualizada, nunca o contrário
+        geracao = geracoes(*tabelas)
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada.geracao == geracao:
+                self._entradas.move_to_end(chave)
+                self._contar(nome, 0)
+                return entrada.valor
+            self._contar(nome, 1)
+            if entrada is not None:
+                self._contar(nome, 2)
+                self._remover(chave)
+
+        valor = carregar()
+        tamanho = _tamanho(valor)
+        if tamanho > self.limite_bytes:
+            return valor
+        with self._trava:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = _Entrada(geracao, valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                self._remover(next(iter(self._entradas)))
+                self._descartadas += 1
+        return valor
+
+    def limpar(self, estatisticas: bool = False):
+        """Descarta todas as entradas e, com `estatisticas`, zera os contadores"""
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+            if estatisticas:
+                self._contadores.clear()
+                self._descartadas = 0
+
+    def estatisticas(self) -> dict:
+        """Acertos, faltas e taxa de acerto, no total e por função"""
+        with self._trava:
+            por_funcao = {
+                nome: {
+                    "acertos": acertos,
+                    "faltas": faltas,
+                    "invalidadas": invalidadas,
+                    "taxa_acerto": _taxa(acertos, faltas),
+                }
+                for nome, (acertos, faltas, invalidadas) in sorted(
+                    self._contadores.items()
+                )
+            }
+            acertos = sum(f["acertos"] for f in por_funcao.values())
+            faltas = sum(f["faltas"] for f in por_funcao.values())
+            return {
+                "acertos": acertos,
+                "faltas": faltas,
+                "invalidadas": sum(f["invalidadas"] for f in por_funcao.values()),
+                "descartadas": self._descartadas,
+                "taxa_acerto": _taxa(acertos, faltas),
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "limite_bytes": self.limite_bytes,
+                "por_funcao": por_funcao,
+            }
+
+
+_cache = CacheLeitura()
+
+
+def em_cache(*tabelas: str):
+    """Decorador: guarda o resultado da função por argumentos e gerações de `tabelas`.
+
+    Cada chamada recebe uma lista nova (as linhas são compartilhadas, mas
+    sqlite3.Row é imutável). Argumentos não hasheáveis ignoram o cache.
+    """
+
+    def decorador(funcao):
+        nome = funcao.__name__
+
+        @functools.wraps(funcao)
+        def com_cache(*args, **kwargs):
+            if _cache.limite_bytes <= 0:
+                return funcao(*args, **kwargs)
+            chave = (nome, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(chave)
+            except TypeError:
+                return funcao(*args, **kwargs)
+            valor = _cache.obter(
+                nome, chave, tabelas, lambda: tuple(funcao(*args, **kwargs))
+            )
+            return list(valor)
+
+        com_cache.tabelas_cache = tabelas
+        return com_cache
+
+    return decorador
+
+
+def estatisticas_cache() -> dict:
+    """Estatísticas do cache global (ver CacheLeitura.estatisticas)"""
+    return _cache.estatisticas()
+
+
+def limpar_cache(estatisticas: bool = False):
+    """Esvazia o cache global (ver CacheLeitura.limpar)"""
+    _cache.limpar(estatisticas)
@@ -0,0 +1,471 @@
+"""
+Gerenciador de Conexões - Sistema Arvoredo
+Pool de conexões SQLite de longa duração, transações e PRAGMAs
+
+Onde fica o banco (argumento `caminho`, --db nos comandos ou variáveis de
+ambiente, nessa ordem de prioridade):
+
+    ARVOREDO_DB=arvoredo.db          arquivo; o padrão fica na pasta do sistema,
+                                     não na pasta de onde o programa foi aberto
+    ARVOREDO_DB=:memory:             banco em memória compartilhado pelo pool
+    ARVOREDO_DB=:temp:               arquivo temporário, apagado ao fechar
+    ARVOREDO_DB_MEMORIA=1            carrega o arquivo em memória ao abrir e
+                                     grava de volta pela API de backup
+    ARVOREDO_DB_GRAVAR_A_CADA=60     intervalo dessas gravações, em segundos
+"""
+
+import argparse
+import atexit
+import itertools
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eventos import ALTERACAO, Alteracao, publicar
+from perfil import classe_conexao
+
+DB_NAME = "arvoredo.db"
+PASTA_SISTEMA = os.path.dirname(os.path.abspath(__file__))
+MEMORIA = ":memory:"
+TEMPORARIO = ":temp:"
+INTERVALO_GRAVACAO = 60.0  # segundos entre gravações do banco carregado em memória
+
+logger = logging.getLogger(__name__)
+
+# Fonte única dos números de geração: nunca se repetem, nem entre pools
+_sequencia_geracoes = itertools.count(1)
+
+# PRAGMAs aplicados a cada conexão aberta pelo pool
+PRAGMAS_PADRAO: Dict[str, object] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,  # em KiB (~20 MB)
+    "mmap_size": 268435456,  # 256 MB
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+
+def _variavel_ligada(nome: str) -> bool:
+    return os.environ.get(nome, "") not in ("", "0")
+
+
+def caminho_padrao() -> str:
+    """ARVOREDO_DB ou arvoredo.db na pasta do sistema"""
+    return os.environ.get("ARVOREDO_DB") or os.path.join(PASTA_SISTEMA, DB_NAME)
+
+
+class PoolConexoes:
+    """Pool de conexões ciente de threads.
+
+    Cada thread recebe uma conexão exclusiva enquanto estiver usando o banco;
+    chamadas aninhadas na mesma thread reaproveitam a mesma conexão. Ao final
+    do uso a conexão volta para o pool em vez de ser fechada.
+
+    Com `caminho` igual a MEMORIA, ou com `memoria` num arquivo, o banco fica
+    num banco em memória de cache compartilhado que todas as conexões do pool
+    enxergam. Nesse cache o SQLite trava tabelas em vez de esperar pelo
+    busy_timeout, então as threads se revezam: cada empréstimo de conexão
+    segura a trava exclusiva do pool.
+    """
+
+    def __init__(
+        self,
+        caminho: Optional[str] = None,
+        pragmas: Optional[Dict[str, object]] = None,
+        tamanho_max: int = 4,
+        memoria: Optional[bool] = None,
+        intervalo_gravacao: Optional[float] = None,
+    ):
+        caminho = caminho or caminho_padrao()
+        if memoria is None:
+            memoria = _variavel_ligada("ARVOREDO_DB_MEMORIA")
+        if intervalo_gravacao is None:
+            intervalo_gravacao = float(
+                os.environ.get("ARVOREDO_DB_GRAVAR_A_CADA", INTERVALO_GRAVACAO)
+            )
+
+        self._temporario = None
+        if caminho == TEMPORARIO:
+            descritor, caminho = tempfile.mkstemp(prefix="arvoredo_", suffix=".db")
+            os.close(descritor)
+            self._temporario = caminho
+        self.caminho = caminho
+        self.pragmas = dict(PRAGMAS_PADRAO if pragmas is None else pragmas)
+        self.tamanho_max = tamanho_max
+        self._livres: List[sqlite3.Connection] = []
+        self._abertas: List[sqlite3.Connection] = []
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self._fechado = False
+        # Geração por tabela, renovada a cada commit que a altera; um pool
+        # novo (outro banco) começa com gerações diferentes das do anterior
+        self._geracoes: Dict[str, int] = {}
+        self._geracao_inicial = next(_sequencia_geracoes)
+
+        # Banco em memória: a âncora o mantém vivo enquanto o pool existir
+        self.em_memoria = caminho == MEMORIA or memoria
+        self._uri = None
+        self._ancora = None
+        self._exclusiva = threading.Lock()
+        self._commits = self._commits_gravados = 0
+        self._parar_gravacao = threading.Event()
+        self._gravador = None
+        if self.em_memoria:
+            self._uri = f"file:arvoredo_{self._geracao_inicial}?mode=memory&cache=shared"
+            self._ancora = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            if caminho != MEMORIA:
+                self._carregar()
+                if intervalo_gravacao > 0:
+                    self._gravador = threading.Thread(
+                        target=self._gravar_periodicamente,
+                        args=(intervalo_gravacao,),
+                        name="gravacao-banco",
+                        daemon=True,
+                    )
+                    self._gravador.start()
+
+    @property
+    def gravavel(self) -> bool:
+        """Banco carregado em memória a partir de um arquivo, gravado de volta nele"""
+        return self.em_memoria and self.caminho != MEMORIA
+
+    def _carregar(self):
+        """Copia o arquivo (se existir) para o banco em memória"""
+        if not os.path.exists(self.caminho):
+            return
+        inicio = time.perf_counter()
+        disco = sqlite3.connect(self.caminho)
+        try:
+            disco.backup(self._ancora)
+        finally:
+            disco.close()
+        logger.info(
+            "Banco %s carregado em memória em %.2fs",
+            self.caminho,
+            time.perf_counter() - inicio,
+        )
+
+    def gravar(self, forcar: bool = False) -> bool:
+        """Grava o banco em memória no arquivo, se houve commits desde a última vez.
+
+        A cópia roda com a trava exclusiva: é um retrato consistente e nenhuma
+        transação fica pela metade no arquivo. Retorna se houve gravação.
+        """
+        if not self.gravavel:
+            return False
+        with self._exclusiva:
+            commits = self._commits
+            if commits == self._commits_gravados and not forcar:
+                return False
+            inicio = time.perf_counter()
+            disco = sqlite3.connect(self.caminho)
+            try:
+                self._ancora.backup(disco)
+            finally:
+                disco.close()
+            self._commits_gravados = commits
+        logger.info(
+            "Banco em memória gravado em %s em %.2fs",
+            self.caminho,
+            time.perf_counter() - inicio,
+        )
+        return True
+
+    def _gravar_periodicamente(self, intervalo: float):
+        while not self._parar_gravacao.wait(intervalo):
+            try:
+                self.gravar()
+            except sqlite3.Error:
+                logger.exception(
+                    "Falha ao gravar o banco em memória em %s", self.caminho
+                )
+
+    def _nova_conexao(self) -> sqlite3.Connection:
+        """Abre e configura uma conexão nova"""
+        # isolation_level=None: as transações são abertas explicitamente em transacao()
+        conn = sqlite3.connect(
+            self._uri or self.caminho,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=classe_conexao(),
+            uri=self._uri is not None,
+        )
+        conn.row_factory = sqlite3.Row
+        for nome, valor in self.pragmas.items():
+            conn.execute(f"PRAGMA {nome} = {valor}")
+        return conn
+
+    def _adquirir(self) -> sqlite3.Connection:
+        with self._trava:
+            if self._fechado:
+                raise sqlite3.ProgrammingError("Pool de conexões fechado")
+            if self._livres:
+                return self._livres.pop()
+        conn = self._nova_conexao()
+        with self._trava:
+            self._abertas.append(conn)
+        return conn
+
+    def _devolver(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._trava:
+            if not self._fechado and len(self._livres) < self.tamanho_max:
+                self._livres.append(conn)
+                return
+            self._abertas.remove(conn)
+        conn.close()
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão para a thread atual (reentrante)"""
+        local = self._local
+        if getattr(local, "conn", None) is None:
+            if self.em_memoria:
+                self._exclusiva.acquire()
+            try:
+                local.conn = self._adquirir()
+            except BaseException:
+                if self.em_memoria:
+                    self._exclusiva.release()
+                raise
+            local.profundidade = 0
+            local.pendentes = []
+        local.profundidade += 1
+        try:
+            yield local.conn
+        finally:
+            local.profundidade -= 1
+            if local.profundidade == 0:
+                conn, local.conn = local.conn, None
+                pendentes, local.pendentes = local.pendentes, []
+                try:
+                    self._devolver(conn)
+                finally:
+                    if self.em_memoria:
+                        self._exclusiva.release()
+                # Assinantes rodam sem conexão emprestada (podem consultar o banco)
+                publicar(pendentes)
+
+    @contextmanager
+    def transacao(self, *tabelas: str):
+        """Executa o bloco numa transação: commit no sucesso, rollback no erro.
+
+        `tabelas` são as tabelas alteradas pelo bloco; após o commit a geração
+        de cada uma é renovada e as alterações são publicadas em `eventos`
+        assim que a conexão é devolvida ao pool.
+        Se a thread já estiver dentro de uma transação, o bloco participa dela.
+        """
+        local = self._local
+        with self.conexao() as conn:
+            if conn.in_transaction:
+                local.alteradas.update(tabelas)
+                yield conn
+                return
+            local.alteradas = set(tabelas)
+            local.eventos = []
+            conn.execute("BEGIN IMMEDIATE")
+            mudancas = conn.total_changes
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                local.alteradas, local.eventos = set(), []
+                raise
+            conn.commit()
+            self._commits += 1
+            alteradas, local.alteradas = local.alteradas, set()
+            eventos, local.eventos = local.eventos, []
+            if alteradas:
+                self._incrementar_geracoes(alteradas)
+            elif conn.total_changes != mudancas:
+                # Escrita sem tabelas declaradas: qualquer tabela pode ter mudado
+                self._renovar_geracoes()
+
+            # Tabelas sem alteração de linha registrada geram um evento da tabela
+            com_linhas = {evento.tabela for evento in eventos}
+            eventos.extend(
+                Alteracao(tabela, ALTERACAO, None)
+                for tabela in sorted(alteradas - com_linhas)
+            )
+            local.pendentes.extend(eventos)
+
+    def registrar_alteracao(
+        self,
+        tabela: str,
+        acao: str,
+        ids: Iterable[int],
+        campos: Optional[Iterable[str]] = None,
+    ):
+        """Registra linhas alteradas na transação atual da thread"""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is None or not conn.in_transaction:
+            raise sqlite3.ProgrammingError("registrar_alteracao fora de transacao()")
+        local.alteradas.add(tabela)
+        local.eventos.append(
+            Alteracao(tabela, acao, tuple(ids), None if campos is None else tuple(campos))
+        )
+
+    def _incrementar_geracoes(self, tabelas):
+        with self._trava:
+            for tabela in tabelas:
+                self._geracoes[tabela] = next(_sequencia_geracoes)
+
+    def _renovar_geracoes(self):
+        with self._trava:
+            self._geracoes.clear()
+            self._geracao_inicial = next(_sequencia_geracoes)
+
+    def geracoes(self, *tabelas: str) -> Tuple[int, ...]:
+        """Gerações atuais das tabelas (mudam a cada escrita confirmada)"""
+        with self._trava:
+            return tuple(
+                self._geracoes.get(tabela, self._geracao_inicial) for tabela in tabelas
+            )
+
+    def geracao_base(self) -> int:
+        """Geração das tabelas nunca declaradas; muda com escritas sem tabelas declaradas"""
+        with self._trava:
+            return self._geracao_inicial
+
+    def fechar(self):
+        """Fecha todas as conexões abertas pelo pool.
+
+        Um banco carregado em memória é gravado no arquivo uma última vez;
+        um arquivo temporário é apagado.
+        """
+        with self._trava:
+            ja_fechado, self._fechado = self._fechado, True
+            abertas, self._abertas = self._abertas, []
+            self._livres = []
+        if ja_fechado:
+            return
+        if self._gravador is not None:
+            self._parar_gravacao.set()
+            self._gravador.join()
+        self.gravar()
+        for conn in abertas:
+            conn.close()
+        if self._ancora is not None:
+            self._ancora.close()
+        if self._temporario is not None:
+            for sufixo in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self._temporario + sufixo)
+                except FileNotFoundError:
+                    pass
+
+
+_pool: Optional[PoolConexoes] = None
+_pool_trava = threading.Lock()
+
+
+def configurar(
+    caminho: Optional[str] = None,
+    pragmas: Optional[Dict[str, object]] = None,
+    tamanho_max: int = 4,
+    memoria: Optional[bool] = None,
+    intervalo_gravacao: Optional[float] = None,
+) -> PoolConexoes:
+    """(Re)cria o pool global com o banco e os PRAGMAs informados.
+
+    O pool anterior é fechado antes: se ele estava em memória, o arquivo é
+    gravado antes de o novo pool carregá-lo.
+    """
+    global _pool
+    with _pool_trava:
+        anterior, _pool = _pool, None
+        if anterior is not None:
+            anterior.fechar()
+        _pool = PoolConexoes(caminho, pragmas, tamanho_max, memoria, intervalo_gravacao)
+    return _pool
+
+
+def adicionar_argumentos(parser: argparse.ArgumentParser):
+    """Opções --db, --memoria e --gravar-a-cada dos comandos de linha"""
+    grupo = parser.add_argument_group("banco de dados")
+    grupo.add_argument(
+        "--db",
+        help=f"arquivo do banco, {MEMORIA} ou {TEMPORARIO} "
+        f"(padrão: $ARVOREDO_DB ou {DB_NAME} na pasta do sistema)",
+    )
+    grupo.add_argument(
+        "--memoria",
+        action="store_true",
+        default=None,
+        help="carrega o banco em memória e grava de volta periodicamente",
+    )
+    grupo.add_argument(
+        "--gravar-a-cada",
+        type=float,
+        metavar="SEGUNDOS",
+        help="intervalo das gravações com --memoria "
+        f"(padrão: {INTERVALO_GRAVACAO:.0f}; 0 só grava ao fechar)",
+    )
+
+
+def configurar_por_argumentos(args: argparse.Namespace) -> PoolConexoes:
+    """configurar() com as opções de adicionar_argumentos (ou o ambiente)"""
+    return configurar(
+        args.db, memoria=args.memoria, intervalo_gravacao=args.gravar_a_cada
+    )
+
+
+def obter_pool() -> PoolConexoes:
+    """Retorna o pool global, criando-o com a configuração padrão se preciso"""
+    global _pool
+    if _pool is None:
+        with _pool_trava:
+            if _pool is None:
+                _pool = PoolConexoes()
+    return _pool
+
+
+def conexao():
+    """Context manager que empresta uma conexão do pool global"""
+    return obter_pool().conexao()
+
+
+def transacao(*tabelas: str):
+    """Context manager de transação sobre o pool global"""
+    return obter_pool().transacao(*tabelas)
+
+
+def registrar_alteracao(
+    tabela: str, acao: str, ids: Iterable[int], campos: Optional[Iterable[str]] = None
+):
+    """Registra linhas alteradas na transação atual (publicadas após o commit).
+
+    `campos` são as colunas que uma ATUALIZACAO alterou, quando conhecidas.
+    """
+    obter_pool().registrar_alteracao(tabela, acao, ids, campos)
+
+
+def geracoes(*tabelas: str) -> Tuple[int, ...]:
+    """Gerações atuais das tabelas no pool global"""
+    return obter_pool().geracoes(*tabelas)
+
+
+def geracao_base() -> int:
+    """Geração base do pool global (muda também quando o pool é trocado)"""
+    return obter_pool().geracao_base()
+
+
+def fechar_conexoes():
+    """Fecha o pool global (ex.: ao encerrar a aplicação)"""
+    global _pool
+    with _pool_trava:
+        anterior, _pool = _pool, None
+    if anterior is not None:
+        anterior.fechar()
+
+
+# Um banco em memória é gravado e um temporário apagado mesmo sem fechar_conexoes()
+atexit.register(fechar_conexoes)
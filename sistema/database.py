@@ -1,331 +1,831 @@
+import re
 import sqlite3
-from datetime import datetime
-from typing import List, Tuple, Optional
+import sys
+from typing import Dict, Iterable, List, Tuple, Optional
 
-DB_NAME = "arvoredo.db"
-
-
-def get_connection():
-    """Retorna conexão com banco de dados"""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+from cache_leitura import em_cache
+from conexao import conexao, registrar_alteracao, transacao
+from datas import agora, hoje, para_iso
+# Reexportados para as telas assinarem as alterações confirmadas
+from eventos import (
+    ALTERACAO,
+    ATUALIZACAO,
+    INSERCAO,
+    REMOCAO,
+    Alteracao,
+    altera_campos,
+    assinar,
+)
+# Reexportado para as telas resolverem códigos pelo executor (bd.buscar_por_codigo)
+from indice_codigos import buscar_por_codigo
+from migracoes import (
+    SALDO_HISTORICO,
+    aplicar_migracoes,
+    conciliar_historico_estoque,
+    listar_nomes_duplicados,
+    mesclar_nomes_duplicados,
+    recalcular_agregados_produtos,
+    recalcular_saldos_clientes,
+    reconstruir_busca_produtos,
+    reconstruir_vendas_diarias,
+    remover_historico_orfao,
+)
+from perfil import instrumentar_modulo
+from texto import normalizar_nome
 
 
 def inicializar_db():
-    """Inicializa o banco de dados com todas as tabelas"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    """Inicializa o banco de dados aplicando as migrações pendentes"""
+    aplicar_migracoes()
 
-    # Tabela de produtos (agrupados por nome)
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS produtos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            categoria TEXT NOT NULL,
-            quantidade_total INTEGER DEFAULT 0,
-            valor_total REAL DEFAULT 0,
-            data_criacao TEXT
-        )
-    """
-    )
 
-    # Tabela de variações de produtos por marca
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS produto_marcas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            produto_id INTEGER NOT NULL,
-            codigo TEXT UNIQUE,
-            marca TEXT NOT NULL,
-            preco_unitario REAL NOT NULL,
-            quantidade INTEGER DEFAULT 0,
-            data_cadastro TEXT,
-            data_validade TEXT,
-            FOREIGN KEY (produto_id) REFERENCES produtos(id)
-        )
-    """
-    )
-
-    # Tabela de histórico de entrada/saída
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS historico_movimentacao (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            produto_marca_id INTEGER NOT NULL,
-            tipo TEXT NOT NULL,
-            quantidade INTEGER NOT NULL,
-            data_hora TEXT,
-            motivo TEXT,
-            FOREIGN KEY (produto_marca_id) REFERENCES produto_marcas(id)
-        )
-    """
-    )
-
-    # Tabela de clientes
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS clientes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            apelido TEXT,
-            cpf TEXT,
-            fiando INTEGER DEFAULT 0,
-            data_criacao TEXT
-        )
-    """
-    )
+# ===== FUNÇÕES DE PRODUTOS =====
 
-    # Tabela de pedidos
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS pedidos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cliente_id INTEGER NOT NULL,
-            data_hora TEXT,
-            status TEXT DEFAULT 'pendente',
-            total REAL DEFAULT 0,
-            FOREIGN KEY (cliente_id) REFERENCES clientes(id)
-        )
-    """
-    )
+# Colunas de produtos mantidas pelos triggers de produto_marcas (migração 3)
+CAMPOS_TOTAIS_PRODUTO = ("total_marcas", "quantidade_total", "valor_total")
 
-    # Tabela de itens do pedido
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS pedido_itens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pedido_id INTEGER NOT NULL,
-            produto_marca_id INTEGER NOT NULL,
-            quantidade INTEGER NOT NULL,
-            preco_unitario REAL NOT NULL,
-            subtotal REAL NOT NULL,
-            observacao TEXT,
-            FOREIGN KEY (pedido_id) REFERENCES pedidos(id),
-            FOREIGN KEY (produto_marca_id) REFERENCES produto_marcas(id)
-        )
-    """
-    )
 
-    # Migração: Adicionar coluna data_validade se não existir
+def inserir_produto(nome: str, categoria: str) -> Tuple[bool, str, int]:
+    """Insere um novo produto (agrupado por nome)"""
     try:
-        cursor.execute("ALTER TABLE produto_marcas ADD COLUMN data_validade TEXT")
-    except sqlite3.OperationalError:
-        # Coluna já existe, ignora o erro
-        pass
+        with transacao("produtos") as conn:
+            cursor = conn.execute(
+                """INSERT INTO produtos (nome, nome_normalizado, categoria, data_criacao)
+                   VALUES (?, ?, ?, ?)""",
+                (nome, normalizar_nome(nome), categoria, agora()),
+            )
+            registrar_alteracao("produtos", INSERCAO, [cursor.lastrowid])
+        return True, "Produto cadastrado!", cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return False, "Produto já existe!", -1
+    except Exception as e:
+        return False, f"Erro: {str(e)}", -1
 
-    conn.commit()
-    conn.close()
 
+def obter_produto(produto_id: int) -> Optional[dict]:
+    """Obtém dados de um produto específico"""
+    with conexao() as conn:
+        produto = conn.execute(
+            "SELECT * FROM produtos WHERE id = ?", (produto_id,)
+        ).fetchone()
+    return dict(produto) if produto else None
 
-# ===== FUNÇÕES DE PRODUTOS =====
 
+def buscar_produto_por_nome(nome: str) -> Optional[dict]:
+    """Busca um produto pelo nome, ignorando maiúsculas, acentos e espaços extras"""
+    with conexao() as conn:
+        produto = conn.execute(
+            "SELECT * FROM produtos WHERE nome_normalizado = ?",
+            (normalizar_nome(nome),),
+        ).fetchone()
+    return dict(produto) if produto else None
 
-def inserir_produto(nome: str, categoria: str) -> Tuple[bool, str, int]:
-    """Insere um novo produto (agrupado por nome)"""
+
+def atualizar_produto(produto_id: int, nome: str, categoria: str) -> Tuple[bool, str]:
+    """Atualiza nome e categoria de um produto"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO produtos (nome, categoria, data_criacao) VALUES (?, ?, ?)",
-            (nome, categoria, datetime.now().strftime("%d/%m/%Y %H:%M")),
-        )
-        conn.commit()
-        produto_id = cursor.lastrowid
-        conn.close()
-        return True, "Produto cadastrado!", produto_id
+        with transacao("produtos") as conn:
+            conn.execute(
+                """UPDATE produtos SET nome = ?, nome_normalizado = ?, categoria = ?
+                   WHERE id = ?""",
+                (nome, normalizar_nome(nome), categoria, produto_id),
+            )
+            registrar_alteracao(
+                "produtos",
+                ATUALIZACAO,
+                [produto_id],
+                ("nome", "nome_normalizado", "categoria"),
+            )
+        return True, "Produto atualizado!"
+    except sqlite3.IntegrityError:
+        return False, "Já existe um produto com esse nome!"
     except Exception as e:
-        return False, f"Erro: {str(e)}", -1
+        return False, f"Erro: {str(e)}"
 
 
 def inserir_marca_produto(
-    produto_id: int, codigo: str, marca: str, preco: float, data_validade: str = ""
-) -> Tuple[bool, str]:
-    """Insere uma marca específica de um produto"""
+    produto_id: int,
+    codigo: str,
+    marca: str,
+    preco: float,
+    data_validade: str = "",
+    quantidade: int = 0,
+) -> Tuple[bool, str, int]:
+    """Insere uma marca específica de um produto (com a entrada inicial de estoque)"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO produto_marcas (produto_id, codigo, marca, preco_unitario, data_cadastro, data_validade)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (
-                produto_id,
-                codigo,
-                marca,
-                preco,
-                datetime.now().strftime("%d/%m/%Y %H:%M"),
-                data_validade,
-            ),
-        )
-        conn.commit()
-        marca_id = cursor.lastrowid
-        conn.close()
-        return True, "Marca adicionada!", marca_id
-    except sqlite3.IntegrityError:
-        return False, "Código já existe!"
+        with transacao("produto_marcas", "produtos") as conn:
+            cursor = conn.execute(
+                """INSERT INTO produto_marcas (produto_id, codigo, marca, preco_unitario, data_cadastro, data_validade)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    produto_id,
+                    codigo,
+                    marca,
+                    preco,
+                    agora(),
+                    para_iso(data_validade),
+                ),
+            )
+            registrar_alteracao("produto_marcas", INSERCAO, [cursor.lastrowid])
+            registrar_alteracao(
+                "produtos", ATUALIZACAO, [produto_id], CAMPOS_TOTAIS_PRODUTO
+            )
+            if quantidade:
+                _movimentar(conn, [(cursor.lastrowid, quantidade)], "Estoque inicial")
+        return True, "Marca adicionada!", cursor.lastrowid
+    except sqlite3.IntegrityError as e:
+        # Com as chaves estrangeiras ativas nem toda violação é de código repetido
+        if "produto_marcas.codigo" in str(e):
+            return False, "Código já existe!", -1
+        if "FOREIGN KEY" in str(e):
+            return False, "Produto não encontrado!", -1
+        return False, f"Erro: {str(e)}", -1
     except Exception as e:
         return False, f"Erro: {str(e)}", -1
 
 
+@em_cache("produtos", "produto_marcas")
 def listar_produtos() -> List:
     """Lista todos os produtos com quantidade e valor total"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
+    # Totais mantidos por triggers em produto_marcas (migração 3)
+    with conexao() as conn:
+        return conn.execute(
+            """
+            SELECT id, nome, categoria, data_criacao,
+                   total_marcas, quantidade_total, valor_total
+            FROM produtos
+            ORDER BY nome COLLATE NOCASE
         """
-        SELECT p.id, p.nome, p.categoria, p.data_criacao,
-               COUNT(pm.id) as total_marcas,
-               SUM(pm.quantidade) as quantidade_total,
-               SUM(pm.quantidade * pm.preco_unitario) as valor_total
-        FROM produtos p
-        LEFT JOIN produto_marcas pm ON p.id = pm.produto_id
-        GROUP BY p.id
-        ORDER BY p.nome
+        ).fetchall()
+
+
+def verificar_agregados(reparar: bool = False) -> List:
+    """Lista produtos cujos totais divergem das marcas; opcionalmente repara"""
+    with transacao() as conn:
+        divergentes = conn.execute(
+            """
+            SELECT p.id, p.nome,
+                   p.total_marcas, p.quantidade_total, p.valor_total,
+                   COUNT(pm.id) as total_marcas_real,
+                   COALESCE(SUM(pm.quantidade), 0) as quantidade_total_real,
+                   COALESCE(SUM(pm.quantidade * pm.preco_unitario), 0) as valor_total_real
+            FROM produtos p
+            LEFT JOIN produto_marcas pm ON p.id = pm.produto_id
+            GROUP BY p.id
+            HAVING p.total_marcas IS NOT COUNT(pm.id)
+                OR p.quantidade_total IS NOT COALESCE(SUM(pm.quantidade), 0)
+                OR ABS(COALESCE(p.valor_total, 0)
+                       - COALESCE(SUM(pm.quantidade * pm.preco_unitario), 0)) > 0.005
+        """
+        ).fetchall()
+        if reparar and divergentes:
+            recalcular_agregados_produtos(conn)
+            registrar_alteracao(
+                "produtos",
+                ATUALIZACAO,
+                [linha["id"] for linha in divergentes],
+                CAMPOS_TOTAIS_PRODUTO,
+            )
+    return divergentes
+
+
+def verificar_nomes_produtos(reparar: bool = False) -> List:
+    """Lista grupos de produtos com o mesmo nome normalizado.
+
+    Bancos migrados com nomes repetidos ficam sem o índice único até o
+    reparo, que mescla cada grupo no produto mais antigo (as marcas passam
+    para ele) e cria o índice. Retorna os grupos encontrados antes do reparo.
     """
-    )
-    produtos = cursor.fetchall()
-    conn.close()
-    return produtos
+    with transacao() as conn:
+        duplicados = listar_nomes_duplicados(conn)
+        if reparar:
+            removidos, marcas = mesclar_nomes_duplicados(conn)
+            if removidos:
+                registrar_alteracao("produtos", REMOCAO, removidos)
+                registrar_alteracao(
+                    "produtos",
+                    ATUALIZACAO,
+                    [linha["manter"] for linha in duplicados],
+                    CAMPOS_TOTAIS_PRODUTO,
+                )
+                registrar_alteracao("produto_marcas", ATUALIZACAO, marcas, ("produto_id",))
+    return duplicados
 
 
+@em_cache("produto_marcas")
 def listar_marcas_produto(produto_id: int) -> List:
     """Lista todas as marcas de um produto com seu histórico"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
+    with conexao() as conn:
+        return conn.execute(
+            """
+            SELECT pm.id, pm.codigo, pm.marca, pm.preco_unitario, pm.quantidade, pm.data_cadastro, pm.data_validade
+            FROM produto_marcas pm
+            WHERE pm.produto_id = ?
+            ORDER BY pm.marca
+        """,
+            (produto_id,),
+        ).fetchall()
+
+
+# Colunas da tabela do Editar -> expressão SQL de ordenação
+ORDEM_PRODUTOS_MARCAS = {
+    "Nome": "p.nome COLLATE NOCASE",
+    "Marca": "pm.marca COLLATE NOCASE",
+    "Valor": "pm.preco_unitario",
+    "Categoria": "p.categoria COLLATE NOCASE",
+    "Estoque": "pm.quantidade",
+    "Validade": "pm.data_validade",
+    "Data Registro": "pm.data_cadastro",
+}
+
+
+def listar_produtos_marcas(ordem: str = "Nome", crescente: bool = True) -> List:
+    """Lista produto x marca numa única consulta, ordenada pela coluna informada"""
+    expressao = ORDEM_PRODUTOS_MARCAS.get(ordem, ORDEM_PRODUTOS_MARCAS["Nome"])
+    direcao = "ASC" if crescente else "DESC"
+    with conexao() as conn:
+        return conn.execute(
+            f"""
+            SELECT p.id as produto_id, pm.id as marca_id, p.nome, pm.marca,
+                   pm.preco_unitario as valor, p.categoria, pm.quantidade as estoque,
+                   pm.data_validade as validade, pm.data_cadastro as data_registro
+            FROM produto_marcas pm
+            JOIN produtos p ON pm.produto_id = p.id
+            ORDER BY {expressao} {direcao}, pm.marca COLLATE NOCASE, pm.id
         """
-        SELECT pm.id, pm.codigo, pm.marca, pm.preco_unitario, pm.quantidade, pm.data_cadastro, pm.data_validade
-        FROM produto_marcas pm
-        WHERE pm.produto_id = ?
-        ORDER BY pm.marca
-    """,
-        (produto_id,),
+        ).fetchall()
+
+
+# Máximo de parâmetros por consulta (o SQLite antigo aceita até 999)
+LIMITE_VARIAVEIS = 900
+
+
+def _em_lotes(valores, tamanho: int = LIMITE_VARIAVEIS):
+    """Divide a lista em lotes que cabem numa lista IN (...)"""
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamanho):
+        yield valores[inicio : inicio + tamanho]
+
+
+def listar_marcas_dos_produtos(produto_ids) -> List:
+    """Linhas produto x marca (colunas de listar_produtos_marcas) dos produtos"""
+    linhas = []
+    with conexao() as conn:
+        for lote in _em_lotes(produto_ids):
+            linhas.extend(
+                conn.execute(
+                    f"""
+                    SELECT p.id as produto_id, pm.id as marca_id, p.nome, pm.marca,
+                           pm.preco_unitario as valor, p.categoria, pm.quantidade as estoque,
+                           pm.data_validade as validade, pm.data_cadastro as data_registro
+                    FROM produto_marcas pm
+                    JOIN produtos p ON pm.produto_id = p.id
+                    WHERE pm.produto_id IN ({','.join('?' * len(lote))})
+                """,
+                    lote,
+                ).fetchall()
+            )
+    return linhas
+
+
+def _consulta_busca(termo: str) -> str:
+    """Converte o texto digitado numa consulta FTS5: todos os termos, por prefixo"""
+    palavras = re.findall(r"\w+", termo or "")
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar_produtos(
+    termo: str,
+    limite: int = 20,
+    ordem: Optional[str] = None,
+    crescente: bool = True,
+) -> List:
+    """Busca marcas por nome, categoria, marca ou código (prefixo, sem acentos).
+
+    Retorna as `limite` melhores ocorrências com as mesmas colunas de
+    listar_produtos_marcas, ordenadas por relevância ou pela coluna `ordem`.
+    """
+    consulta = _consulta_busca(termo)
+    if not consulta:
+        return []
+    if ordem in ORDEM_PRODUTOS_MARCAS:
+        direcao = "ASC" if crescente else "DESC"
+        ordenacao = f"{ORDEM_PRODUTOS_MARCAS[ordem]} {direcao}, pm.id"
+    else:
+        ordenacao = "b.rank"
+    with conexao() as conn:
+        # A relevância é calculada sobre todas as ocorrências; o FTS5 mantém
+        # só as `limite` melhores durante a ordenação
+        return conn.execute(
+            f"""
+            SELECT p.id as produto_id, pm.id as marca_id, p.nome, pm.marca,
+                   pm.preco_unitario as valor, p.categoria, pm.quantidade as estoque,
+                   pm.data_validade as validade, pm.data_cadastro as data_registro,
+                   pm.codigo
+            FROM (
+                SELECT rowid, rank FROM busca_produtos
+                WHERE busca_produtos MATCH ?
+                ORDER BY rank LIMIT ?
+            ) b
+            JOIN produto_marcas pm ON pm.id = b.rowid
+            JOIN produtos p ON pm.produto_id = p.id
+            ORDER BY {ordenacao}
+        """,
+            (consulta, limite),
+        ).fetchall()
+
+
+def reindexar_busca():
+    """Reconstrói o índice de busca de produtos"""
+    with transacao("busca_produtos") as conn:
+        reconstruir_busca_produtos(conn)
+
+
+def _registrar_marcas_alteradas(
+    marca_ids, produtos, acao: str = ATUALIZACAO, campos: Optional[Tuple[str, ...]] = None
+):
+    """Registra a alteração das marcas e dos totais dos seus produtos"""
+    registrar_alteracao("produto_marcas", acao, marca_ids, campos)
+    registrar_alteracao(
+        "produtos",
+        ATUALIZACAO,
+        sorted({linha["produto_id"] for linha in produtos}),
+        CAMPOS_TOTAIS_PRODUTO,
     )
-    marcas = cursor.fetchall()
-    conn.close()
-    return marcas
 
 
-def atualizar_quantidade_marca(marca_id: int, nova_quantidade: int) -> Tuple[bool, str]:
-    """Atualiza quantidade de uma marca específica"""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE produto_marcas SET quantidade = ? WHERE id = ?",
-            (nova_quantidade, marca_id),
+# ===== MOVIMENTAÇÃO DE ESTOQUE =====
+
+ENTRADA = "entrada"
+SAIDA = "saida"
+
+
+def _movimentar(
+    conn, movimentos: Iterable[Tuple[int, int]], motivo: str, data_hora: str = ""
+) -> List[int]:
+    """Aplica (marca_id, delta) ao estoque e lança cada um no histórico.
+
+    Deve rodar dentro de transacao(): o UPDATE relativo e o histórico são
+    gravados juntos, e escritas concorrentes não se sobrescrevem. Levanta
+    ValueError se a marca não existir. Retorna os ids das marcas movidas.
+    """
+    data_hora = data_hora or agora()
+    marca_ids, produto_ids, historico = [], set(), []
+    for marca_id, delta in movimentos:
+        if not delta:
+            continue
+        linha = conn.execute(
+            """UPDATE produto_marcas SET quantidade = quantidade + ?
+               WHERE id = ? RETURNING produto_id""",
+            (delta, marca_id),
+        ).fetchone()
+        if linha is None:
+            raise ValueError("Marca não encontrada!")
+        historico.append(
+            conn.execute(
+                """INSERT INTO historico_movimentacao (produto_marca_id, tipo, quantidade, data_hora, motivo)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (marca_id, ENTRADA if delta > 0 else SAIDA, abs(delta), data_hora, motivo),
+            ).lastrowid
+        )
+        marca_ids.append(marca_id)
+        produto_ids.add(linha["produto_id"])
+
+    if historico:
+        registrar_alteracao("historico_movimentacao", INSERCAO, historico)
+        registrar_alteracao(
+            "produto_marcas", ATUALIZACAO, list(dict.fromkeys(marca_ids)), ("quantidade",)
         )
-        conn.commit()
-        conn.close()
+        registrar_alteracao(
+            "produtos", ATUALIZACAO, sorted(produto_ids), CAMPOS_TOTAIS_PRODUTO
+        )
+    return marca_ids
+
+
+def movimentar_estoque(marca_id: int, delta: int, motivo: str = "") -> Tuple[bool, str]:
+    """Soma `delta` (positivo entra, negativo sai) ao estoque da marca"""
+    if not delta:
+        return False, "Quantidade da movimentação deve ser diferente de zero!"
+    try:
+        with transacao("historico_movimentacao", "produto_marcas", "produtos") as conn:
+            _movimentar(conn, [(marca_id, delta)], motivo)
+        return True, "Estoque atualizado!"
+    except ValueError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"Erro: {str(e)}"
+
+
+def atualizar_quantidade_marca(
+    marca_id: int, nova_quantidade: int, motivo: str = "Ajuste de estoque"
+) -> Tuple[bool, str]:
+    """Ajusta a quantidade de uma marca para um valor absoluto (contagem).
+
+    A diferença para o estoque atual é lida e lançada na mesma transação.
+    Quando a tela conhece a quantidade exibida, prefira movimentar_estoque
+    com a diferença digitada: vendas feitas nesse meio tempo não se perdem.
+    """
+    try:
+        with transacao("historico_movimentacao", "produto_marcas", "produtos") as conn:
+            linha = conn.execute(
+                "SELECT quantidade FROM produto_marcas WHERE id = ?", (marca_id,)
+            ).fetchone()
+            if linha is None:
+                return False, "Marca não encontrada!"
+            _movimentar(conn, [(marca_id, nova_quantidade - linha["quantidade"])], motivo)
         return True, "Quantidade atualizada!"
     except Exception as e:
         return False, f"Erro: {str(e)}"
 
 
-def adicionar_historico(
-    marca_id: int, tipo: str, quantidade: int, motivo: str = ""
+def verificar_estoque(reparar: bool = False) -> List:
+    """Lista marcas cujo estoque diverge do saldo do histórico.
+
+    Com `reparar` a diferença é lançada no histórico como conciliação
+    (o estoque atual é tomado como a contagem correta).
+    """
+    with transacao() as conn:
+        divergentes = conn.execute(
+            f"""
+            SELECT * FROM (
+                SELECT pm.id, pm.produto_id, pm.marca, pm.quantidade,
+                       {SALDO_HISTORICO} as quantidade_historico
+                FROM produto_marcas pm
+            )
+            WHERE quantidade != quantidade_historico
+        """
+        ).fetchall()
+        if reparar and divergentes:
+            historico = conciliar_historico_estoque(conn, "Conciliação de estoque", agora())
+            registrar_alteracao("historico_movimentacao", INSERCAO, historico)
+    return divergentes
+
+
+def verificar_chaves(reparar: bool = False) -> List:
+    """Lista linhas que violam chaves estrangeiras (PRAGMA foreign_key_check).
+
+    Com `reparar` remove o histórico de marcas que não existem mais; as
+    demais violações (vendas e marcas órfãs) só são listadas, para revisão.
+    Retorna as violações encontradas antes do reparo.
+    """
+    with transacao() as conn:
+        violacoes = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if reparar and any(
+            linha["table"] == "historico_movimentacao" for linha in violacoes
+        ):
+            removidas = remover_historico_orfao(conn)
+            registrar_alteracao("historico_movimentacao", REMOCAO, removidas)
+    return violacoes
+
+
+def atualizar_marca(
+    marca_id: int,
+    preco: float,
+    data_validade: str,
+    delta_estoque: int = 0,
+    motivo: str = "Ajuste manual",
 ) -> Tuple[bool, str]:
-    """Registra entrada/saída no histórico"""
+    """Atualiza preço e validade de uma marca específica.
+
+    Um `delta_estoque` diferente de zero é lançado no estoque (como em
+    movimentar_estoque) na mesma transação: ou tudo é gravado, ou nada.
+    """
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO historico_movimentacao (produto_marca_id, tipo, quantidade, data_hora, motivo)
-               VALUES (?, ?, ?, ?, ?)""",
-            (
-                marca_id,
-                tipo,
-                quantidade,
-                datetime.now().strftime("%d/%m/%Y %H:%M"),
-                motivo,
-            ),
-        )
-        conn.commit()
-        conn.close()
-        return True, "Histórico registrado!"
+        # Validada antes de abrir a transação: data inválida não grava nada
+        validade = para_iso(data_validade)
+        with transacao("historico_movimentacao", "produto_marcas", "produtos") as conn:
+            produtos = conn.execute(
+                """UPDATE produto_marcas SET preco_unitario = ?, data_validade = ?
+                   WHERE id = ? RETURNING produto_id""",
+                (preco, validade, marca_id),
+            ).fetchall()
+            if not produtos:
+                raise ValueError("Marca não encontrada!")
+            _registrar_marcas_alteradas(
+                [marca_id], produtos, campos=("preco_unitario", "data_validade")
+            )
+            _movimentar(conn, [(marca_id, delta_estoque)], motivo)
+        return True, "Marca atualizada!"
+    except ValueError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Erro: {str(e)}"
 
 
+def deletar_marca(marca_id: int) -> Tuple[bool, str]:
+    """Deleta uma marca específica e seu histórico"""
+    try:
+        with transacao("historico_movimentacao", "produto_marcas", "produtos") as conn:
+            conn.execute(
+                "DELETE FROM historico_movimentacao WHERE produto_marca_id = ?",
+                (marca_id,),
+            )
+            produtos = conn.execute(
+                "DELETE FROM produto_marcas WHERE id = ? RETURNING produto_id",
+                (marca_id,),
+            ).fetchall()
+            _registrar_marcas_alteradas([marca_id], produtos, REMOCAO)
+        return True, "Marca deletada!"
+    except sqlite3.IntegrityError:
+        return False, "Marca possui vendas registradas!"
+    except Exception as e:
+        return False, f"Erro: {str(e)}"
+
+
+def deletar_marcas(
+    marca_ids: Iterable[int], remover_vendas: bool = False
+) -> Dict[int, Tuple[bool, str]]:
+    """Deleta várias marcas e seus históricos numa única transação.
+
+    Marcas com vendas só são deletadas com `remover_vendas`; nesse caso os
+    itens de pedido delas também são removidos e os totais dos pedidos
+    recalculados. Retorna (sucesso, mensagem) para cada id.
+    """
+    ids = list(dict.fromkeys(marca_ids))
+    resultados: Dict[int, Tuple[bool, str]] = {}
+    tabelas = ["historico_movimentacao", "produto_marcas", "produtos"]
+    if remover_vendas:
+        tabelas += ["pedido_itens", "pedidos", "clientes"]
+    try:
+        with transacao(*tabelas) as conn:
+            existentes, com_vendas = set(), set()
+            for lote in _em_lotes(ids):
+                marcadores = ",".join("?" * len(lote))
+                existentes.update(
+                    linha["id"]
+                    for linha in conn.execute(
+                        f"SELECT id FROM produto_marcas WHERE id IN ({marcadores})",
+                        lote,
+                    )
+                )
+                com_vendas.update(
+                    linha["produto_marca_id"]
+                    for linha in conn.execute(
+                        f"""SELECT DISTINCT produto_marca_id FROM pedido_itens
+                            WHERE produto_marca_id IN ({marcadores})""",
+                        lote,
+                    )
+                )
+
+            for marca_id in ids:
+                if marca_id not in existentes:
+                    resultados[marca_id] = (False, "Marca não encontrada!")
+                elif marca_id in com_vendas and not remover_vendas:
+                    resultados[marca_id] = (False, "Marca possui vendas registradas!")
+            apagar = [marca_id for marca_id in ids if marca_id not in resultados]
+
+            itens, pedidos, produtos = [], set(), []
+            for lote in _em_lotes(apagar):
+                marcadores = ",".join("?" * len(lote))
+                if remover_vendas:
+                    for linha in conn.execute(
+                        f"""DELETE FROM pedido_itens WHERE produto_marca_id IN ({marcadores})
+                            RETURNING id, pedido_id""",
+                        lote,
+                    ).fetchall():
+                        itens.append(linha["id"])
+                        pedidos.add(linha["pedido_id"])
+                conn.execute(
+                    f"DELETE FROM historico_movimentacao WHERE produto_marca_id IN ({marcadores})",
+                    lote,
+                )
+                produtos.extend(
+                    conn.execute(
+                        f"DELETE FROM produto_marcas WHERE id IN ({marcadores}) RETURNING produto_id",
+                        lote,
+                    ).fetchall()
+                )
+
+            clientes = set()
+            for lote in _em_lotes(sorted(pedidos)):
+                clientes.update(
+                    linha["cliente_id"]
+                    for linha in conn.execute(
+                        f"""UPDATE pedidos SET total = COALESCE(
+                                (SELECT SUM(subtotal) FROM pedido_itens WHERE pedido_id = pedidos.id), 0)
+                            WHERE id IN ({','.join('?' * len(lote))})
+                            RETURNING cliente_id""",
+                        lote,
+                    ).fetchall()
+                )
+
+            if itens:
+                registrar_alteracao("pedido_itens", REMOCAO, itens)
+                registrar_alteracao("pedidos", ATUALIZACAO, sorted(pedidos))
+                registrar_alteracao(
+                    "clientes", ATUALIZACAO, sorted(clientes), CAMPOS_SALDO_CLIENTE
+                )
+            if apagar:
+                _registrar_marcas_alteradas(apagar, produtos, REMOCAO)
+    except Exception as e:
+        return {marca_id: (False, f"Erro: {str(e)}") for marca_id in ids}
+
+    for marca_id in apagar:
+        resultados[marca_id] = (True, "Marca deletada!")
+    return {marca_id: resultados[marca_id] for marca_id in ids}
+
+
+def adicionar_historico(
+    marca_id: int, tipo: str, quantidade: int, motivo: str = ""
+) -> Tuple[bool, str]:
+    """Registra entrada/saída no histórico e aplica-a ao estoque"""
+    if tipo not in (ENTRADA, SAIDA):
+        return False, "Tipo deve ser entrada ou saida!"
+    delta = abs(quantidade) if tipo == ENTRADA else -abs(quantidade)
+    sucesso, msg = movimentar_estoque(marca_id, delta, motivo)
+    return sucesso, "Histórico registrado!" if sucesso else msg
+
+
 def listar_historico_marca(marca_id: int) -> List:
     """Lista histórico de movimentação de uma marca"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """SELECT * FROM historico_movimentacao WHERE produto_marca_id = ? ORDER BY data_hora DESC""",
-        (marca_id,),
-    )
-    historico = cursor.fetchall()
-    conn.close()
-    return historico
+    with conexao() as conn:
+        return conn.execute(
+            """SELECT * FROM historico_movimentacao WHERE produto_marca_id = ? ORDER BY data_hora DESC""",
+            (marca_id,),
+        ).fetchall()
 
 
 # ===== FUNÇÕES DE CLIENTES =====
 
+# Conta corrente mantida pelos triggers de pedidos e pagamentos (migração 8)
+CAMPOS_SALDO_CLIENTE = (
+    "total_pedidos",
+    "total_comprado",
+    "total_pago",
+    "saldo_aberto",
+    "ultima_compra",
+)
+
 
 def inserir_cliente(
     nome: str, apelido: str = "", cpf: str = "", fiando: bool = False
 ) -> Tuple[bool, str, int]:
     """Insere um novo cliente"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO clientes (nome, apelido, cpf, fiando, data_criacao)
-               VALUES (?, ?, ?, ?, ?)""",
-            (
-                nome,
-                apelido,
-                cpf,
-                1 if fiando else 0,
-                datetime.now().strftime("%d/%m/%Y"),
-            ),
-        )
-        conn.commit()
-        cliente_id = cursor.lastrowid
-        conn.close()
-        return True, "Cliente cadastrado!", cliente_id
+        with transacao("clientes") as conn:
+            cursor = conn.execute(
+                """INSERT INTO clientes (nome, apelido, cpf, fiando, data_criacao)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (
+                    nome,
+                    apelido,
+                    cpf,
+                    1 if fiando else 0,
+                    hoje(),
+                ),
+            )
+            registrar_alteracao("clientes", INSERCAO, [cursor.lastrowid])
+        return True, "Cliente cadastrado!", cursor.lastrowid
     except Exception as e:
         return False, f"Erro: {str(e)}", -1
 
 
+# Conta corrente dos clientes vem de triggers em pedidos e pagamentos
+@em_cache("clientes", "pedidos", "pagamentos")
 def listar_clientes() -> List:
     """Lista todos os clientes"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM clientes ORDER BY nome")
-    clientes = cursor.fetchall()
-    conn.close()
-    return clientes
+    with conexao() as conn:
+        return conn.execute("SELECT * FROM clientes ORDER BY nome, id").fetchall()
+
+
+def listar_clientes_resumo(
+    apenas_fiado: bool = False,
+    prefixo: str = "",
+    limite: Optional[int] = None,
+    offset: int = 0,
+) -> List:
+    """Lista clientes com quantidade, valor e data do último pedido numa consulta.
+
+    Filtra por clientes de fiado e/ou início do nome (sem diferenciar
+    maiúsculas); `limite`/`offset` paginam na ordem do nome. Os pedidos são
+    agregados só para os clientes da página, pelo índice de cobertura
+    (cliente_id, data_hora, total).
+    """
+    filtros, parametros = [], []
+    if apenas_fiado:
+        filtros.append("fiando = 1")
+    if prefixo:
+        filtros.append("nome LIKE ? ESCAPE '\\'")
+        escapado = re.sub(r"([\\%_])", r"\\\1", prefixo)
+        parametros.append(f"{escapado}%")
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    parametros += [-1 if limite is None else limite, offset]
+    with conexao() as conn:
+        return conn.execute(
+            f"""
+            WITH pagina AS (
+                SELECT * FROM clientes {where}
+                ORDER BY nome, id LIMIT ? OFFSET ?
+            )
+            SELECT c.id, c.nome, c.apelido, c.cpf, c.fiando, c.data_criacao,
+                   c.total_pago, c.saldo_aberto,
+                   COALESCE(pe.quantidade, 0) as total_pedidos,
+                   COALESCE(pe.total, 0) as total_comprado,
+                   pe.ultima as ultima_compra
+            FROM pagina c
+            LEFT JOIN (
+                SELECT cliente_id, COUNT(*) as quantidade, SUM(total) as total,
+                       MAX(data_hora) as ultima
+                FROM pedidos
+                WHERE cliente_id IN (SELECT id FROM pagina)
+                GROUP BY cliente_id
+            ) pe ON pe.cliente_id = c.id
+            ORDER BY c.nome, c.id
+        """,
+            parametros,
+        ).fetchall()
 
 
 def obter_cliente(cliente_id: int) -> Optional[dict]:
     """Obtém dados de um cliente específico"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM clientes WHERE id = ?", (cliente_id,))
-    cliente = cursor.fetchone()
-    conn.close()
+    with conexao() as conn:
+        cliente = conn.execute(
+            "SELECT * FROM clientes WHERE id = ?", (cliente_id,)
+        ).fetchone()
     return dict(cliente) if cliente else None
 
 
+def registrar_pagamento(
+    cliente_id: int, valor: float, observacao: str = ""
+) -> Tuple[bool, str, int]:
+    """Registra um pagamento do cliente, abatendo do saldo em aberto"""
+    if valor <= 0:
+        return False, "Valor do pagamento deve ser positivo!", -1
+    try:
+        with transacao("pagamentos", "clientes") as conn:
+            cursor = conn.execute(
+                """INSERT INTO pagamentos (cliente_id, valor, data_hora, observacao)
+                   VALUES (?, ?, ?, ?)""",
+                (cliente_id, valor, agora(), observacao),
+            )
+            registrar_alteracao("pagamentos", INSERCAO, [cursor.lastrowid])
+            registrar_alteracao(
+                "clientes", ATUALIZACAO, [cliente_id], CAMPOS_SALDO_CLIENTE
+            )
+        return True, "Pagamento registrado!", cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return False, "Cliente não encontrado!", -1
+    except Exception as e:
+        return False, f"Erro: {str(e)}", -1
+
+
+def listar_pagamentos_cliente(cliente_id: int) -> List:
+    """Lista pagamentos de um cliente (mais recentes primeiro)"""
+    with conexao() as conn:
+        return conn.execute(
+            "SELECT * FROM pagamentos WHERE cliente_id = ? ORDER BY data_hora DESC, id DESC",
+            (cliente_id,),
+        ).fetchall()
+
+
+def verificar_saldos_clientes(reparar: bool = False) -> List:
+    """Lista clientes cuja conta corrente diverge dos pedidos e pagamentos"""
+    with transacao() as conn:
+        divergentes = conn.execute(
+            """
+            SELECT c.id, c.nome, c.total_pedidos, c.saldo_aberto,
+                   COALESCE(pe.quantidade, 0) as total_pedidos_real,
+                   c.fiando * COALESCE(pe.total, 0) - COALESCE(pg.total, 0) as saldo_aberto_real
+            FROM clientes c
+            LEFT JOIN (
+                SELECT cliente_id, COUNT(*) as quantidade, SUM(total) as total
+                FROM pedidos GROUP BY cliente_id
+            ) pe ON pe.cliente_id = c.id
+            LEFT JOIN (
+                SELECT cliente_id, SUM(valor) as total FROM pagamentos GROUP BY cliente_id
+            ) pg ON pg.cliente_id = c.id
+            WHERE c.total_pedidos IS NOT COALESCE(pe.quantidade, 0)
+               OR ABS(c.saldo_aberto - (c.fiando * COALESCE(pe.total, 0)
+                                        - COALESCE(pg.total, 0))) > 0.005
+        """
+        ).fetchall()
+        if reparar and divergentes:
+            recalcular_saldos_clientes(conn)
+            registrar_alteracao(
+                "clientes",
+                ATUALIZACAO,
+                [linha["id"] for linha in divergentes],
+                CAMPOS_SALDO_CLIENTE,
+            )
+    return divergentes
+
+
 # ===== FUNÇÕES DE PEDIDOS =====
 
 
 def inserir_pedido(cliente_id: int) -> Tuple[bool, str, int]:
     """Cria um novo pedido"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO pedidos (cliente_id, data_hora) VALUES (?, ?)",
-            (cliente_id, datetime.now().strftime("%d/%m/%Y %H:%M")),
-        )
-        conn.commit()
-        pedido_id = cursor.lastrowid
-        conn.close()
-        return True, "Pedido criado!", pedido_id
+        with transacao("pedidos", "clientes") as conn:
+            cursor = conn.execute(
+                "INSERT INTO pedidos (cliente_id, data_hora) VALUES (?, ?)",
+                (cliente_id, agora()),
+            )
+            registrar_alteracao("pedidos", INSERCAO, [cursor.lastrowid])
+            registrar_alteracao(
+                "clientes", ATUALIZACAO, [cliente_id], CAMPOS_SALDO_CLIENTE
+            )
+        return True, "Pedido criado!", cursor.lastrowid
     except Exception as e:
         return False, f"Erro: {str(e)}", -1
 
@@ -339,99 +839,326 @@ def adicionar_item_pedido(
 ) -> Tuple[bool, str]:
     """Adiciona um item ao pedido"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        subtotal = quantidade * preco_unitario
-        cursor.execute(
-            """INSERT INTO pedido_itens (pedido_id, produto_marca_id, quantidade, preco_unitario, subtotal, observacao)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (pedido_id, marca_id, quantidade, preco_unitario, subtotal, observacao),
-        )
-        # Atualizar total do pedido
-        cursor.execute(
-            "SELECT SUM(subtotal) FROM pedido_itens WHERE pedido_id = ?", (pedido_id,)
-        )
-        total = cursor.fetchone()[0] or 0
-        cursor.execute("UPDATE pedidos SET total = ? WHERE id = ?", (total, pedido_id))
-        conn.commit()
-        conn.close()
+        with transacao(
+            "pedido_itens",
+            "pedidos",
+            "clientes",
+            "produto_marcas",
+            "produtos",
+            "historico_movimentacao",
+        ) as conn:
+            subtotal = quantidade * preco_unitario
+            cursor = conn.execute(
+                """INSERT INTO pedido_itens (pedido_id, produto_marca_id, quantidade, preco_unitario, subtotal, observacao)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (pedido_id, marca_id, quantidade, preco_unitario, subtotal, observacao),
+            )
+            # Atualizar total do pedido
+            total = (
+                conn.execute(
+                    "SELECT SUM(subtotal) FROM pedido_itens WHERE pedido_id = ?",
+                    (pedido_id,),
+                ).fetchone()[0]
+                or 0
+            )
+            clientes = conn.execute(
+                "UPDATE pedidos SET total = ? WHERE id = ? RETURNING cliente_id",
+                (total, pedido_id),
+            ).fetchall()
+            _movimentar(conn, [(marca_id, -quantidade)], f"Pedido #{pedido_id}")
+            registrar_alteracao("pedido_itens", INSERCAO, [cursor.lastrowid])
+            registrar_alteracao("pedidos", ATUALIZACAO, [pedido_id])
+            registrar_alteracao(
+                "clientes",
+                ATUALIZACAO,
+                [c["cliente_id"] for c in clientes],
+                CAMPOS_SALDO_CLIENTE,
+            )
         return True, "Item adicionado!"
     except Exception as e:
         return False, f"Erro: {str(e)}"
 
 
+def inserir_pedido_completo(cliente_id: int, itens: List[dict]) -> Tuple[bool, str, int]:
+    """Grava pedido, itens, baixa de estoque e histórico numa única transação.
+
+    Cada item é um dict com marca_id, qtd, preco e, opcionalmente, observacao.
+    """
+    if not itens:
+        return False, "Pedido sem itens!", -1
+    try:
+        data_hora = agora()
+        linhas = [
+            (
+                item["marca_id"],
+                item["qtd"],
+                item["preco"],
+                item["qtd"] * item["preco"],
+                item.get("observacao", ""),
+            )
+            for item in itens
+        ]
+        total = sum(linha[3] for linha in linhas)
+
+        with transacao(
+            "pedidos",
+            "pedido_itens",
+            "produto_marcas",
+            "produtos",
+            "historico_movimentacao",
+            "clientes",
+        ) as conn:
+            pedido_id = conn.execute(
+                "INSERT INTO pedidos (cliente_id, data_hora, total) VALUES (?, ?, ?)",
+                (cliente_id, data_hora, total),
+            ).lastrowid
+            conn.executemany(
+                """INSERT INTO pedido_itens (pedido_id, produto_marca_id, quantidade, preco_unitario, subtotal, observacao)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(pedido_id, *linha) for linha in linhas],
+            )
+            _movimentar(
+                conn,
+                [(marca_id, -qtd) for marca_id, qtd, *_ in linhas],
+                f"Pedido #{pedido_id}",
+                data_hora,
+            )
+
+            itens_ids = [
+                linha["id"]
+                for linha in conn.execute(
+                    "SELECT id FROM pedido_itens WHERE pedido_id = ? ORDER BY id",
+                    (pedido_id,),
+                )
+            ]
+            registrar_alteracao("pedidos", INSERCAO, [pedido_id])
+            registrar_alteracao("pedido_itens", INSERCAO, itens_ids)
+            registrar_alteracao(
+                "clientes", ATUALIZACAO, [cliente_id], CAMPOS_SALDO_CLIENTE
+            )
+        return True, "Pedido registrado!", pedido_id
+    except Exception as e:
+        return False, f"Erro: {str(e)}", -1
+
+
 def listar_pedidos_cliente(cliente_id: int) -> List:
     """Lista pedidos de um cliente"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM pedidos WHERE cliente_id = ? ORDER BY data_hora DESC",
-        (cliente_id,),
-    )
-    pedidos = cursor.fetchall()
-    conn.close()
-    return pedidos
+    with conexao() as conn:
+        return conn.execute(
+            "SELECT * FROM pedidos WHERE cliente_id = ? ORDER BY data_hora DESC",
+            (cliente_id,),
+        ).fetchall()
+
+
+def obter_pedido(pedido_id: int) -> Optional[dict]:
+    """Obtém dados de um pedido específico"""
+    with conexao() as conn:
+        pedido = conn.execute(
+            "SELECT * FROM pedidos WHERE id = ?", (pedido_id,)
+        ).fetchone()
+    return dict(pedido) if pedido else None
 
 
 def listar_itens_pedido(pedido_id: int) -> List:
     """Lista itens de um pedido específico"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """SELECT pi.*, pm.marca, p.nome 
-           FROM pedido_itens pi
-           JOIN produto_marcas pm ON pi.produto_marca_id = pm.id
-           JOIN produtos p ON pm.produto_id = p.id
-           WHERE pi.pedido_id = ?""",
-        (pedido_id,),
-    )
-    itens = cursor.fetchall()
-    conn.close()
-    return itens
+    with conexao() as conn:
+        return conn.execute(
+            """SELECT pi.*, pm.marca, p.nome 
+               FROM pedido_itens pi
+               JOIN produto_marcas pm ON pi.produto_marca_id = pm.id
+               JOIN produtos p ON pm.produto_id = p.id
+               WHERE pi.pedido_id = ?""",
+            (pedido_id,),
+        ).fetchall()
 
 
-def listar_vendas() -> List:
-    """Lista histórico de vendas com informações do cliente"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT pi.*, p.nome, pm.marca, pm.data_cadastro, c.nome as cliente
+def listar_vendas(inicio: str = "", fim: str = "") -> List:
+    """Lista histórico de vendas com informações do cliente.
+
+    `inicio` (inclusivo) e `fim` (exclusivo) filtram pela data do pedido,
+    em DD/MM/AAAA ou ISO-8601.
+    """
+    filtros, parametros = [], []
+    if inicio:
+        filtros.append("pe.data_hora >= ?")
+        parametros.append(para_iso(inicio))
+    if fim:
+        filtros.append("pe.data_hora < ?")
+        parametros.append(para_iso(fim))
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+    with conexao() as conn:
+        return conn.execute(
+            f"""
+            SELECT pi.*, p.nome, pm.marca, pm.data_cadastro, c.nome as cliente
+            FROM pedido_itens pi
+            JOIN produto_marcas pm ON pi.produto_marca_id = pm.id
+            JOIN produtos p ON pm.produto_id = p.id
+            JOIN pedidos pe ON pi.pedido_id = pe.id
+            JOIN clientes c ON pe.cliente_id = c.id
+            {where}
+            ORDER BY pe.data_hora DESC
+        """,
+            parametros,
+        ).fetchall()
+
+
+def listar_vendas_pagina(
+    limite: int = 50,
+    apos: Optional[Tuple[str, int]] = None,
+    antes: Optional[Tuple[str, int]] = None,
+) -> List:
+    """Lista uma página do histórico de vendas (mais recentes primeiro).
+
+    Paginação por chave (data_hora, id): `apos` recebe a chave da última venda
+    já exibida e retorna as seguintes; `antes` recebe a chave da primeira
+    venda exibida e retorna as imediatamente anteriores, na mesma ordem.
+    """
+    consulta = """
+        SELECT pi.*, p.nome, pm.marca, pm.data_cadastro, c.nome as cliente,
+               pe.data_hora
         FROM pedido_itens pi
         JOIN produto_marcas pm ON pi.produto_marca_id = pm.id
         JOIN produtos p ON pm.produto_id = p.id
         JOIN pedidos pe ON pi.pedido_id = pe.id
         JOIN clientes c ON pe.cliente_id = c.id
-        ORDER BY pe.data_hora DESC
     """
-    )
-    vendas = cursor.fetchall()
-    conn.close()
-    return vendas
+    with conexao() as conn:
+        if antes is not None:
+            vendas = conn.execute(
+                consulta
+                + """WHERE (pe.data_hora, pi.id) > (?, ?)
+                     ORDER BY pe.data_hora ASC, pi.id ASC LIMIT ?""",
+                (*antes, limite),
+            ).fetchall()
+            vendas.reverse()
+            return vendas
+        if apos is not None:
+            return conn.execute(
+                consulta
+                + """WHERE (pe.data_hora, pi.id) < (?, ?)
+                     ORDER BY pe.data_hora DESC, pi.id DESC LIMIT ?""",
+                (*apos, limite),
+            ).fetchall()
+        return conn.execute(
+            consulta + "ORDER BY pe.data_hora DESC, pi.id DESC LIMIT ?", (limite,)
+        ).fetchall()
+
+
+# ===== RESUMO DE VENDAS (tabela vendas_diarias, migração 7) =====
+
+# Agrupamento do painel -> expressão sobre vendas_diarias.dia
+AGRUPAMENTOS_VENDAS = {
+    "dia": "dia",
+    "semana": "strftime('%Y-%W', dia)",
+    "mes": "substr(dia, 1, 7)",
+}
+
+
+def _filtro_dias(inicio: str, fim: str) -> Tuple[str, list]:
+    """WHERE sobre vendas_diarias.dia: `inicio` inclusivo, `fim` exclusivo"""
+    filtros, parametros = [], []
+    if inicio:
+        filtros.append("vd.dia >= ?")
+        parametros.append(para_iso(inicio))
+    if fim:
+        filtros.append("vd.dia < ?")
+        parametros.append(para_iso(fim))
+    return (f"WHERE {' AND '.join(filtros)}" if filtros else ""), parametros
+
+
+def resumo_vendas(inicio: str = "", fim: str = "", agrupamento: str = "dia") -> List:
+    """Receita e quantidade vendidas por dia, semana ou mês"""
+    periodo = AGRUPAMENTOS_VENDAS.get(agrupamento, "dia")
+    where, parametros = _filtro_dias(inicio, fim)
+    with conexao() as conn:
+        return conn.execute(
+            f"""
+            SELECT {periodo} as periodo, SUM(vd.itens) as itens,
+                   SUM(vd.quantidade) as quantidade, SUM(vd.receita) as receita
+            FROM vendas_diarias vd
+            {where}
+            GROUP BY 1
+            ORDER BY 1
+        """,
+            parametros,
+        ).fetchall()
+
+
+def marcas_mais_vendidas(inicio: str = "", fim: str = "", limite: int = 10) -> List:
+    """As `limite` marcas de maior receita no período"""
+    where, parametros = _filtro_dias(inicio, fim)
+    with conexao() as conn:
+        return conn.execute(
+            f"""
+            SELECT vd.produto_marca_id as marca_id, p.nome, pm.marca,
+                   SUM(vd.quantidade) as quantidade, SUM(vd.receita) as receita
+            FROM vendas_diarias vd
+            JOIN produto_marcas pm ON vd.produto_marca_id = pm.id
+            JOIN produtos p ON pm.produto_id = p.id
+            {where}
+            GROUP BY vd.produto_marca_id
+            ORDER BY receita DESC
+            LIMIT ?
+        """,
+            (*parametros, limite),
+        ).fetchall()
+
+
+def vendas_por_categoria(inicio: str = "", fim: str = "") -> List:
+    """Receita e quantidade por categoria de produto no período"""
+    where, parametros = _filtro_dias(inicio, fim)
+    with conexao() as conn:
+        return conn.execute(
+            f"""
+            SELECT p.categoria, SUM(vd.quantidade) as quantidade,
+                   SUM(vd.receita) as receita
+            FROM vendas_diarias vd
+            JOIN produto_marcas pm ON vd.produto_marca_id = pm.id
+            JOIN produtos p ON pm.produto_id = p.id
+            {where}
+            GROUP BY p.categoria
+            ORDER BY receita DESC
+        """,
+            parametros,
+        ).fetchall()
+
+
+def reconstruir_resumo_vendas():
+    """Recalcula todo o resumo diário de vendas a partir dos pedidos"""
+    with transacao("vendas_diarias") as conn:
+        reconstruir_vendas_diarias(conn)
 
 
 def deletar_produto(produto_id: int) -> Tuple[bool, str]:
     """Deleta um produto e todas as suas marcas e históricos"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        # Primeiro, deleta os históricos das marcas do produto
-        cursor.execute(
-            """DELETE FROM historico_movimentacao 
-               WHERE produto_marca_id IN 
-               (SELECT id FROM produto_marcas WHERE produto_id = ?)""",
-            (produto_id,),
-        )
+        with transacao("historico_movimentacao", "produto_marcas", "produtos") as conn:
+            # Primeiro, deleta os históricos das marcas do produto
+            conn.execute(
+                """DELETE FROM historico_movimentacao 
+                   WHERE produto_marca_id IN 
+                   (SELECT id FROM produto_marcas WHERE produto_id = ?)""",
+                (produto_id,),
+            )
+
+            # Deleta as marcas do produto
+            marcas = conn.execute(
+                "DELETE FROM produto_marcas WHERE produto_id = ? RETURNING id",
+                (produto_id,),
+            ).fetchall()
 
-        # Deleta as marcas do produto
-        cursor.execute("DELETE FROM produto_marcas WHERE produto_id = ?", (produto_id,))
+            # Deleta o produto
+            conn.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
 
-        # Deleta o produto
-        cursor.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
+            registrar_alteracao("produto_marcas", REMOCAO, [m["id"] for m in marcas])
+            registrar_alteracao("produtos", REMOCAO, [produto_id])
 
-        conn.commit()
-        conn.close()
         return True, "Produto deletado com sucesso!"
+    except sqlite3.IntegrityError:
+        return False, "Produto possui vendas registradas!"
     except Exception as e:
         return False, f"Erro: {str(e)}"
+
+
+# Tempo e linhas de cada função acima (só com ARVOREDO_PERFIL=1, ver perfil.py)
+instrumentar_modulo(sys.modules[__name__])
@@ -0,0 +1,63 @@
+"""
+Datas - Sistema Arvoredo
+Conversão entre o formato gravado no banco (ISO-8601) e o exibido (BR)
+"""
+
+from datetime import datetime
+from typing import Optional
+
+# Formato gravado no banco: ordena corretamente como texto e permite
+# consultas por intervalo usando índice
+FORMATO_DATA_HORA = "%Y-%m-%d %H:%M"
+FORMATO_DATA = "%Y-%m-%d"
+
+# Formato exibido e digitado nas telas
+FORMATO_BR_DATA_HORA = "%d/%m/%Y %H:%M"
+FORMATO_BR_DATA = "%d/%m/%Y"
+
+_CONVERSOES_ISO = (
+    (FORMATO_BR_DATA_HORA, FORMATO_DATA_HORA),
+    (FORMATO_BR_DATA, FORMATO_DATA),
+    (FORMATO_DATA_HORA, FORMATO_DATA_HORA),
+    (FORMATO_DATA, FORMATO_DATA),
+)
+
+_CONVERSOES_BR = (
+    (FORMATO_DATA_HORA, FORMATO_BR_DATA_HORA),
+    (FORMATO_DATA, FORMATO_BR_DATA),
+)
+
+
+def agora() -> str:
+    """Data e hora atuais no formato do banco"""
+    return datetime.now().strftime(FORMATO_DATA_HORA)
+
+
+def hoje() -> str:
+    """Data atual no formato do banco"""
+    return datetime.now().strftime(FORMATO_DATA)
+
+
+def para_iso(valor: Optional[str]) -> str:
+    """Converte DD/MM/AAAA [HH:MM] para ISO-8601 (valores já em ISO passam direto)"""
+    if not valor:
+        return ""
+    valor = valor.strip()
+    for formato_entrada, formato_saida in _CONVERSOES_ISO:
+        try:
+            return datetime.strptime(valor, formato_entrada).strftime(formato_saida)
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {valor} (use DD/MM/AAAA)")
+
+
+def para_br(valor: Optional[str]) -> str:
+    """Formata uma data ISO-8601 do banco para exibição (DD/MM/AAAA [HH:MM])"""
+    if not valor:
+        return ""
+    for formato_entrada, formato_saida in _CONVERSOES_BR:
+        try:
+            return datetime.strptime(valor, formato_entrada).strftime(formato_saida)
+        except ValueError:
+            continue
+    return valor
@@ -0,0 +1,67 @@
+"""
+Eventos - Sistema Arvoredo
+Publicação/assinatura de alterações confirmadas no banco de dados
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INSERCAO = "insercao"
+ATUALIZACAO = "atualizacao"
+REMOCAO = "remocao"
+# Tabela alterada sem detalhe de quais linhas (ex.: recálculo em lote)
+ALTERACAO = "alteracao"
+
+
+class Alteracao(NamedTuple):
+    """Alteração confirmada numa tabela; ids é None quando não se sabe as linhas.
+
+    `campos` lista as colunas alteradas por uma ATUALIZACAO (None: quaisquer).
+    """
+
+    tabela: str
+    acao: str
+    ids: Optional[Tuple[int, ...]]
+    campos: Optional[Tuple[str, ...]] = None
+
+
+def altera_campos(alteracao: Alteracao, campos: Iterable[str]) -> bool:
+    """Se a alteração pode ter mudado alguma das colunas `campos`"""
+    if alteracao.acao != ATUALIZACAO or alteracao.campos is None:
+        return True
+    return not set(alteracao.campos).isdisjoint(campos)
+
+
+_assinantes: Dict[str, List[Callable[[Alteracao], None]]] = {}
+_trava = threading.Lock()
+
+
+def assinar(tabela: str, callback: Callable[[Alteracao], None]) -> Callable[[], None]:
+    """Chama `callback(alteracao)` após cada commit que alterar a tabela.
+
+    Retorna uma função que cancela a assinatura.
+    """
+    with _trava:
+        _assinantes.setdefault(tabela, []).append(callback)
+
+    def cancelar():
+        with _trava:
+            if callback in _assinantes.get(tabela, []):
+                _assinantes[tabela].remove(callback)
+
+    return cancelar
+
+
+def publicar(alteracoes: Iterable[Alteracao]):
+    """Entrega as alterações aos assinantes (erros de um não afetam os demais)"""
+    for alteracao in alteracoes:
+        with _trava:
+            callbacks = list(_assinantes.get(alteracao.tabela, []))
+        for callback in callbacks:
+            try:
+                callback(alteracao)
+            except Exception:
+                logger.exception("Erro no assinante de %s", alteracao.tabela)
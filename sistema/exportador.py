@@ -0,0 +1,302 @@
+"""
+Exportador - Sistema Arvoredo
+Exportação de vendas, estoque e histórico para CSV ou Parquet
+
+Uso (a partir da pasta sistema/):
+    python exportador.py vendas --inicio 01/03/2026 --fim 01/04/2026
+    python exportador.py historico --formato parquet --incremental
+    python exportador.py estoque --saida estoque.csv
+
+As linhas são lidas em blocos (fetchmany) e gravadas à medida que chegam,
+então a memória usada não depende do tamanho das tabelas. `--inicio`
+(inclusivo) e `--fim` (exclusivo) filtram pela data do pedido/movimentação.
+`--incremental` exporta só as linhas criadas desde a última exportação
+incremental do mesmo conjunto e não aceita filtro por data. Parquet
+requer o pyarrow.
+"""
+
+import argparse
+import csv
+import time
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from conexao import adicionar_argumentos, conexao, configurar_por_argumentos, transacao
+from database import inicializar_db
+from datas import agora, para_iso
+
+TAMANHO_BLOCO = 5000
+FORMATOS = ("csv", "parquet")
+
+
+class Conjunto(NamedTuple):
+    """Consulta exportável e suas colunas (nome, tipo)"""
+
+    consulta: str
+    colunas: Sequence[Tuple[str, type]]
+    coluna_data: Optional[str] = None  # filtro por intervalo (indexada)
+    coluna_id: Optional[str] = None  # chave crescente do modo incremental
+    ordem: str = ""
+
+
+CONJUNTOS = {
+    # CROSS JOIN fixa pedidos como tabela externa: percorre idx_pedidos_data_hora
+    # já na ordem da exportação, sem ordenar o período inteiro em memória
+    "vendas": Conjunto(
+        consulta="""
+            SELECT pi.id, pe.id as pedido_id, pe.data_hora, c.nome as cliente,
+                   p.nome as produto, pm.codigo, pm.marca, pi.quantidade,
+                   pi.preco_unitario, pi.subtotal, pi.observacao
+            FROM pedidos pe
+            CROSS JOIN pedido_itens pi ON pi.pedido_id = pe.id
+            JOIN clientes c ON pe.cliente_id = c.id
+            JOIN produto_marcas pm ON pi.produto_marca_id = pm.id
+            JOIN produtos p ON pm.produto_id = p.id
+        """,
+        colunas=(
+            ("id", int),
+            ("pedido_id", int),
+            ("data_hora", str),
+            ("cliente", str),
+            ("produto", str),
+            ("codigo", str),
+            ("marca", str),
+            ("quantidade", int),
+            ("preco_unitario", float),
+            ("subtotal", float),
+            ("observacao", str),
+        ),
+        coluna_data="pe.data_hora",
+        coluna_id="pi.id",
+        ordem="pe.data_hora, pi.id",
+    ),
+    "historico": Conjunto(
+        consulta="""
+            SELECT h.id, h.data_hora, h.tipo, h.quantidade, h.motivo,
+                   pm.id as marca_id, pm.codigo, pm.marca, p.nome as produto
+            FROM historico_movimentacao h
+            JOIN produto_marcas pm ON h.produto_marca_id = pm.id
+            JOIN produtos p ON pm.produto_id = p.id
+        """,
+        colunas=(
+            ("id", int),
+            ("data_hora", str),
+            ("tipo", str),
+            ("quantidade", int),
+            ("motivo", str),
+            ("marca_id", int),
+            ("codigo", str),
+            ("marca", str),
+            ("produto", str),
+        ),
+        coluna_data="h.data_hora",
+        coluna_id="h.id",
+        ordem="h.data_hora, h.id",
+    ),
+    # Retrato do estoque no momento da exportação
+    "estoque": Conjunto(
+        consulta="""
+            SELECT p.id as produto_id, pm.id as marca_id, p.nome as produto,
+                   p.categoria, pm.codigo, pm.marca, pm.preco_unitario,
+                   pm.quantidade, pm.quantidade * pm.preco_unitario as valor,
+                   pm.data_validade
+            FROM produto_marcas pm
+            JOIN produtos p ON pm.produto_id = p.id
+        """,
+        colunas=(
+            ("produto_id", int),
+            ("marca_id", int),
+            ("produto", str),
+            ("categoria", str),
+            ("codigo", str),
+            ("marca", str),
+            ("preco_unitario", float),
+            ("quantidade", int),
+            ("valor", float),
+            ("data_validade", str),
+        ),
+        ordem="p.nome COLLATE NOCASE, pm.marca COLLATE NOCASE, pm.id",
+    ),
+}
+
+
+# ===== LEITURA =====
+
+
+def ultimo_exportado(conjunto: str) -> int:
+    """Maior id já exportado no modo incremental (0 se nunca exportado)"""
+    with conexao() as conn:
+        linha = conn.execute(
+            "SELECT ultimo_id FROM exportacoes WHERE conjunto = ?", (conjunto,)
+        ).fetchone()
+    return linha["ultimo_id"] if linha else 0
+
+
+def registrar_exportacao(conjunto: str, ultimo_id: int):
+    """Guarda até onde o conjunto foi exportado"""
+    with transacao("exportacoes") as conn:
+        conn.execute(
+            """INSERT INTO exportacoes (conjunto, ultimo_id, data_hora) VALUES (?, ?, ?)
+               ON CONFLICT (conjunto) DO UPDATE SET
+                   ultimo_id = excluded.ultimo_id, data_hora = excluded.data_hora""",
+            (conjunto, ultimo_id, agora()),
+        )
+
+
+def ler_conjunto(
+    nome: str,
+    inicio: str = "",
+    fim: str = "",
+    apos_id: int = 0,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> Iterator[List[tuple]]:
+    """Gera as linhas do conjunto em blocos de até `tamanho_bloco`"""
+    conjunto = CONJUNTOS[nome]
+    filtros, parametros = [], []
+    if (inicio or fim) and not conjunto.coluna_data:
+        raise ValueError(f"O conjunto {nome} não tem filtro por data")
+    if inicio:
+        filtros.append(f"{conjunto.coluna_data} >= ?")
+        parametros.append(para_iso(inicio))
+    if fim:
+        filtros.append(f"{conjunto.coluna_data} < ?")
+        parametros.append(para_iso(fim))
+    if apos_id:
+        filtros.append(f"{conjunto.coluna_id} > ?")
+        parametros.append(apos_id)
+    where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+
+    with conexao() as conn:
+        cursor = conn.execute(
+            f"{conjunto.consulta} {where} ORDER BY {conjunto.ordem}", parametros
+        )
+        while True:
+            bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            yield [tuple(linha) for linha in bloco]
+
+
+# ===== GRAVAÇÃO =====
+
+
+def gravar_csv(caminho: str, colunas: Sequence[str], blocos) -> int:
+    """Grava os blocos em CSV (separador ;, como o Excel em português)"""
+    total = 0
+    with open(caminho, "w", newline="", encoding="utf-8-sig") as arquivo:
+        escritor = csv.writer(arquivo, delimiter=";")
+        escritor.writerow(colunas)
+        for bloco in blocos:
+            escritor.writerows(bloco)
+            total += len(bloco)
+    return total
+
+
+def gravar_parquet(caminho: str, colunas: Sequence[Tuple[str, type]], blocos) -> int:
+    """Grava os blocos em Parquet, um row group por bloco"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("❌ Para exportar Parquet instale o pyarrow: pip install pyarrow")
+
+    tipos = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    esquema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+    total = 0
+    with pq.ParquetWriter(caminho, esquema, compression="zstd") as escritor:
+        for bloco in blocos:
+            # Linhas -> colunas só do bloco atual
+            valores = list(zip(*bloco))
+            tabela = pa.Table.from_arrays(
+                [
+                    pa.array(coluna, type=campo.type)
+                    for coluna, campo in zip(valores, esquema)
+                ],
+                schema=esquema,
+            )
+            escritor.write_table(tabela)
+            total += len(bloco)
+    return total
+
+
+def exportar(
+    nome: str,
+    caminho: str,
+    formato: str = "csv",
+    inicio: str = "",
+    fim: str = "",
+    incremental: bool = False,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> int:
+    """Exporta o conjunto para o arquivo; retorna o número de linhas gravadas"""
+    conjunto = CONJUNTOS[nome]
+    if incremental and not conjunto.coluna_id:
+        raise ValueError(f"O conjunto {nome} não tem modo incremental")
+    # O marcador é um id: linhas de ids menores fora do período nunca
+    # seriam exportadas depois
+    if incremental and (inicio or fim):
+        raise ValueError("--incremental não pode ser combinado com --inicio/--fim")
+
+    apos_id = ultimo_exportado(nome) if incremental else 0
+    maior_id = [apos_id]
+
+    def blocos():
+        for bloco in ler_conjunto(nome, inicio, fim, apos_id, tamanho_bloco):
+            if incremental:
+                # id é sempre a primeira coluna dos conjuntos incrementais
+                maior_id[0] = max(maior_id[0], max(linha[0] for linha in bloco))
+            yield bloco
+
+    if formato == "parquet":
+        total = gravar_parquet(caminho, conjunto.colunas, blocos())
+    else:
+        total = gravar_csv(caminho, [c for c, _ in conjunto.colunas], blocos())
+
+    # Só avança o marcador depois do arquivo gravado por completo
+    if incremental and maior_id[0] > apos_id:
+        registrar_exportacao(nome, maior_id[0])
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Exporta dados do banco Arvoredo")
+    parser.add_argument("conjunto", choices=sorted(CONJUNTOS))
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--saida", help="arquivo de saída (padrão: conjunto_data.ext)")
+    parser.add_argument("--inicio", default="", help="data inicial DD/MM/AAAA (inclusiva)")
+    parser.add_argument("--fim", default="", help="data final DD/MM/AAAA (exclusiva)")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="só as linhas novas desde a última exportação incremental "
+        "(sem --inicio/--fim)",
+    )
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO)
+    adicionar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    configurar_por_argumentos(args)
+    inicializar_db()
+    caminho = args.saida or (
+        f"{args.conjunto}_{time.strftime('%Y%m%d_%H%M%S')}.{args.formato}"
+    )
+    inicio = time.perf_counter()
+    try:
+        total = exportar(
+            args.conjunto,
+            caminho,
+            args.formato,
+            args.inicio,
+            args.fim,
+            args.incremental,
+            args.bloco,
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {total} linha(s) exportada(s) para {caminho} em {segundos:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,348 @@
+"""
+Importador - Sistema Arvoredo
+Importação em lote de catálogos de fornecedores (CSV ou XLSX)
+
+Uso (a partir da pasta sistema/):
+    python importador.py catalogo.csv [--lote 1000] [--categoria Mercado]
+    python importador.py catalogo.xlsx [--planilha "Folha1"]
+
+Colunas reconhecidas no cabeçalho (maiúsculas e acentos são ignorados):
+nome, categoria, codigo, marca, preco, quantidade, validade. Uma marca com
+código já cadastrado é atualizada (preço, quantidade, validade, marca e
+produto); sem código ela é sempre inserida. A diferença de quantidade entra
+no histórico de movimentação. Ler XLSX requer o openpyxl.
+"""
+
+import argparse
+import csv
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from conexao import adicionar_argumentos, conexao, configurar_por_argumentos, transacao
+from database import LIMITE_VARIAVEIS, inicializar_db
+from migracoes import conciliar_historico_estoque
+from datas import FORMATO_DATA, agora, para_iso
+from texto import normalizar_nome
+
+TAMANHO_LOTE = 1000
+CATEGORIA_PADRAO = "Mercado"
+
+# Nome normalizado da coluna no arquivo -> campo da importação
+COLUNAS = {
+    "nome": "nome",
+    "produto": "nome",
+    "categoria": "categoria",
+    "codigo": "codigo",
+    "codigo de barras": "codigo",
+    "ean": "codigo",
+    "marca": "marca",
+    "preco": "preco",
+    "preco unitario": "preco",
+    "valor": "preco",
+    "quantidade": "quantidade",
+    "estoque": "quantidade",
+    "validade": "validade",
+    "data de validade": "validade",
+}
+
+
+class ResumoImportacao(NamedTuple):
+    """Contadores de uma importação"""
+
+    linhas: int
+    produtos_criados: int
+    marcas_inseridas: int
+    marcas_atualizadas: int
+    erros: List[Tuple[int, str]]  # (linha do arquivo, mensagem)
+    segundos: float
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas / self.segundos if self.segundos else 0.0
+
+
+# ===== LEITURA DOS ARQUIVOS =====
+
+
+def _mapear_cabecalho(cabecalho) -> List[Optional[str]]:
+    return [COLUNAS.get(normalizar_nome(str(coluna or ""))) for coluna in cabecalho]
+
+
+def ler_csv(caminho: str) -> Iterator[Tuple[int, dict]]:
+    """Lê o CSV linha a linha (separador ; ou , detectado automaticamente)"""
+    with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+        amostra = arquivo.read(8192)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(arquivo, dialeto)
+        campos = _mapear_cabecalho(next(leitor, []))
+        for numero, valores in enumerate(leitor, start=2):
+            if any(valores):
+                yield numero, {c: v for c, v in zip(campos, valores) if c}
+
+
+def ler_xlsx(caminho: str, planilha: Optional[str] = None) -> Iterator[Tuple[int, dict]]:
+    """Lê a planilha linha a linha, sem carregá-la inteira na memória"""
+    try:
+        import openpyxl
+    except ImportError:
+        raise SystemExit("❌ Para importar XLSX instale o openpyxl: pip install openpyxl")
+
+    livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        folha = livro[planilha] if planilha else livro.active
+        linhas = folha.iter_rows(values_only=True)
+        campos = _mapear_cabecalho(next(linhas, ()))
+        for numero, valores in enumerate(linhas, start=2):
+            if any(v is not None and v != "" for v in valores):
+                yield numero, {c: v for c, v in zip(campos, valores) if c}
+    finally:
+        livro.close()
+
+
+def ler_arquivo(caminho: str, planilha: Optional[str] = None):
+    """Escolhe o leitor pela extensão do arquivo"""
+    if caminho.lower().endswith((".xlsx", ".xlsm")):
+        return ler_xlsx(caminho, planilha)
+    return ler_csv(caminho)
+
+
+# ===== CONVERSÃO DOS VALORES =====
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # códigos numéricos vindos de planilhas
+    return str(valor).strip()
+
+
+def _numero(valor) -> float:
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = _texto(valor).replace("R$", "").replace(" ", "")
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")  # 1.234,56
+    return float(texto or 0)
+
+
+def _data(valor) -> str:
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime(FORMATO_DATA)
+    return para_iso(_texto(valor))
+
+
+def converter_linha(valores: dict, categoria_padrao: str = CATEGORIA_PADRAO) -> dict:
+    """Valida e converte uma linha lida do arquivo; ValueError se inválida"""
+    nome = _texto(valores.get("nome"))
+    marca = _texto(valores.get("marca"))
+    if not nome:
+        raise ValueError("nome vazio")
+    if not marca:
+        raise ValueError("marca vazia")
+    try:
+        preco = _numero(valores.get("preco"))
+        quantidade = int(_numero(valores.get("quantidade")))
+    except ValueError:
+        raise ValueError("preço ou quantidade inválidos")
+    return {
+        "nome": nome,
+        "categoria": _texto(valores.get("categoria")) or categoria_padrao,
+        "codigo": _texto(valores.get("codigo")) or None,
+        "marca": marca,
+        "preco": preco,
+        "quantidade": quantidade,
+        "validade": _data(valores.get("validade")),
+    }
+
+
+# ===== GRAVAÇÃO =====
+
+
+def _carregar_produtos() -> Dict[str, int]:
+    """Mapa nome normalizado -> id de todos os produtos (uma consulta)"""
+    with conexao() as conn:
+        return {
+            linha["nome_normalizado"]: linha["id"]
+            for linha in conn.execute("SELECT id, nome_normalizado FROM produtos")
+        }
+
+
+def _gravar_lote(
+    lote: List[dict], produtos: Dict[str, int], codigos: set
+) -> Tuple[int, int, int]:
+    """Grava um lote numa transação; retorna (produtos criados, inseridas, atualizadas)"""
+    criados = inseridas = atualizadas = 0
+    data_cadastro = agora()
+    with transacao("produtos", "produto_marcas", "historico_movimentacao") as conn:
+        # Códigos do lote que já existem no banco viram atualizações
+        codigos_lote = {m["codigo"] for m in lote if m["codigo"]}
+        novos_codigos = list(codigos_lote - codigos)
+        for i in range(0, len(novos_codigos), LIMITE_VARIAVEIS):
+            parte = novos_codigos[i : i + LIMITE_VARIAVEIS]
+            codigos.update(
+                linha["codigo"]
+                for linha in conn.execute(
+                    f"""SELECT codigo FROM produto_marcas
+                        WHERE codigo IN ({','.join('?' * len(parte))})""",
+                    parte,
+                )
+            )
+
+        existentes = list(codigos_lote & codigos)
+        ultimo_id = conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM produto_marcas"
+        ).fetchone()[0]
+
+        marcas = []
+        for m in lote:
+            chave = normalizar_nome(m["nome"])
+            produto_id = produtos.get(chave)
+            if produto_id is None:
+                produto_id = conn.execute(
+                    """INSERT INTO produtos (nome, nome_normalizado, categoria, data_criacao)
+                       VALUES (?, ?, ?, ?)""",
+                    (m["nome"], chave, m["categoria"], data_cadastro),
+                ).lastrowid
+                produtos[chave] = produto_id
+                criados += 1
+
+            if m["codigo"] in codigos:
+                atualizadas += 1
+            else:
+                inseridas += 1
+                if m["codigo"]:
+                    codigos.add(m["codigo"])
+            marcas.append(
+                (
+                    produto_id,
+                    m["codigo"],
+                    m["marca"],
+                    m["preco"],
+                    m["quantidade"],
+                    data_cadastro,
+                    m["validade"],
+                )
+            )
+
+        conn.executemany(
+            """INSERT INTO produto_marcas
+                   (produto_id, codigo, marca, preco_unitario, quantidade, data_cadastro, data_validade)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (codigo) DO UPDATE SET
+                   produto_id = excluded.produto_id,
+                   marca = excluded.marca,
+                   preco_unitario = excluded.preco_unitario,
+                   quantidade = excluded.quantidade,
+                   data_validade = excluded.data_validade""",
+            marcas,
+        )
+
+        # A quantidade do catálogo é uma contagem: a diferença para o saldo
+        # do histórico entra como movimentação das marcas novas e atualizadas
+        motivo = "Importação de catálogo"
+        conciliar_historico_estoque(conn, motivo, data_cadastro, "pm.id > ?", (ultimo_id,))
+        for i in range(0, len(existentes), LIMITE_VARIAVEIS):
+            parte = existentes[i : i + LIMITE_VARIAVEIS]
+            conciliar_historico_estoque(
+                conn,
+                motivo,
+                data_cadastro,
+                f"pm.codigo IN ({','.join('?' * len(parte))})",
+                parte,
+            )
+    return criados, inseridas, atualizadas
+
+
+def importar(
+    linhas: Iterable[Tuple[int, dict]],
+    tamanho_lote: int = TAMANHO_LOTE,
+    categoria_padrao: str = CATEGORIA_PADRAO,
+    ao_progresso: Optional[Callable[[int, float], None]] = None,
+) -> ResumoImportacao:
+    """Importa as linhas (numero, valores) em transações de `tamanho_lote`.
+
+    Linhas inválidas são puladas e listadas em `erros`; `ao_progresso`
+    recebe o total de linhas gravadas e os segundos decorridos a cada lote.
+    """
+    inicio = time.perf_counter()
+    produtos = _carregar_produtos()
+    codigos: set = set()
+    erros: List[Tuple[int, str]] = []
+    total = criados = inseridas = atualizadas = 0
+    lote: List[dict] = []
+
+    def gravar():
+        nonlocal total, criados, inseridas, atualizadas
+        c, i, a = _gravar_lote(lote, produtos, codigos)
+        criados, inseridas, atualizadas = criados + c, inseridas + i, atualizadas + a
+        total += len(lote)
+        lote.clear()
+        if ao_progresso:
+            ao_progresso(total, time.perf_counter() - inicio)
+
+    for numero, valores in linhas:
+        try:
+            lote.append(converter_linha(valores, categoria_padrao))
+        except ValueError as e:
+            erros.append((numero, str(e)))
+            continue
+        if len(lote) >= tamanho_lote:
+            gravar()
+    if lote:
+        gravar()
+
+    return ResumoImportacao(
+        total, criados, inseridas, atualizadas, erros, time.perf_counter() - inicio
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importa um catálogo de produtos")
+    parser.add_argument("arquivo", help="arquivo .csv ou .xlsx com cabeçalho")
+    parser.add_argument(
+        "--lote", type=int, default=TAMANHO_LOTE, help="linhas por transação"
+    )
+    parser.add_argument(
+        "--categoria",
+        default=CATEGORIA_PADRAO,
+        help="categoria dos produtos novos sem categoria no arquivo",
+    )
+    parser.add_argument("--planilha", help="nome da planilha (XLSX)")
+    adicionar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    configurar_por_argumentos(args)
+    inicializar_db()
+
+    def progresso(total, segundos):
+        print(f"  {total} linhas ({total / segundos:.0f} linhas/s)", end="\r")
+
+    resumo = importar(
+        ler_arquivo(args.arquivo, args.planilha),
+        tamanho_lote=args.lote,
+        categoria_padrao=args.categoria,
+        ao_progresso=progresso,
+    )
+
+    print(
+        f"✅ {resumo.linhas} linhas em {resumo.segundos:.1f} s "
+        f"({resumo.linhas_por_segundo:.0f} linhas/s): "
+        f"{resumo.produtos_criados} produto(s) novo(s), "
+        f"{resumo.marcas_inseridas} marca(s) inserida(s), "
+        f"{resumo.marcas_atualizadas} atualizada(s)"
+    )
+    for numero, mensagem in resumo.erros[:20]:
+        print(f"❌ Linha {numero}: {mensagem}")
+    if len(resumo.erros) > 20:
+        print(f"❌ ... e mais {len(resumo.erros) - 20} linha(s) com erro")
+    return 1 if resumo.erros else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+"""
+Índice de Códigos - Sistema Arvoredo
+Resolução de código de barras -> marca/produto/preço em memória
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from conexao import conexao, geracao_base
+from eventos import Alteracao, altera_campos, assinar
+
+# Colunas lidas pelo índice: atualizações só de outras colunas (estoque,
+# totais dos produtos) não o invalidam; inserções e remoções sempre
+CAMPOS = {
+    "produtos": ("nome",),
+    "produto_marcas": ("codigo", "marca", "preco_unitario", "produto_id"),
+}
+
+
+class IndiceCodigos:
+    """Dicionário codigo -> dados da marca, reconstruído quando o catálogo muda"""
+
+    def __init__(self):
+        self._indice: Dict[str, dict] = {}
+        self._carregado: Optional[Tuple[int, int]] = None
+        self._versao = 0
+        self._trava = threading.Lock()
+        self._trava_versao = threading.Lock()
+
+    def ao_alterar(self, alteracao: Alteracao):
+        """Assinante de `eventos`: marca o índice como desatualizado se preciso"""
+        if altera_campos(alteracao, CAMPOS[alteracao.tabela]):
+            with self._trava_versao:
+                self._versao += 1
+
+    def _estado(self) -> Tuple[int, int]:
+        # Escritas sem tabelas declaradas e troca de pool renovam a geração base
+        with self._trava_versao:
+            return geracao_base(), self._versao
+
+    def aquecer(self):
+        """Carrega todos os códigos numa única consulta, se o catálogo mudou"""
+        with self._trava:
+            # Estado lido antes da consulta: uma escrita concorrente
+            # deixa o índice marcado como desatualizado
+            estado = self._estado()
+            if estado == self._carregado:
+                return
+            with conexao() as conn:
+                linhas = conn.execute(
+                    """
+                    SELECT pm.codigo, pm.id as marca_id, p.id as produto_id,
+                           p.nome, pm.marca, pm.preco_unitario
+                    FROM produto_marcas pm
+                    JOIN produtos p ON pm.produto_id = p.id
+                    WHERE pm.codigo IS NOT NULL AND pm.codigo != ''
+                """
+                ).fetchall()
+            self._indice = {linha["codigo"]: dict(linha) for linha in linhas}
+            self._carregado = estado
+
+    def buscar(self, codigo: str) -> Optional[dict]:
+        """Retorna marca_id, produto_id, nome, marca e preco_unitario do código.
+
+        Com o catálogo alterado o índice é recarregado na thread que chama:
+        na interface use `await bd.buscar_por_codigo(...)`.
+        """
+        if self._carregado != self._estado():
+            self.aquecer()
+        return self._indice.get((codigo or "").strip())
+
+
+_indice = IndiceCodigos()
+for _tabela in CAMPOS:
+    assinar(_tabela, _indice.ao_alterar)
+
+
+def aquecer_indice_codigos():
+    """Pré-carrega o índice (chamado na inicialização)"""
+    _indice.aquecer()
+
+
+def buscar_por_codigo(codigo: str) -> Optional[dict]:
+    """Resolve um código de barras pelo índice em memória"""
+    return _indice.buscar(codigo)
@@ -3,14 +3,21 @@ Main - Sistema Arvoredo
 Arquivo principal - orquestra as telas
 """
 
+import argparse
+import logging
+
 import flet as ft
+from conexao import adicionar_argumentos, configurar_por_argumentos
 from database import inicializar_db
+from indice_codigos import aquecer_indice_codigos
 from ui.componentes import criar_header, COR_PRIMARIA, COR_SECUNDARIA
+from ui.registro_telas import RegistroTelas
 from ui.telas.cadastro import criar_tela_cadastro
 from ui.telas.editar import criar_tela_editar
 from ui.telas.vendas import criar_tela_vendas
 from ui.telas.clientes import criar_tela_clientes
 from ui.telas.pedidos import criar_tela_pedidos
+from ui.telas.dashboard import criar_tela_dashboard
 
 # ===== VARIÁVEIS GLOBAIS =====
 tela_atual = "cadastro"
@@ -25,6 +32,7 @@ def main(page: ft.Page):
     page.bgcolor = COR_SECUNDARIA
 
     inicializar_db()
+    aquecer_indice_codigos()
 
     # Inicializar page.data como dicionário
     page.data = {}
@@ -35,34 +43,27 @@ def main(page: ft.Page):
     # Guardar referência para uso nas telas
     page.data["conteudo"] = conteudo
 
-    # Dicionário de telas
-    telas = {}
+    # Registro de telas: cada uma é construída na primeira navegação
+    telas = RegistroTelas()
 
     def mudar_tela(tela_nome):
         """Muda entre as telas"""
         global tela_atual
         tela_atual = tela_nome
         conteudo.controls.clear()
-        conteudo.controls.append(telas[tela_nome])
+        conteudo.controls.append(telas.obter(tela_nome))
         page.update()
 
-    # Criar todas as telas com os callbacks necessários
-    tela_cadastro = criar_tela_cadastro(
-        page,
-        lambda: (
-            tela_cadastro.atualizar() if hasattr(tela_cadastro, "atualizar") else None
-        ),
-        mudar_tela,
-    )
-
-    telas["cadastro"] = tela_cadastro
-    telas["editar"] = criar_tela_editar(page, mudar_tela)
-    telas["vendas"] = criar_tela_vendas(page)
-    telas["clientes"] = criar_tela_clientes(page)
-    telas["pedidos"] = criar_tela_pedidos(page)
+    # As telas assinam as alterações do banco e se atualizam sozinhas
+    telas.registrar("cadastro", lambda: criar_tela_cadastro(page, mudar_tela))
+    telas.registrar("editar", lambda: criar_tela_editar(page, mudar_tela))
+    telas.registrar("vendas", lambda: criar_tela_vendas(page))
+    telas.registrar("clientes", lambda: criar_tela_clientes(page))
+    telas.registrar("pedidos", lambda: criar_tela_pedidos(page))
+    telas.registrar("dashboard", lambda: criar_tela_dashboard(page))
 
     # Carregar tela inicial
-    conteudo.controls.append(telas["cadastro"])
+    conteudo.controls.append(telas.obter("cadastro"))
 
     # Adicionar ao page
     page.add(
@@ -73,4 +74,10 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Sistema Arvoredo")
+    adicionar_argumentos(parser)
+    # Os demais argumentos ficam para o Flet
+    args, _ = parser.parse_known_args()
+    configurar_por_argumentos(args)
     ft.run(main)
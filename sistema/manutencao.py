@@ -0,0 +1,194 @@
+"""
+Manutenção - Sistema Arvoredo
+Comandos de verificação e reparo do banco de dados
+
+Uso (a partir da pasta sistema/):
+    python manutencao.py agregados [--reparar]
+    python manutencao.py busca
+    python manutencao.py chaves [--reparar]
+    python manutencao.py clientes [--reparar]
+    python manutencao.py estoque [--reparar]
+    python manutencao.py nomes [--reparar]
+    python manutencao.py vendas
+"""
+
+import argparse
+
+from conexao import adicionar_argumentos, configurar_por_argumentos
+from database import (
+    inicializar_db,
+    reconstruir_resumo_vendas,
+    reindexar_busca,
+    verificar_agregados,
+    verificar_chaves,
+    verificar_estoque,
+    verificar_nomes_produtos,
+    verificar_saldos_clientes,
+)
+
+
+def comando_agregados(args):
+    """Confere os totais de produtos mantidos por triggers"""
+    divergentes = verificar_agregados(reparar=args.reparar)
+    for prod in divergentes:
+        print(
+            f"#{prod['id']} {prod['nome']}: "
+            f"marcas {prod['total_marcas']} -> {prod['total_marcas_real']}, "
+            f"quantidade {prod['quantidade_total']} -> {prod['quantidade_total_real']}, "
+            f"valor {prod['valor_total']:.2f} -> {prod['valor_total_real']:.2f}"
+        )
+    if not divergentes:
+        print("✅ Totais de produtos consistentes")
+    elif args.reparar:
+        print(f"✅ {len(divergentes)} produto(s) reparado(s)")
+    else:
+        print(f"❌ {len(divergentes)} produto(s) divergente(s) (use --reparar)")
+        return 1
+    return 0
+
+
+def comando_busca(args):
+    """Reconstrói o índice de busca de produtos"""
+    reindexar_busca()
+    print("✅ Índice de busca reconstruído")
+    return 0
+
+
+def comando_chaves(args):
+    """Confere as chaves estrangeiras (linhas que apontam para registros inexistentes)"""
+    violacoes = verificar_chaves(reparar=args.reparar)
+    for linha in violacoes:
+        print(f"{linha['table']} #{linha['rowid']}: {linha['parent']} inexistente")
+    historico = [
+        linha for linha in violacoes if linha["table"] == "historico_movimentacao"
+    ]
+    if not violacoes:
+        print("✅ Chaves estrangeiras consistentes")
+        return 0
+    if args.reparar and historico:
+        print(f"✅ {len(historico)} movimentação(ões) órfã(s) removida(s)")
+    restantes = len(violacoes) - len(historico) if args.reparar else len(violacoes)
+    if restantes:
+        dica = " (use --reparar para o histórico)" if historico and not args.reparar else ""
+        print(f"❌ {restantes} linha(s) órfã(s){dica}")
+        return 1
+    return 0
+
+
+def comando_clientes(args):
+    """Confere a conta corrente dos clientes mantida por triggers"""
+    divergentes = verificar_saldos_clientes(reparar=args.reparar)
+    for cliente in divergentes:
+        print(
+            f"#{cliente['id']} {cliente['nome']}: "
+            f"pedidos {cliente['total_pedidos']} -> {cliente['total_pedidos_real']}, "
+            f"saldo {cliente['saldo_aberto']:.2f} -> {cliente['saldo_aberto_real']:.2f}"
+        )
+    if not divergentes:
+        print("✅ Saldos de clientes consistentes")
+    elif args.reparar:
+        print(f"✅ {len(divergentes)} cliente(s) reparado(s)")
+    else:
+        print(f"❌ {len(divergentes)} cliente(s) divergente(s) (use --reparar)")
+        return 1
+    return 0
+
+
+def comando_estoque(args):
+    """Confere o estoque das marcas contra o histórico de movimentação"""
+    divergentes = verificar_estoque(reparar=args.reparar)
+    for marca in divergentes:
+        print(
+            f"#{marca['id']} {marca['marca']}: estoque {marca['quantidade']}, "
+            f"histórico {marca['quantidade_historico']}"
+        )
+    if not divergentes:
+        print("✅ Estoque consistente com o histórico")
+    elif args.reparar:
+        print(f"✅ {len(divergentes)} marca(s) conciliada(s) no histórico")
+    else:
+        print(f"❌ {len(divergentes)} marca(s) divergente(s) (use --reparar)")
+        return 1
+    return 0
+
+
+def comando_nomes(args):
+    """Confere produtos com o mesmo nome (ignorando maiúsculas e acentos)"""
+    duplicados = verificar_nomes_produtos(reparar=args.reparar)
+    for grupo in duplicados:
+        print(f"{grupo['nomes']} (ids {grupo['ids']}) -> mantém #{grupo['manter']}")
+    if not duplicados:
+        print("✅ Nomes de produtos únicos")
+    elif args.reparar:
+        print(f"✅ {len(duplicados)} grupo(s) mesclado(s); índice único criado")
+    else:
+        print(
+            f"❌ {len(duplicados)} nome(s) repetido(s) "
+            "(renomeie os produtos ou use --reparar para mesclá-los)"
+        )
+        return 1
+    return 0
+
+
+def comando_vendas(args):
+    """Reconstrói o resumo diário de vendas (vendas_diarias)"""
+    reconstruir_resumo_vendas()
+    print("✅ Resumo diário de vendas reconstruído")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Manutenção do banco Arvoredo")
+    adicionar_argumentos(parser)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    agregados = comandos.add_parser("agregados", help=comando_agregados.__doc__)
+    agregados.add_argument(
+        "--reparar", action="store_true", help="recalcula os totais divergentes"
+    )
+    agregados.set_defaults(funcao=comando_agregados)
+
+    busca = comandos.add_parser("busca", help=comando_busca.__doc__)
+    busca.set_defaults(funcao=comando_busca)
+
+    chaves = comandos.add_parser("chaves", help=comando_chaves.__doc__)
+    chaves.add_argument(
+        "--reparar",
+        action="store_true",
+        help="remove o histórico de marcas que não existem mais",
+    )
+    chaves.set_defaults(funcao=comando_chaves)
+
+    clientes = comandos.add_parser("clientes", help=comando_clientes.__doc__)
+    clientes.add_argument(
+        "--reparar", action="store_true", help="recalcula os saldos divergentes"
+    )
+    clientes.set_defaults(funcao=comando_clientes)
+
+    estoque = comandos.add_parser("estoque", help=comando_estoque.__doc__)
+    estoque.add_argument(
+        "--reparar",
+        action="store_true",
+        help="lança a diferença no histórico como conciliação",
+    )
+    estoque.set_defaults(funcao=comando_estoque)
+
+    nomes = comandos.add_parser("nomes", help=comando_nomes.__doc__)
+    nomes.add_argument(
+        "--reparar",
+        action="store_true",
+        help="mescla cada grupo no produto mais antigo e cria o índice único",
+    )
+    nomes.set_defaults(funcao=comando_nomes)
+
+    vendas = comandos.add_parser("vendas", help=comando_vendas.__doc__)
+    vendas.set_defaults(funcao=comando_vendas)
+
+    args = parser.parse_args(argv)
+    configurar_por_argumentos(args)
+    inicializar_db()
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
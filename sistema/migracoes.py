@@ -0,0 +1,807 @@
+"""
+Migrações - Sistema Arvoredo
+Migrações numeradas do esquema, controladas por PRAGMA user_version
+"""
+
+import logging
+import sqlite3
+from typing import List, Sequence, Tuple
+
+from conexao import conexao, transacao
+from datas import agora
+from texto import normalizar_nome
+
+logger = logging.getLogger(__name__)
+
+# Tamanho do lote (em ids) das migrações que reescrevem dados
+TAMANHO_LOTE = 5000
+
+# Colunas de data gravadas como DD/MM/AAAA [HH:MM] até a migração 1
+COLUNAS_DATA = (
+    ("pedidos", "data_hora"),
+    ("historico_movimentacao", "data_hora"),
+    ("produtos", "data_criacao"),
+    ("produto_marcas", "data_cadastro"),
+    ("produto_marcas", "data_validade"),
+    ("clientes", "data_criacao"),
+)
+
+
+def _criar_tabelas(conn: sqlite3.Connection):
+    """Cria as tabelas base (bancos anteriores às migrações já as têm)"""
+    # Tabela de produtos (agrupados por nome)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            quantidade_total INTEGER DEFAULT 0,
+            valor_total REAL DEFAULT 0,
+            data_criacao TEXT
+        )
+    """
+    )
+
+    # Tabela de variações de produtos por marca
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS produto_marcas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            codigo TEXT UNIQUE,
+            marca TEXT NOT NULL,
+            preco_unitario REAL NOT NULL,
+            quantidade INTEGER DEFAULT 0,
+            data_cadastro TEXT,
+            data_validade TEXT,
+            FOREIGN KEY (produto_id) REFERENCES produtos(id)
+        )
+    """
+    )
+
+    # Tabela de histórico de entrada/saída
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS historico_movimentacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_marca_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            data_hora TEXT,
+            motivo TEXT,
+            FOREIGN KEY (produto_marca_id) REFERENCES produto_marcas(id)
+        )
+    """
+    )
+
+    # Tabela de clientes
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            apelido TEXT,
+            cpf TEXT,
+            fiando INTEGER DEFAULT 0,
+            data_criacao TEXT
+        )
+    """
+    )
+
+    # Tabela de pedidos
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pedidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            data_hora TEXT,
+            status TEXT DEFAULT 'pendente',
+            total REAL DEFAULT 0,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+        )
+    """
+    )
+
+    # Tabela de itens do pedido
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pedido_itens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pedido_id INTEGER NOT NULL,
+            produto_marca_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL,
+            preco_unitario REAL NOT NULL,
+            subtotal REAL NOT NULL,
+            observacao TEXT,
+            FOREIGN KEY (pedido_id) REFERENCES pedidos(id),
+            FOREIGN KEY (produto_marca_id) REFERENCES produto_marcas(id)
+        )
+    """
+    )
+
+    # Bancos antigos foram criados antes da coluna data_validade
+    colunas = {
+        linha["name"]
+        for linha in conn.execute("PRAGMA table_info(produto_marcas)").fetchall()
+    }
+    if "data_validade" not in colunas:
+        conn.execute("ALTER TABLE produto_marcas ADD COLUMN data_validade TEXT")
+
+
+def _converter_datas_coluna(conn: sqlite3.Connection, tabela: str, coluna: str):
+    """Reescreve DD/MM/AAAA [HH:MM] como AAAA-MM-DD [HH:MM], em lotes por id"""
+    menor, maior = conn.execute(f"SELECT MIN(id), MAX(id) FROM {tabela}").fetchone()
+    if menor is None:
+        return
+    inicio = menor - 1
+    while inicio < maior:
+        fim = inicio + TAMANHO_LOTE
+        conn.execute(
+            f"""UPDATE {tabela}
+                SET {coluna} = substr({coluna}, 7, 4) || '-' || substr({coluna}, 4, 2)
+                               || '-' || substr({coluna}, 1, 2) || substr({coluna}, 11)
+                WHERE id > ? AND id <= ?
+                  AND {coluna} GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*'""",
+            (inicio, fim),
+        )
+        inicio = fim
+
+
+def _migracao_esquema_base(conn: sqlite3.Connection):
+    """Tabelas base, datas em ISO-8601 e índices para consultas por período"""
+    _criar_tabelas(conn)
+
+    for tabela, coluna in COLUNAS_DATA:
+        _converter_datas_coluna(conn, tabela, coluna)
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_pedidos_data_hora ON pedidos(data_hora)"
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_pedidos_cliente_data
+           ON pedidos(cliente_id, data_hora)"""
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_historico_marca_data
+           ON historico_movimentacao(produto_marca_id, data_hora)"""
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_produto_marcas_validade
+           ON produto_marcas(data_validade)"""
+    )
+
+
+def _migracao_indices(conn: sqlite3.Connection):
+    """Índices das chaves estrangeiras e da busca por nome"""
+    # pedidos(cliente_id) já é coberto por idx_pedidos_cliente_data e
+    # historico_movimentacao(produto_marca_id, data_hora) pela migração 1
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_produto_marcas_produto
+           ON produto_marcas(produto_id)"""
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_pedido_itens_pedido
+           ON pedido_itens(pedido_id)"""
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_pedido_itens_marca
+           ON pedido_itens(produto_marca_id)"""
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_produtos_nome
+           ON produtos(nome COLLATE NOCASE)"""
+    )
+
+
+def _migracao_agregados_produtos(conn: sqlite3.Connection):
+    """Totais de produtos mantidos por triggers sobre produto_marcas"""
+    conn.execute("ALTER TABLE produtos ADD COLUMN total_marcas INTEGER DEFAULT 0")
+
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produto_marcas_agregados_insert
+        AFTER INSERT ON produto_marcas
+        BEGIN
+            UPDATE produtos
+            SET total_marcas = total_marcas + 1,
+                quantidade_total = quantidade_total + COALESCE(NEW.quantidade, 0),
+                valor_total = valor_total
+                              + COALESCE(NEW.quantidade, 0) * NEW.preco_unitario
+            WHERE id = NEW.produto_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produto_marcas_agregados_delete
+        AFTER DELETE ON produto_marcas
+        BEGIN
+            UPDATE produtos
+            SET total_marcas = total_marcas - 1,
+                quantidade_total = quantidade_total - COALESCE(OLD.quantidade, 0),
+                valor_total = valor_total
+                              - COALESCE(OLD.quantidade, 0) * OLD.preco_unitario
+            WHERE id = OLD.produto_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produto_marcas_agregados_update
+        AFTER UPDATE OF produto_id, quantidade, preco_unitario ON produto_marcas
+        BEGIN
+            UPDATE produtos
+            SET total_marcas = total_marcas - 1,
+                quantidade_total = quantidade_total - COALESCE(OLD.quantidade, 0),
+                valor_total = valor_total
+                              - COALESCE(OLD.quantidade, 0) * OLD.preco_unitario
+            WHERE id = OLD.produto_id;
+            UPDATE produtos
+            SET total_marcas = total_marcas + 1,
+                quantidade_total = quantidade_total + COALESCE(NEW.quantidade, 0),
+                valor_total = valor_total
+                              + COALESCE(NEW.quantidade, 0) * NEW.preco_unitario
+            WHERE id = NEW.produto_id;
+        END
+    """
+    )
+
+    recalcular_agregados_produtos(conn)
+
+
+def recalcular_agregados_produtos(conn: sqlite3.Connection):
+    """Recalcula em lote os totais de todos os produtos a partir das marcas"""
+    conn.execute(
+        """
+        UPDATE produtos
+        SET total_marcas = (
+                SELECT COUNT(*) FROM produto_marcas pm WHERE pm.produto_id = produtos.id
+            ),
+            quantidade_total = (
+                SELECT COALESCE(SUM(pm.quantidade), 0)
+                FROM produto_marcas pm WHERE pm.produto_id = produtos.id
+            ),
+            valor_total = (
+                SELECT COALESCE(SUM(pm.quantidade * pm.preco_unitario), 0)
+                FROM produto_marcas pm WHERE pm.produto_id = produtos.id
+            )
+    """
+    )
+
+
+def _migracao_nome_normalizado(conn: sqlite3.Connection):
+    """Nome normalizado (sem caixa e acentos) único por produto"""
+    conn.create_function("normalizar_nome", 1, normalizar_nome, deterministic=True)
+    conn.execute("ALTER TABLE produtos ADD COLUMN nome_normalizado TEXT")
+    conn.execute("UPDATE produtos SET nome_normalizado = normalizar_nome(nome)")
+
+    # Produtos repetidos (ex.: "Açúcar" e "acucar") não são mesclados aqui:
+    # o índice fica sem UNIQUE até o reparo explícito (manutencao.py nomes)
+    duplicados = listar_nomes_duplicados(conn)
+    if not duplicados:
+        criar_indice_nome_unico(conn)
+        return
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_produtos_nome_normalizado
+           ON produtos(nome_normalizado)"""
+    )
+    logger.warning(
+        "%d nome(s) de produto repetido(s): %s. Renomeie os produtos ou rode "
+        "'python manutencao.py nomes --reparar' para mesclá-los",
+        len(duplicados),
+        "; ".join(grupo["nomes"] for grupo in duplicados),
+    )
+
+
+def listar_nomes_duplicados(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+    """Grupos de produtos com o mesmo nome normalizado (ids e nomes, do mais antigo)"""
+    return conn.execute(
+        """SELECT nome_normalizado, MIN(id) as manter,
+                  GROUP_CONCAT(id) as ids, GROUP_CONCAT(nome, ' / ') as nomes
+           FROM (SELECT id, nome, nome_normalizado FROM produtos ORDER BY id)
+           GROUP BY nome_normalizado
+           HAVING COUNT(*) > 1
+           ORDER BY nome_normalizado"""
+    ).fetchall()
+
+
+def mesclar_nomes_duplicados(conn: sqlite3.Connection) -> Tuple[List[int], List[int]]:
+    """Mescla produtos de mesmo nome normalizado no mais antigo e cria o índice único.
+
+    As marcas dos repetidos passam para o produto mantido e os repetidos são
+    removidos. Retorna (ids removidos, ids das marcas movidas).
+    """
+    removidos, marcas = [], []
+    for grupo in listar_nomes_duplicados(conn):
+        remover = [int(i) for i in grupo["ids"].split(",") if int(i) != grupo["manter"]]
+        marcadores = ", ".join("?" * len(remover))
+        marcas += [
+            linha[0]
+            for linha in conn.execute(
+                f"""UPDATE produto_marcas SET produto_id = ?
+                    WHERE produto_id IN ({marcadores}) RETURNING id""",
+                (grupo["manter"], *remover),
+            ).fetchall()
+        ]
+        conn.execute(f"DELETE FROM produtos WHERE id IN ({marcadores})", remover)
+        removidos += remover
+    criar_indice_nome_unico(conn)
+    return removidos, marcas
+
+
+def criar_indice_nome_unico(conn: sqlite3.Connection):
+    """(Re)cria idx_produtos_nome_normalizado como UNIQUE; exige nomes sem repetição"""
+    conn.execute("DROP INDEX IF EXISTS idx_produtos_nome_normalizado")
+    conn.execute(
+        """CREATE UNIQUE INDEX idx_produtos_nome_normalizado
+           ON produtos(nome_normalizado)"""
+    )
+
+
+def _migracao_busca_produtos(conn: sqlite3.Connection):
+    """Índice FTS5 de busca por nome, categoria, marca e código"""
+    # Uma linha por marca (rowid = produto_marcas.id); remove_diacritics
+    # faz "acucar" encontrar "Açúcar" e prefix acelera a busca enquanto digita
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS busca_produtos USING fts5(
+            nome, categoria, marca, codigo,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '2 3'
+        )
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produto_marcas_busca_insert
+        AFTER INSERT ON produto_marcas
+        BEGIN
+            INSERT INTO busca_produtos (rowid, nome, categoria, marca, codigo)
+            SELECT NEW.id, p.nome, p.categoria, NEW.marca, NEW.codigo
+            FROM produtos p WHERE p.id = NEW.produto_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produto_marcas_busca_delete
+        AFTER DELETE ON produto_marcas
+        BEGIN
+            DELETE FROM busca_produtos WHERE rowid = OLD.id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produto_marcas_busca_update
+        AFTER UPDATE OF produto_id, marca, codigo ON produto_marcas
+        BEGIN
+            DELETE FROM busca_produtos WHERE rowid = OLD.id;
+            INSERT INTO busca_produtos (rowid, nome, categoria, marca, codigo)
+            SELECT NEW.id, p.nome, p.categoria, NEW.marca, NEW.codigo
+            FROM produtos p WHERE p.id = NEW.produto_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produtos_busca_update
+        AFTER UPDATE OF nome, categoria ON produtos
+        BEGIN
+            UPDATE busca_produtos SET nome = NEW.nome, categoria = NEW.categoria
+            WHERE rowid IN (SELECT id FROM produto_marcas WHERE produto_id = NEW.id);
+        END
+    """
+    )
+    reconstruir_busca_produtos(conn)
+
+
+def reconstruir_busca_produtos(conn: sqlite3.Connection):
+    """Recria todo o conteúdo do índice de busca a partir das tabelas"""
+    conn.execute("DELETE FROM busca_produtos")
+    conn.execute(
+        """
+        INSERT INTO busca_produtos (rowid, nome, categoria, marca, codigo)
+        SELECT pm.id, p.nome, p.categoria, pm.marca, pm.codigo
+        FROM produto_marcas pm
+        JOIN produtos p ON pm.produto_id = p.id
+    """
+    )
+
+
+def _migracao_exportacoes(conn: sqlite3.Connection):
+    """Índice de histórico por data e controle de exportações incrementais"""
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_historico_data_hora
+           ON historico_movimentacao(data_hora)"""
+    )
+    # Último id exportado de cada conjunto (modo "desde a última exportação")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS exportacoes (
+            conjunto TEXT PRIMARY KEY,
+            ultimo_id INTEGER NOT NULL,
+            data_hora TEXT
+        )
+    """
+    )
+
+
+def _migracao_vendas_diarias(conn: sqlite3.Connection):
+    """Vendas por dia e marca mantidas por triggers sobre pedido_itens"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vendas_diarias (
+            dia TEXT NOT NULL,
+            produto_marca_id INTEGER NOT NULL,
+            itens INTEGER NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            receita REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, produto_marca_id)
+        ) WITHOUT ROWID
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedido_itens_vendas_insert
+        AFTER INSERT ON pedido_itens
+        BEGIN
+            INSERT INTO vendas_diarias (dia, produto_marca_id, itens, quantidade, receita)
+            SELECT substr(pe.data_hora, 1, 10), NEW.produto_marca_id, 1,
+                   NEW.quantidade, NEW.subtotal
+            FROM pedidos pe WHERE pe.id = NEW.pedido_id
+            ON CONFLICT (dia, produto_marca_id) DO UPDATE SET
+                itens = itens + 1,
+                quantidade = quantidade + excluded.quantidade,
+                receita = receita + excluded.receita;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedido_itens_vendas_delete
+        AFTER DELETE ON pedido_itens
+        BEGIN
+            UPDATE vendas_diarias
+            SET itens = itens - 1,
+                quantidade = quantidade - OLD.quantidade,
+                receita = receita - OLD.subtotal
+            WHERE produto_marca_id = OLD.produto_marca_id
+              AND dia = (SELECT substr(data_hora, 1, 10) FROM pedidos WHERE id = OLD.pedido_id);
+            DELETE FROM vendas_diarias WHERE itens <= 0
+              AND produto_marca_id = OLD.produto_marca_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedido_itens_vendas_update
+        AFTER UPDATE OF pedido_id, produto_marca_id, quantidade, subtotal ON pedido_itens
+        BEGIN
+            UPDATE vendas_diarias
+            SET itens = itens - 1,
+                quantidade = quantidade - OLD.quantidade,
+                receita = receita - OLD.subtotal
+            WHERE produto_marca_id = OLD.produto_marca_id
+              AND dia = (SELECT substr(data_hora, 1, 10) FROM pedidos WHERE id = OLD.pedido_id);
+            DELETE FROM vendas_diarias WHERE itens <= 0
+              AND produto_marca_id = OLD.produto_marca_id;
+            INSERT INTO vendas_diarias (dia, produto_marca_id, itens, quantidade, receita)
+            SELECT substr(pe.data_hora, 1, 10), NEW.produto_marca_id, 1,
+                   NEW.quantidade, NEW.subtotal
+            FROM pedidos pe WHERE pe.id = NEW.pedido_id
+            ON CONFLICT (dia, produto_marca_id) DO UPDATE SET
+                itens = itens + 1,
+                quantidade = quantidade + excluded.quantidade,
+                receita = receita + excluded.receita;
+        END
+    """
+    )
+    # Pedido mudou de dia: os itens passam para o dia novo
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedidos_vendas_data
+        AFTER UPDATE OF data_hora ON pedidos
+        WHEN substr(OLD.data_hora, 1, 10) IS NOT substr(NEW.data_hora, 1, 10)
+        BEGIN
+            UPDATE vendas_diarias
+            SET itens = vendas_diarias.itens - t.itens,
+                quantidade = vendas_diarias.quantidade - t.quantidade,
+                receita = vendas_diarias.receita - t.receita
+            FROM (
+                SELECT produto_marca_id, COUNT(*) as itens,
+                       SUM(quantidade) as quantidade, SUM(subtotal) as receita
+                FROM pedido_itens WHERE pedido_id = NEW.id
+                GROUP BY produto_marca_id
+            ) as t
+            WHERE vendas_diarias.dia = substr(OLD.data_hora, 1, 10)
+              AND vendas_diarias.produto_marca_id = t.produto_marca_id;
+            DELETE FROM vendas_diarias
+            WHERE dia = substr(OLD.data_hora, 1, 10) AND itens <= 0;
+            INSERT INTO vendas_diarias (dia, produto_marca_id, itens, quantidade, receita)
+            SELECT substr(NEW.data_hora, 1, 10), produto_marca_id, COUNT(*),
+                   SUM(quantidade), SUM(subtotal)
+            FROM pedido_itens WHERE pedido_id = NEW.id
+            GROUP BY produto_marca_id
+            ON CONFLICT (dia, produto_marca_id) DO UPDATE SET
+                itens = itens + excluded.itens,
+                quantidade = quantidade + excluded.quantidade,
+                receita = receita + excluded.receita;
+        END
+    """
+    )
+    reconstruir_vendas_diarias(conn)
+
+
+def reconstruir_vendas_diarias(conn: sqlite3.Connection):
+    """Recria todo o resumo diário de vendas a partir dos pedidos"""
+    conn.execute("DELETE FROM vendas_diarias")
+    conn.execute(
+        """
+        INSERT INTO vendas_diarias (dia, produto_marca_id, itens, quantidade, receita)
+        SELECT substr(pe.data_hora, 1, 10), pi.produto_marca_id, COUNT(*),
+               SUM(pi.quantidade), SUM(pi.subtotal)
+        FROM pedido_itens pi
+        JOIN pedidos pe ON pi.pedido_id = pe.id
+        GROUP BY 1, 2
+    """
+    )
+
+
+def _migracao_saldos_clientes(conn: sqlite3.Connection):
+    """Pagamentos e conta corrente de clientes mantida por triggers"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pagamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            valor REAL NOT NULL,
+            data_hora TEXT,
+            observacao TEXT,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+        )
+    """
+    )
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_pagamentos_cliente_data
+           ON pagamentos(cliente_id, data_hora)"""
+    )
+
+    conn.execute("ALTER TABLE clientes ADD COLUMN total_pedidos INTEGER DEFAULT 0")
+    conn.execute("ALTER TABLE clientes ADD COLUMN total_comprado REAL DEFAULT 0")
+    conn.execute("ALTER TABLE clientes ADD COLUMN total_pago REAL DEFAULT 0")
+    conn.execute("ALTER TABLE clientes ADD COLUMN saldo_aberto REAL DEFAULT 0")
+    conn.execute("ALTER TABLE clientes ADD COLUMN ultima_compra TEXT")
+
+    # Só pedidos de clientes de fiado viram saldo em aberto
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedidos_saldo_insert
+        AFTER INSERT ON pedidos
+        BEGIN
+            UPDATE clientes
+            SET total_pedidos = total_pedidos + 1,
+                total_comprado = total_comprado + COALESCE(NEW.total, 0),
+                saldo_aberto = saldo_aberto + fiando * COALESCE(NEW.total, 0),
+                ultima_compra = MAX(COALESCE(ultima_compra, ''), NEW.data_hora)
+            WHERE id = NEW.cliente_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedidos_saldo_delete
+        AFTER DELETE ON pedidos
+        BEGIN
+            UPDATE clientes
+            SET total_pedidos = total_pedidos - 1,
+                total_comprado = total_comprado - COALESCE(OLD.total, 0),
+                saldo_aberto = saldo_aberto - fiando * COALESCE(OLD.total, 0),
+                ultima_compra = (
+                    SELECT MAX(data_hora) FROM pedidos WHERE cliente_id = OLD.cliente_id
+                )
+            WHERE id = OLD.cliente_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pedidos_saldo_update
+        AFTER UPDATE OF cliente_id, total, data_hora ON pedidos
+        BEGIN
+            UPDATE clientes
+            SET total_pedidos = total_pedidos - 1,
+                total_comprado = total_comprado - COALESCE(OLD.total, 0),
+                saldo_aberto = saldo_aberto - fiando * COALESCE(OLD.total, 0)
+            WHERE id = OLD.cliente_id;
+            UPDATE clientes
+            SET total_pedidos = total_pedidos + 1,
+                total_comprado = total_comprado + COALESCE(NEW.total, 0),
+                saldo_aberto = saldo_aberto + fiando * COALESCE(NEW.total, 0)
+            WHERE id = NEW.cliente_id;
+            UPDATE clientes
+            SET ultima_compra = (
+                SELECT MAX(data_hora) FROM pedidos WHERE cliente_id = clientes.id
+            )
+            WHERE id IN (OLD.cliente_id, NEW.cliente_id);
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_saldo_insert
+        AFTER INSERT ON pagamentos
+        BEGIN
+            UPDATE clientes
+            SET total_pago = total_pago + NEW.valor,
+                saldo_aberto = saldo_aberto - NEW.valor
+            WHERE id = NEW.cliente_id;
+        END
+    """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_pagamentos_saldo_delete
+        AFTER DELETE ON pagamentos
+        BEGIN
+            UPDATE clientes
+            SET total_pago = total_pago - OLD.valor,
+                saldo_aberto = saldo_aberto + OLD.valor
+            WHERE id = OLD.cliente_id;
+        END
+    """
+    )
+
+    recalcular_saldos_clientes(conn)
+
+
+def recalcular_saldos_clientes(conn: sqlite3.Connection):
+    """Recalcula em lote a conta corrente de todos os clientes.
+
+    O saldo em aberto considera o fiando atual do cliente para todos os
+    seus pedidos.
+    """
+    conn.execute(
+        """
+        UPDATE clientes
+        SET total_pedidos = COALESCE(pe.quantidade, 0),
+            total_comprado = COALESCE(pe.total, 0),
+            ultima_compra = pe.ultima,
+            total_pago = COALESCE(pg.total, 0),
+            saldo_aberto = clientes.fiando * COALESCE(pe.total, 0) - COALESCE(pg.total, 0)
+        FROM (SELECT id FROM clientes) c
+        LEFT JOIN (
+            SELECT cliente_id, COUNT(*) as quantidade, SUM(total) as total,
+                   MAX(data_hora) as ultima
+            FROM pedidos GROUP BY cliente_id
+        ) pe ON pe.cliente_id = c.id
+        LEFT JOIN (
+            SELECT cliente_id, SUM(valor) as total FROM pagamentos GROUP BY cliente_id
+        ) pg ON pg.cliente_id = c.id
+        WHERE clientes.id = c.id
+    """
+    )
+
+
+def _migracao_resumo_clientes(conn: sqlite3.Connection):
+    """Índice de pedidos por cliente que cobre os totais da lista de clientes"""
+    # Mesmo prefixo (cliente_id, data_hora): substitui o índice antigo
+    conn.execute(
+        """CREATE INDEX IF NOT EXISTS idx_pedidos_cliente_data_total
+           ON pedidos(cliente_id, data_hora, total)"""
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_pedidos_cliente_data")
+
+
+# Saldo de uma marca `pm` pelo histórico: entradas menos saídas
+SALDO_HISTORICO = """COALESCE((
+    SELECT SUM(CASE h.tipo WHEN 'entrada' THEN h.quantidade ELSE -h.quantidade END)
+    FROM historico_movimentacao h
+    WHERE h.produto_marca_id = pm.id
+), 0)"""
+
+
+def conciliar_historico_estoque(
+    conn: sqlite3.Connection,
+    motivo: str,
+    data_hora: str,
+    filtro: str = "",
+    parametros: Sequence = (),
+) -> List[int]:
+    """Lança no histórico a diferença entre o estoque e o saldo do histórico.
+
+    `filtro` é uma condição sobre `pm` (produto_marcas) que restringe as
+    marcas conciliadas. Retorna os ids das movimentações inseridas.
+    """
+    where = f"WHERE {filtro}" if filtro else ""
+    return [
+        linha[0]
+        for linha in conn.execute(
+            f"""
+            INSERT INTO historico_movimentacao
+                (produto_marca_id, tipo, quantidade, data_hora, motivo)
+            SELECT id, CASE WHEN diferenca > 0 THEN 'entrada' ELSE 'saida' END,
+                   ABS(diferenca), ?, ?
+            FROM (
+                SELECT pm.id, pm.quantidade - {SALDO_HISTORICO} as diferenca
+                FROM produto_marcas pm
+                {where}
+            )
+            WHERE diferenca != 0
+            RETURNING id
+        """,
+            (data_hora, motivo, *parametros),
+        ).fetchall()
+    ]
+
+
+def _migracao_saldo_inicial_estoque(conn: sqlite3.Connection):
+    """Saldo inicial no histórico para o estoque gravado sem movimentação"""
+    conciliar_historico_estoque(conn, "Saldo inicial", agora())
+
+
+def remover_historico_orfao(conn: sqlite3.Connection) -> List[int]:
+    """Remove movimentações de marcas que não existem mais; retorna os ids"""
+    return [
+        linha[0]
+        for linha in conn.execute(
+            """
+            DELETE FROM historico_movimentacao
+            WHERE produto_marca_id NOT IN (SELECT id FROM produto_marcas)
+            RETURNING id
+        """
+        ).fetchall()
+    ]
+
+
+def _migracao_historico_orfao(conn: sqlite3.Connection):
+    """Histórico de marcas já deletadas, deixado por versões sem chaves estrangeiras"""
+    # Sem foreign_keys, deletar uma marca mantinha o histórico dela; com as
+    # chaves ativas essas linhas violam a restrição e nenhuma tela as lê
+    remover_historico_orfao(conn)
+
+
+# (versão, descrição, função) - nunca renumerar migrações já publicadas
+MIGRACOES = [
+    (1, "esquema base e datas em ISO-8601", _migracao_esquema_base),
+    (2, "índices de chaves estrangeiras e nome", _migracao_indices),
+    (3, "totais de produtos mantidos por triggers", _migracao_agregados_produtos),
+    (4, "nome normalizado único de produtos", _migracao_nome_normalizado),
+    (5, "busca textual de produtos (FTS5)", _migracao_busca_produtos),
+    (6, "exportações incrementais", _migracao_exportacoes),
+    (7, "resumo diário de vendas", _migracao_vendas_diarias),
+    (8, "conta corrente de clientes", _migracao_saldos_clientes),
+    (9, "índice de cobertura dos pedidos por cliente", _migracao_resumo_clientes),
+    (10, "saldo inicial do estoque no histórico", _migracao_saldo_inicial_estoque),
+    (11, "histórico de marcas deletadas", _migracao_historico_orfao),
+]
+
+VERSAO_ESQUEMA = MIGRACOES[-1][0]
+
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    """Versão do esquema gravada no banco"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes() -> int:
+    """Aplica as migrações pendentes, cada uma na sua própria transação.
+
+    Com o banco já na versão atual só lê o user_version (partida a quente).
+    Retorna quantas migrações foram aplicadas.
+    """
+    with conexao() as conn:
+        if versao_atual(conn) >= VERSAO_ESQUEMA:
+            return 0
+
+    aplicadas = 0
+    for numero, _descricao, migracao in MIGRACOES:
+        with transacao() as conn:
+            # Relido com o lock de escrita: outro processo pode ter migrado
+            if versao_atual(conn) >= numero:
+                continue
+            migracao(conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+        aplicadas += 1
+    return aplicadas
@@ -0,0 +1,365 @@
+"""
+Perfil - Sistema Arvoredo
+Medição das funções de acesso a dados e das instruções SQL
+
+Ligado pela variável de ambiente ARVOREDO_PERFIL=1, lida ao importar o
+módulo. Desligado, nenhuma função é embrulhada e o pool usa conexões
+sqlite3 comuns: não há custo nenhum por chamada.
+
+    ARVOREDO_PERFIL=1                          liga a coleta
+    ARVOREDO_PERFIL_LIMIAR_MS=100              instruções a partir deste tempo
+                                               vão para o log de consultas
+                                               lentas, com o EXPLAIN QUERY PLAN
+    ARVOREDO_PERFIL_LOG=consultas_lentas.log   arquivo do log (rotativo)
+
+Para cada função pública de database.py e cada instrução SQL executada pelo
+pool são contados chamadas, tempo total, p50/p95/p99 e linhas retornadas.
+`relatorio()` devolve os números a qualquer momento; ao encerrar o processo
+eles são gravados no log.
+"""
+
+import atexit
+import functools
+import inspect
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional, Tuple
+
+ATIVO = os.environ.get("ARVOREDO_PERFIL", "") not in ("", "0")
+LIMIAR_MS = float(os.environ.get("ARVOREDO_PERFIL_LIMIAR_MS", "100"))
+ARQUIVO_LOG = os.environ.get("ARVOREDO_PERFIL_LOG", "consultas_lentas.log")
+TAMANHO_LOG = 1_000_000  # bytes por arquivo antes de rotacionar
+ARQUIVOS_LOG = 3
+
+# Latências guardadas por função/instrução (as mais recentes) para os percentis
+AMOSTRAS = 2048
+
+FUNCAO = "funcao"
+SQL = "sql"
+
+logger = logging.getLogger(__name__)
+_log_lentas = logging.getLogger(f"{__name__}.consultas_lentas")
+_log_lentas.propagate = False
+
+
+class Estatistica:
+    """Números acumulados de uma função ou instrução"""
+
+    __slots__ = ("chamadas", "linhas", "segundos", "amostras")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.linhas = 0
+        self.segundos = 0.0
+        self.amostras = deque(maxlen=AMOSTRAS)
+
+    def percentil(self, p: float) -> float:
+        """Percentil `p` (0-100) das amostras, em ms (posto mais próximo)"""
+        ordenadas = sorted(self.amostras)
+        if not ordenadas:
+            return 0.0
+        posto = max(0, min(len(ordenadas) - 1, round(p / 100 * len(ordenadas)) - 1))
+        return ordenadas[posto] * 1000
+
+
+_estatisticas: Dict[Tuple[str, str], Estatistica] = {}
+_trava = threading.Lock()
+
+
+def registrar(tipo: str, nome: str, segundos: float, linhas: Optional[int] = None):
+    """Acumula uma medição de `tipo` (FUNCAO ou SQL)"""
+    with _trava:
+        estatistica = _estatisticas.get((tipo, nome))
+        if estatistica is None:
+            estatistica = _estatisticas[(tipo, nome)] = Estatistica()
+        estatistica.chamadas += 1
+        estatistica.segundos += segundos
+        estatistica.linhas += linhas or 0
+        estatistica.amostras.append(segundos)
+
+
+def relatorio(tipo: Optional[str] = None) -> List[dict]:
+    """Estatísticas coletadas, da maior para a menor soma de tempo"""
+    with _trava:
+        itens = [
+            (chave, estatistica)
+            for chave, estatistica in _estatisticas.items()
+            if tipo is None or chave[0] == tipo
+        ]
+        linhas = [
+            {
+                "tipo": chave[0],
+                "nome": chave[1],
+                "chamadas": estatistica.chamadas,
+                "total_ms": estatistica.segundos * 1000,
+                "p50_ms": estatistica.percentil(50),
+                "p95_ms": estatistica.percentil(95),
+                "p99_ms": estatistica.percentil(99),
+                "linhas": estatistica.linhas,
+            }
+            for chave, estatistica in itens
+        ]
+    return sorted(linhas, key=lambda linha: linha["total_ms"], reverse=True)
+
+
+def limpar():
+    """Descarta as estatísticas coletadas"""
+    with _trava:
+        _estatisticas.clear()
+
+
+def formatar_relatorio(limite: int = 30) -> str:
+    """Relatório em texto: as `limite` entradas mais caras de cada tipo"""
+    partes = []
+    for tipo, titulo in ((FUNCAO, "Funções"), (SQL, "Instruções SQL")):
+        partes.append(
+            f"{titulo}:\n{'chamadas':>9} {'total ms':>10} {'p50':>8} {'p95':>8} "
+            f"{'p99':>8} {'linhas':>9}  nome"
+        )
+        for linha in relatorio(tipo)[:limite]:
+            partes.append(
+                f"{linha['chamadas']:>9} {linha['total_ms']:>10.1f} "
+                f"{linha['p50_ms']:>8.2f} {linha['p95_ms']:>8.2f} "
+                f"{linha['p99_ms']:>8.2f} {linha['linhas']:>9}  {linha['nome'][:120]}"
+            )
+    return "\n".join(partes)
+
+
+# ===== FUNÇÕES DE ACESSO A DADOS =====
+
+
+def _contar_linhas(resultado) -> Optional[int]:
+    """Linhas de uma lista de registros; 1 para um registro só (obter_*)"""
+    if isinstance(resultado, list):
+        return len(resultado)
+    if isinstance(resultado, (dict, sqlite3.Row)):
+        return 1
+    return None
+
+
+def medir(funcao, nome: Optional[str] = None):
+    """Embrulha `funcao` para registrar tempo e linhas de cada chamada"""
+    nome = nome or f"{funcao.__module__}.{funcao.__qualname__}"
+
+    @functools.wraps(funcao)
+    def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        registrar(FUNCAO, nome, time.perf_counter() - inicio, _contar_linhas(resultado))
+        return resultado
+
+    return medida
+
+
+def instrumentar_modulo(modulo):
+    """Embrulha as funções públicas definidas no módulo (só com o perfil ligado)"""
+    if not ATIVO:
+        return
+    for nome, objeto in list(vars(modulo).items()):
+        if (
+            not nome.startswith("_")
+            and inspect.isfunction(objeto)
+            and objeto.__module__ == modulo.__name__
+        ):
+            setattr(modulo, nome, medir(objeto, f"{modulo.__name__}.{nome}"))
+
+
+# ===== INSTRUÇÕES SQL =====
+
+_ESPACOS = re.compile(r"\s+")
+_LISTA_PARAMETROS = re.compile(r"\?(?:\s*,\s*\?)+")
+_COM_PLANO = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+
+def normalizar_sql(sql: str) -> str:
+    """Uma chave por instrução: espaços colapsados e listas IN (?, ?, ...) unidas"""
+    return _LISTA_PARAMETROS.sub("?, ...", _ESPACOS.sub(" ", sql).strip())
+
+
+def _configurar_log():
+    if not _log_lentas.handlers:
+        manipulador = RotatingFileHandler(
+            ARQUIVO_LOG, maxBytes=TAMANHO_LOG, backupCount=ARQUIVOS_LOG, encoding="utf-8"
+        )
+        manipulador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _log_lentas.addHandler(manipulador)
+        _log_lentas.setLevel(logging.INFO)
+
+
+def plano_consulta(conn: sqlite3.Connection, sql: str, parametros=()) -> str:
+    """EXPLAIN QUERY PLAN da instrução, indentado como a árvore do SQLite"""
+    profundidade = {0: -1}
+    linhas = []
+    for id_no, pai, _, detalhe in sqlite3.Connection.execute(
+        conn, f"EXPLAIN QUERY PLAN {sql}", parametros
+    ).fetchall():
+        profundidade[id_no] = profundidade.get(pai, -1) + 1
+        linhas.append(f"{'  ' * profundidade[id_no]}{detalhe}")
+    return "\n".join(linhas)
+
+
+def _plano_lento(conn, sql, parametros) -> str:
+    """Plano de uma instrução lenta; só com a conexão ainda emprestada"""
+    if not _COM_PLANO.match(sql):
+        return ""
+    try:
+        return plano_consulta(conn, sql, parametros)
+    except sqlite3.Error as e:
+        return f"(sem plano: {e})"
+
+
+def _registrar_sql(sql, segundos, linhas, plano=""):
+    chave = normalizar_sql(sql)
+    registrar(SQL, chave, segundos, linhas)
+    if segundos * 1000 < LIMIAR_MS:
+        return
+    _configurar_log()
+    _log_lentas.warning(
+        "%.1f ms, %s linha(s): %s\n%s",
+        segundos * 1000,
+        "-" if linhas is None else linhas,
+        chave,
+        plano,
+    )
+
+
+class _CursorMedido:
+    """Cursor que soma o tempo das leituras ao da execução.
+
+    A medição é registrada quando as linhas acabam, o cursor é fechado ou
+    descartado; assim uma consulta lenta de ler também é contada. O plano
+    é lido assim que a instrução passa do limiar, ainda dentro de
+    execute/fetch*: descartado pelo coletor de lixo, o cursor não usa mais
+    a conexão, que pode já estar emprestada a outro código.
+    """
+
+    __slots__ = (
+        "_conn",
+        "_cursor",
+        "_sql",
+        "_parametros",
+        "_segundos",
+        "_linhas",
+        "_plano",
+    )
+
+    def __init__(self, conn, cursor, sql, parametros, segundos):
+        self._conn = conn
+        self._cursor = cursor
+        self._sql = sql
+        self._parametros = parametros
+        self._segundos = segundos
+        self._linhas = 0
+        self._plano = None
+        self._capturar_plano()
+
+    def _capturar_plano(self):
+        if (
+            self._plano is None
+            and self._sql is not None
+            and self._segundos * 1000 >= LIMIAR_MS
+        ):
+            self._plano = _plano_lento(self._conn, self._sql, self._parametros)
+
+    def _finalizar(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        self._conn = None
+        linhas = self._linhas or max(self._cursor.rowcount, 0)
+        _registrar_sql(sql, self._segundos, linhas, self._plano or "")
+
+    def _ler(self, leitura, *args):
+        inicio = time.perf_counter()
+        resultado = leitura(*args)
+        self._segundos += time.perf_counter() - inicio
+        self._capturar_plano()
+        return resultado
+
+    def fetchone(self):
+        linha = self._ler(self._cursor.fetchone)
+        if linha is None:
+            self._finalizar()
+        else:
+            self._linhas += 1
+        return linha
+
+    def fetchmany(self, tamanho=None):
+        tamanho = self._cursor.arraysize if tamanho is None else tamanho
+        linhas = self._ler(self._cursor.fetchmany, tamanho)
+        self._linhas += len(linhas)
+        if len(linhas) < tamanho:
+            self._finalizar()
+        return linhas
+
+    def fetchall(self):
+        linhas = self._ler(self._cursor.fetchall)
+        self._linhas += len(linhas)
+        self._finalizar()
+        return linhas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        linha = self.fetchone()
+        if linha is None:
+            raise StopIteration
+        return linha
+
+    def close(self):
+        self._finalizar()
+        self._cursor.close()
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __del__(self):
+        try:
+            self._finalizar()
+        except Exception:
+            pass
+
+
+class ConexaoMedida(sqlite3.Connection):
+    """Conexão que mede cada execute/executemany/commit"""
+
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        cursor = super().execute(sql, parametros)
+        return _CursorMedido(self, cursor, sql, parametros, time.perf_counter() - inicio)
+
+    def executemany(self, sql, sequencia):
+        inicio = time.perf_counter()
+        cursor = super().executemany(sql, sequencia)
+        _registrar_sql(sql, time.perf_counter() - inicio, max(cursor.rowcount, 0))
+        return cursor
+
+    def commit(self):
+        inicio = time.perf_counter()
+        super().commit()
+        _registrar_sql("COMMIT", time.perf_counter() - inicio, None)
+
+
+def classe_conexao():
+    """Classe das conexões abertas pelo pool"""
+    return ConexaoMedida if ATIVO else sqlite3.Connection
+
+
+def _gravar_relatorio():
+    if _estatisticas:
+        _configurar_log()
+        _log_lentas.info("Relatório do perfil:\n%s", formatar_relatorio())
+
+
+if ATIVO:
+    logger.info(
+        "Perfil ligado: consultas a partir de %.0f ms em %s", LIMIAR_MS, ARQUIVO_LOG
+    )
+    atexit.register(_gravar_relatorio)
@@ -0,0 +1,13 @@
+"""
+Texto - Sistema Arvoredo
+Normalização de nomes para comparação e busca
+"""
+
+import unicodedata
+
+
+def normalizar_nome(texto: str) -> str:
+    """Minúsculas, sem acentos e com espaços simples ("Pão  de Açúcar" -> "pao de acucar")"""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
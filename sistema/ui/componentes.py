@@ -2,6 +2,8 @@
 Componentes compartilhados e estilos globais
 """
 
+from contextlib import asynccontextmanager
+
 import flet as ft
 
 # ===== CORES GLOBAIS =====
@@ -18,6 +20,7 @@ def criar_header(page, mudar_tela_fn):
         "📊 Vendas": "vendas",
         "👥 Clientes": "clientes",
         "📋 Pedidos": "pedidos",
+        "📈 Painel": "dashboard",
     }
 
     botoes_row = ft.Row(
@@ -59,3 +62,22 @@ def criar_header(page, mudar_tela_fn):
     )
 
     return header
+
+
+def criar_indicador_carregamento():
+    """Barra fina exibida enquanto uma consulta da tela está rodando"""
+    return ft.ProgressBar(visible=False, color=COR_PRIMARIA, height=3, data=0)
+
+
+@asynccontextmanager
+async def carregando(page, indicador):
+    """Mostra o indicador durante o bloco (contando blocos simultâneos)"""
+    indicador.data = (indicador.data or 0) + 1
+    indicador.visible = True
+    page.update()
+    try:
+        yield
+    finally:
+        indicador.data -= 1
+        indicador.visible = indicador.data > 0
+        page.update()
@@ -0,0 +1,27 @@
+"""
+Registro de telas: construção sob demanda e cache de telas já montadas
+"""
+
+
+class RegistroTelas:
+    """Constrói cada tela na primeira navegação e a mantém em cache.
+
+    Telas já construídas não são recarregadas ao voltar para elas: cada uma
+    assina as alterações do banco (`database.assinar`) e se atualiza sozinha.
+    """
+
+    def __init__(self):
+        self._fabricas = {}
+        self._telas = {}
+
+    def registrar(self, nome, fabrica):
+        """Registra a fábrica da tela"""
+        self._fabricas[nome] = fabrica
+
+    def obter(self, nome):
+        """Retorna a tela, construindo-a na primeira chamada"""
+        tela = self._telas.get(nome)
+        if tela is None:
+            tela = self._fabricas[nome]()
+            self._telas[nome] = tela
+        return tela
@@ -3,17 +3,18 @@ Tela de Cadastro de Produtos
 """
 
 import flet as ft
+from banco_assincrono import bd
 from database import (
-    listar_produtos,
-    inserir_produto,
-    listar_marcas_produto,
-    inserir_marca_produto,
-    atualizar_quantidade_marca,
+    INSERCAO,
+    REMOCAO,
+    ATUALIZACAO,
+    assinar,
 )
-from ui.componentes import COR_PRIMARIA
+from datas import para_br
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
 
 
-def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
+def criar_tela_cadastro(page, mudar_tela_fn):
     """Tela para cadastrar novos produtos e suas marcas"""
 
     nome_prod = ft.TextField(label="Nome do Produto", width=300)
@@ -39,8 +40,9 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
     )
 
     msg_status = ft.Text("", color=ft.Colors.RED)
+    indicador = criar_indicador_carregamento()
 
-    def cadastrar(e):
+    async def cadastrar(e):
         if (
             not nome_prod.value
             or not categoria_dd.value
@@ -52,13 +54,8 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
             page.update()
             return
 
-        # Verificar se produto já existe
-        produtos = listar_produtos()
-        produto_existente = None
-        for prod in produtos:
-            if prod["nome"].lower() == nome_prod.value.lower():
-                produto_existente = prod
-                break
+        # Verificar se produto já existe (busca indexada pelo nome normalizado)
+        produto_existente = await bd.buscar_produto_por_nome(nome_prod.value)
 
         # Se existe, usa o ID dele; senão, cria novo
         if produto_existente:
@@ -68,7 +65,15 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
             )
             msg_status.color = ft.Colors.GREEN
         else:
-            sucesso, msg, prod_id = inserir_produto(nome_prod.value, categoria_dd.value)
+            sucesso, msg, prod_id = await bd.inserir_produto(
+                nome_prod.value, categoria_dd.value
+            )
+            if not sucesso:
+                # Outro cadastro pode ter criado o mesmo produto nesse meio tempo
+                produto_existente = await bd.buscar_produto_por_nome(nome_prod.value)
+                if produto_existente:
+                    prod_id = produto_existente["id"]
+                    sucesso = True
             if not sucesso:
                 msg_status.value = f"❌ {msg}"
                 msg_status.color = ft.Colors.RED
@@ -76,17 +81,16 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
                 return
 
         # Inserir marca do produto
-        sucesso2, msg2, marca_id = inserir_marca_produto(
+        sucesso2, msg2, marca_id = await bd.inserir_marca_produto(
             prod_id,
             codigo_marca.value or f"PROD{prod_id}",
             marca_nome.value,
             float(preco_un.value or 0),
             validade.value,
+            int(qtd_marca.value or 0),
         )
 
         if sucesso2 and marca_id != -1:
-            # Atualizar quantidade
-            atualizar_quantidade_marca(marca_id, int(qtd_marca.value or 0))
             msg_status.value = (
                 f"✅ Marca adicionada: {nome_prod.value} - {marca_nome.value}"
             )
@@ -100,8 +104,7 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
             qtd_marca.value = "0"
             codigo_marca.value = ""
             validade.value = ""
-
-            atualizar_fn()
+            # A lista é atualizada pelas alterações publicadas (ver ao_alterar_produtos)
         else:
             msg_status.value = f"❌ {msg2}"
             msg_status.color = ft.Colors.RED
@@ -115,67 +118,121 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
         """Navega para tela de editar com produto selecionado"""
         mudar_tela_fn("editar")
 
-    def atualizar_lista():
-        produtos_list.controls.clear()
-        produtos = listar_produtos()
-        # Ordenar produtos em ordem decrescente (últimos adicionados primeiro)
-        produtos_ordenados = sorted(produtos, key=lambda x: x["id"], reverse=True)
-        for prod in produtos_ordenados:
-            marcas = listar_marcas_produto(prod["id"])
-            marcas_texto = ", ".join(
-                [f"{m['marca']} ({m['quantidade']})" for m in marcas]
-            )
+    # Cartão exibido de cada produto, pelo id (lista em ordem decrescente de id)
+    cartoes = {}
 
-            produtos_list.controls.append(
-                ft.Container(
-                    content=ft.Row(
+    def criar_cartao(prod, marcas):
+        marcas_texto = ", ".join([f"{m['marca']} ({m['estoque']})" for m in marcas])
+        return ft.Container(
+            content=ft.Row(
+                [
+                    ft.Column(
                         [
-                            ft.Column(
-                                [
-                                    ft.Text(f"{prod['nome']}", weight="bold", size=14),
-                                    ft.Text(
-                                        f"Categoria: {prod['categoria']}",
-                                        size=11,
-                                        color=ft.Colors.GREY_700,
-                                    ),
-                                    ft.Text(
-                                        f"Marca: {marcas_texto}",
-                                        size=11,
-                                        color=ft.Colors.GREY_700,
-                                    ),
-                                    ft.Text(
-                                        f"Total: {prod['quantidade_total'] or 0} un | Valor: R$ {prod['valor_total'] or 0:.2f}",
-                                        weight="bold",
-                                        color=COR_PRIMARIA,
-                                    ),
-                                    ft.Text(
-                                        f"Data Registro: {prod['data_criacao'] or 'N/A'} | Validade: {', '.join([m['data_validade'] or 'N/A' for m in marcas]) if marcas else 'N/A'}",
-                                        size=10,
-                                        color=ft.Colors.GREY_700,
-                                    ),
-                                ],
-                                spacing=5,
-                                expand=True,
+                            ft.Text(f"{prod['nome']}", weight="bold", size=14),
+                            ft.Text(
+                                f"Categoria: {prod['categoria']}",
+                                size=11,
+                                color=ft.Colors.GREY_700,
                             ),
-                            ft.ElevatedButton(
-                                "✏️ Editar",
-                                width=80,
-                                height=40,
-                                on_click=lambda e, pid=prod["id"]: editar_produto(pid),
+                            ft.Text(
+                                f"Marca: {marcas_texto}",
+                                size=11,
+                                color=ft.Colors.GREY_700,
+                            ),
+                            ft.Text(
+                                f"Total: {prod['quantidade_total'] or 0} un | Valor: R$ {prod['valor_total'] or 0:.2f}",
+                                weight="bold",
+                                color=COR_PRIMARIA,
+                            ),
+                            ft.Text(
+                                f"Data Registro: {para_br(prod['data_criacao']) or 'N/A'} | Validade: {', '.join([para_br(m['validade']) or 'N/A' for m in marcas]) if marcas else 'N/A'}",
+                                size=10,
+                                color=ft.Colors.GREY_700,
                             ),
                         ],
-                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                        spacing=5,
+                        expand=True,
                     ),
-                    border=ft.border.all(1, ft.Colors.GREY_300),
-                    border_radius=8,
-                    padding=10,
-                    bgcolor=ft.Colors.WHITE,
-                )
+                    ft.ElevatedButton(
+                        "✏️ Editar",
+                        width=80,
+                        height=40,
+                        on_click=lambda e, pid=prod["id"]: editar_produto(pid),
+                    ),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            border=ft.border.all(1, ft.Colors.GREY_300),
+            border_radius=8,
+            padding=10,
+            bgcolor=ft.Colors.WHITE,
+            data=prod["id"],
+        )
+
+    async def atualizar_lista():
+        async with carregando(page, indicador):
+            produtos = await bd.listar_produtos(chave="cadastro.lista")
+            # Marcas de todos os produtos numa única consulta
+            todas_marcas = await bd.listar_produtos_marcas(
+                "Marca", chave="cadastro.lista"
             )
+        produtos_list.controls.clear()
+        cartoes.clear()
+        # Ordenar produtos em ordem decrescente (últimos adicionados primeiro)
+        produtos_ordenados = sorted(produtos, key=lambda x: x["id"], reverse=True)
+        marcas_por_produto = {}
+        for marca in todas_marcas:
+            marcas_por_produto.setdefault(marca["produto_id"], []).append(marca)
+        for prod in produtos_ordenados:
+            cartao = criar_cartao(prod, marcas_por_produto.get(prod["id"], []))
+            cartoes[prod["id"]] = cartao
+            produtos_list.controls.append(cartao)
         page.update()
 
+    async def atualizar_cartao(produto_id):
+        """Insere, substitui ou remove o cartão de um único produto"""
+        prod = await bd.obter_produto(produto_id)
+        marcas = await bd.listar_marcas_produto(produto_id) if prod else []
+        # A lista só muda depois das consultas: eventos seguidos não duplicam cartões
+        antigo = cartoes.pop(produto_id, None)
+        if antigo is not None:
+            produtos_list.controls.remove(antigo)
+        if prod is None:
+            return
+        marcas = [
+            {
+                "marca": m["marca"],
+                "estoque": m["quantidade"],
+                "validade": m["data_validade"],
+            }
+            for m in marcas
+        ]
+        cartao = criar_cartao(prod, marcas)
+        cartoes[produto_id] = cartao
+        # Posição pela ordem decrescente de id
+        indice = next(
+            (
+                i
+                for i, c in enumerate(produtos_list.controls)
+                if c.data < produto_id
+            ),
+            len(produtos_list.controls),
+        )
+        produtos_list.controls.insert(indice, cartao)
+
+    async def ao_alterar_produtos(alteracao):
+        if alteracao.acao in (INSERCAO, ATUALIZACAO, REMOCAO):
+            for produto_id in alteracao.ids:
+                await atualizar_cartao(produto_id)
+            page.update()
+        else:
+            await atualizar_lista()
+
+    # O commit chega numa thread do banco: o tratamento roda no loop da interface
+    assinar("produtos", lambda alteracao: page.run_task(ao_alterar_produtos, alteracao))
+
     # Primeira atualização
-    atualizar_lista()
+    page.run_task(atualizar_lista)
 
     tela = ft.Column(
         [
@@ -222,11 +279,12 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
                         icon=ft.Icons.REFRESH,
                         icon_size=24,
                         tooltip="Atualizar lista",
-                        on_click=lambda e: atualizar_lista(),
+                        on_click=lambda e: page.run_task(atualizar_lista),
                     ),
                 ],
                 alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
             ),
+            indicador,
             ft.Container(content=produtos_list, expand=True, height=400),
         ],
         spacing=15,
@@ -235,5 +293,5 @@ def criar_tela_cadastro(page, atualizar_fn, mudar_tela_fn):
     )
 
     # Retornar função de atualização
-    tela.atualizar = atualizar_lista
+    tela.atualizar = lambda: page.run_task(atualizar_lista)
     return tela
@@ -1,13 +1,16 @@
 """
 Tela de Clientes/Fiados
 """
+import bisect
+
 import flet as ft
-from database import (
-    inserir_cliente,
-    listar_clientes,
-    listar_pedidos_cliente,
-)
-from ui.componentes import COR_PRIMARIA
+from banco_assincrono import bd
+from database import INSERCAO, ATUALIZACAO, assinar
+from datas import para_br
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
+
+TAMANHO_PAGINA = 100
+
 
 def criar_tela_clientes(page):
     """Tela para gerenciar clientes e fiados"""
@@ -20,14 +23,19 @@ def criar_tela_clientes(page):
     msg_status = ft.Text("", color=ft.Colors.RED)
     clientes_lista = ft.ListView(spacing=10, expand=True)
 
-    def cadastrar_cliente(e):
+    filtro_fiado = ft.Checkbox(label="Só fiado", value=False)
+    filtro_nome = ft.TextField(label="Nome começa com", width=250)
+    carregar_mais = ft.TextButton("Carregar mais", visible=False)
+    indicador = criar_indicador_carregamento()
+
+    async def cadastrar_cliente(e):
         if not nome_cli.value:
             msg_status.value = "❌ Digite o nome do cliente!"
             msg_status.color = ft.Colors.RED
             page.update()
             return
 
-        sucesso, msg, _ = inserir_cliente(
+        sucesso, msg, _ = await bd.inserir_cliente(
             nome_cli.value, apelido_cli.value, cpf_cli.value, fiando_check.value
         )
 
@@ -38,63 +46,208 @@ def criar_tela_clientes(page):
             apelido_cli.value = ""
             cpf_cli.value = ""
             fiando_check.value = False
-            atualizar_clientes()
         else:
             msg_status.value = f"❌ {msg}"
             msg_status.color = ft.Colors.RED
 
         page.update()
 
-    def atualizar_clientes():
-        clientes_lista.controls.clear()
-        clientes = listar_clientes()
+    # (nome, id) de cada cartão, na mesma ordem da lista (ORDER BY nome)
+    ordem = []
+
+    def abrir_pagamento(cliente):
+        """Abre o diálogo de registro de pagamento do cliente"""
+        valor_campo = ft.TextField(
+            label="Valor pago", keyboard_type="number", autofocus=True
+        )
+        obs_campo = ft.TextField(label="Observação")
 
-        for cliente in clientes:
-            pedidos = listar_pedidos_cliente(cliente["id"])
-            fiado_tag = "🔴 FIADO" if cliente["fiando"] else "✅ Pago"
+        async def confirmar(e):
+            try:
+                valor = float((valor_campo.value or "0").replace(",", "."))
+            except ValueError:
+                valor = 0
+            sucesso, msg, _ = await bd.registrar_pagamento(
+                cliente["id"], valor, obs_campo.value or ""
+            )
+            page.snack_bar = ft.SnackBar(ft.Text(f"{'✅' if sucesso else '❌'} {msg}"))
+            page.snack_bar.open = True
+            if sucesso:
+                dlg.open = False
+            page.update()
+
+        def fechar(e):
+            dlg.open = False
+            page.update()
+
+        dlg = ft.AlertDialog(
+            title=ft.Text(f"Pagamento: {cliente['nome']}"),
+            content=ft.Column(
+                [
+                    ft.Text(f"Em aberto: R$ {cliente['saldo_aberto'] or 0:.2f}"),
+                    valor_campo,
+                    obs_campo,
+                ],
+                spacing=10,
+                tight=True,
+            ),
+            actions=[
+                ft.TextButton("Cancelar", on_click=fechar),
+                ft.TextButton(
+                    "Registrar",
+                    on_click=confirmar,
+                    style=ft.ButtonStyle(color=ft.Colors.GREEN),
+                ),
+            ],
+            actions_alignment=ft.MainAxisAlignment.SPACE_AROUND,
+        )
+        page.dialog = dlg
+        dlg.open = True
+        page.update()
+
+    def criar_cartao(cliente):
+        saldo = cliente["saldo_aberto"] or 0
+        if cliente["fiando"]:
+            fiado_tag = (
+                f"🔴 FIADO - em aberto R$ {saldo:.2f}"
+                if saldo > 0.005
+                else "🟢 FIADO - em dia"
+            )
+        else:
+            fiado_tag = "✅ Pago"
+        ultima = para_br(cliente["ultima_compra"]) or "-"
+
+        botoes = [ft.ElevatedButton("Ver Pedidos", width=100, height=40)]
+        if cliente["fiando"]:
+            botoes.insert(
+                0,
+                ft.ElevatedButton(
+                    "💰 Pagamento",
+                    width=130,
+                    height=40,
+                    on_click=lambda e: abrir_pagamento(cliente),
+                ),
+            )
 
-            clientes_lista.controls.append(
-                ft.Container(
-                    content=ft.Row(
+        return ft.Container(
+            content=ft.Row(
+                [
+                    ft.Column(
                         [
-                            ft.Column(
-                                [
-                                    ft.Text(
-                                        f"{cliente['nome']}", weight="bold", size=14
-                                    ),
-                                    ft.Text(
-                                        f"Apelido: {cliente['apelido'] or '-'} | CPF: {cliente['cpf'] or '-'}",
-                                        size=10,
-                                        color=ft.Colors.GREY_700,
-                                    ),
-                                    ft.Text(
-                                        f"Pedidos: {len(pedidos)} | Status: {fiado_tag}",
-                                        size=10,
-                                        weight="bold",
-                                        color=(
-                                            COR_PRIMARIA
-                                            if cliente["fiando"]
-                                            else ft.Colors.GREEN
-                                        ),
-                                    ),
-                                ],
-                                spacing=3,
-                                expand=True,
+                            ft.Text(f"{cliente['nome']}", weight="bold", size=14),
+                            ft.Text(
+                                f"Apelido: {cliente['apelido'] or '-'} | CPF: {cliente['cpf'] or '-'}",
+                                size=10,
+                                color=ft.Colors.GREY_700,
+                            ),
+                            ft.Text(
+                                f"Pedidos: {cliente['total_pedidos'] or 0} | Última compra: {ultima} | Total pago: R$ {cliente['total_pago'] or 0:.2f}",
+                                size=10,
+                                color=ft.Colors.GREY_700,
+                            ),
+                            ft.Text(
+                                f"Status: {fiado_tag}",
+                                size=10,
+                                weight="bold",
+                                color=(
+                                    COR_PRIMARIA
+                                    if cliente["fiando"]
+                                    else ft.Colors.GREEN
+                                ),
                             ),
-                            ft.ElevatedButton("Ver Pedidos", width=100, height=40),
                         ],
-                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                        spacing=3,
+                        expand=True,
                     ),
-                    border=ft.border.all(1, ft.Colors.GREY_300),
-                    border_radius=8,
-                    padding=10,
-                    bgcolor=ft.Colors.WHITE,
-                )
+                    ft.Row(botoes, spacing=5),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            border=ft.border.all(1, ft.Colors.GREY_300),
+            border_radius=8,
+            padding=10,
+            bgcolor=ft.Colors.WHITE,
+        )
+
+    def filtros():
+        return bool(filtro_fiado.value), (filtro_nome.value or "").strip()
+
+    async def carregar_pagina(offset):
+        """Acrescenta a próxima página de clientes (uma consulta agregada)"""
+        apenas_fiado, prefixo = filtros()
+        # Digitar no filtro dispara várias consultas: só a última é exibida
+        async with carregando(page, indicador):
+            pagina = await bd.listar_clientes_resumo(
+                apenas_fiado,
+                prefixo,
+                TAMANHO_PAGINA + 1,
+                offset,
+                chave="clientes.lista",
             )
+        if offset == 0:
+            clientes_lista.controls.clear()
+            ordem.clear()
+        # Um cliente a mais só para saber se ainda há outra página
+        carregar_mais.visible = len(pagina) > TAMANHO_PAGINA
+        for cliente in pagina[:TAMANHO_PAGINA]:
+            ordem.append((cliente["nome"], cliente["id"]))
+            clientes_lista.controls.append(criar_cartao(cliente))
 
+    async def atualizar_clientes(e=None):
+        await carregar_pagina(0)
         page.update()
 
-    atualizar_clientes()
+    async def mais_clientes(e):
+        await carregar_pagina(len(ordem))
+        page.update()
+
+    def visivel(cliente):
+        """Se o cliente passa nos filtros e cai nas páginas já carregadas"""
+        apenas_fiado, prefixo = filtros()
+        if apenas_fiado and not cliente["fiando"]:
+            return False
+        if prefixo and not cliente["nome"].lower().startswith(prefixo.lower()):
+            return False
+        chave = (cliente["nome"], cliente["id"])
+        return not carregar_mais.visible or (bool(ordem) and chave <= ordem[-1])
+
+    async def atualizar_cartao(cliente_id):
+        """Insere, redesenha ou retira o cartão de um único cliente"""
+        cliente = await bd.obter_cliente(cliente_id)
+        if cliente is None:
+            return
+        chave = (cliente["nome"], cliente_id)
+        indice = bisect.bisect_left(ordem, chave)
+        existe = indice < len(ordem) and ordem[indice] == chave
+        if not visivel(cliente):
+            if existe:
+                del ordem[indice]
+                del clientes_lista.controls[indice]
+            return
+        cartao = criar_cartao(cliente)
+        if existe:
+            clientes_lista.controls[indice] = cartao
+        else:
+            ordem.insert(indice, chave)
+            clientes_lista.controls.insert(indice, cartao)
+
+    async def ao_alterar_clientes(alteracao):
+        # Pedidos e pagamentos chegam como atualização do saldo do cliente
+        if alteracao.acao not in (INSERCAO, ATUALIZACAO):
+            await atualizar_clientes()
+            return
+        for cliente_id in alteracao.ids:
+            await atualizar_cartao(cliente_id)
+        page.update()
+
+    # O commit chega numa thread do banco: o tratamento roda no loop da interface
+    assinar("clientes", lambda alteracao: page.run_task(ao_alterar_clientes, alteracao))
+
+    filtro_fiado.on_change = atualizar_clientes
+    filtro_nome.on_change = atualizar_clientes
+    carregar_mais.on_click = mais_clientes
+
+    page.run_task(atualizar_clientes)
 
     tela = ft.Column(
         [
@@ -124,11 +277,15 @@ def criar_tela_clientes(page):
             ),
             ft.Divider(),
             ft.Text("Clientes Cadastrados", size=18, weight="bold", color=COR_PRIMARIA),
+            ft.Row([filtro_nome, filtro_fiado], wrap=True),
+            indicador,
             ft.Container(content=clientes_lista, expand=True, height=400),
+            carregar_mais,
         ],
         spacing=15,
         expand=True,
         scroll="auto",
     )
 
+    tela.atualizar = lambda: page.run_task(atualizar_clientes)
     return tela
@@ -0,0 +1,175 @@
+"""
+Tela de Painel de Vendas
+"""
+
+from datetime import date, timedelta
+
+import flet as ft
+from banco_assincrono import bd
+from database import assinar
+from datas import FORMATO_BR_DATA, para_br
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
+
+TOP_MARCAS = 10
+LARGURA_BARRA = 400
+
+# Agrupamento -> (rótulo, dias exibidos por padrão)
+PERIODOS = {
+    "dia": ("Dia", 30),
+    "semana": ("Semana", 12 * 7),
+    "mes": ("Mês", 365),
+}
+
+
+def criar_tela_dashboard(page):
+    """Painel com receita por período, marcas mais vendidas e categorias"""
+
+    agrupamento_dd = ft.Dropdown(
+        label="Agrupar por",
+        width=150,
+        value="dia",
+        options=[
+            ft.dropdown.Option(chave, rotulo) for chave, (rotulo, _) in PERIODOS.items()
+        ],
+    )
+    inicio_campo = ft.TextField(label="De (DD/MM/AAAA)", width=170)
+    fim_campo = ft.TextField(label="Até (DD/MM/AAAA, exclusivo)", width=220)
+    msg_status = ft.Text("", color=ft.Colors.RED)
+    indicador = criar_indicador_carregamento()
+
+    total_texto = ft.Text("", size=18, weight="bold", color=COR_PRIMARIA)
+    receita_coluna = ft.Column(spacing=4)
+    marcas_coluna = ft.Column(spacing=4)
+    categorias_coluna = ft.Column(spacing=4)
+
+    def barra(rotulo, valor, maior, detalhe=""):
+        largura = LARGURA_BARRA * valor / maior if maior else 0
+        return ft.Row(
+            [
+                ft.Text(rotulo, size=11, width=220),
+                ft.Container(width=max(largura, 2), height=14, bgcolor=COR_PRIMARIA),
+                ft.Text(f"R$ {valor:.2f}{detalhe}", size=11, color=ft.Colors.GREY_700),
+            ],
+            spacing=8,
+        )
+
+    def rotulo_periodo(periodo):
+        if agrupamento_dd.value == "semana":
+            ano, semana = periodo.split("-")
+            return f"Semana {semana}/{ano}"
+        if agrupamento_dd.value == "mes":
+            ano, mes = periodo.split("-")
+            return f"{mes}/{ano}"
+        return para_br(periodo)
+
+    async def padrao_inicio(e=None):
+        """Preenche o início com o período padrão do agrupamento"""
+        dias = PERIODOS[agrupamento_dd.value][1]
+        inicio_campo.value = (date.today() - timedelta(days=dias)).strftime(
+            FORMATO_BR_DATA
+        )
+        await atualizar_painel()
+
+    async def atualizar_painel(e=None):
+        inicio, fim = inicio_campo.value or "", fim_campo.value or ""
+        # Uma troca de período descarta as consultas do período anterior
+        try:
+            async with carregando(page, indicador):
+                periodos = await bd.resumo_vendas(
+                    inicio, fim, agrupamento_dd.value, chave="painel"
+                )
+                marcas = await bd.marcas_mais_vendidas(
+                    inicio, fim, TOP_MARCAS, chave="painel"
+                )
+                categorias = await bd.vendas_por_categoria(inicio, fim, chave="painel")
+        except ValueError as ex:
+            msg_status.value = f"❌ {ex}"
+            page.update()
+            return
+        msg_status.value = ""
+
+        total = sum(p["receita"] for p in periodos)
+        total_texto.value = (
+            f"Receita: R$ {total:.2f} | "
+            f"{sum(p['quantidade'] for p in periodos)} un vendidas"
+        )
+
+        maior = max((p["receita"] for p in periodos), default=0)
+        receita_coluna.controls = [
+            barra(rotulo_periodo(p["periodo"]), p["receita"], maior) for p in periodos
+        ] or [ft.Text("Nenhuma venda no período", color=ft.Colors.GREY_700)]
+
+        maior = max((m["receita"] for m in marcas), default=0)
+        marcas_coluna.controls = [
+            barra(
+                f"{m['nome']} - {m['marca']}",
+                m["receita"],
+                maior,
+                f" ({m['quantidade']} un)",
+            )
+            for m in marcas
+        ]
+
+        maior = max((c["receita"] for c in categorias), default=0)
+        categorias_coluna.controls = [
+            barra(
+                c["categoria"],
+                c["receita"],
+                maior,
+                f" ({c['receita'] / total * 100:.0f}%)" if total else "",
+            )
+            for c in categorias
+        ]
+        page.update()
+
+    agrupamento_dd.on_change = padrao_inicio
+    inicio_campo.on_submit = atualizar_painel
+    fim_campo.on_submit = atualizar_painel
+
+    # Consultas só sobre vendas_diarias: refazê-las a cada venda é barato
+    for tabela in ("pedido_itens", "vendas_diarias"):
+        assinar(tabela, lambda alteracao: page.run_task(atualizar_painel))
+
+    page.run_task(padrao_inicio)
+
+    tela = ft.Column(
+        [
+            ft.Text("📈 Painel de Vendas", size=22, weight="bold", color=COR_PRIMARIA),
+            ft.Divider(),
+            ft.Row(
+                [
+                    agrupamento_dd,
+                    inicio_campo,
+                    fim_campo,
+                    ft.IconButton(
+                        icon=ft.Icons.REFRESH,
+                        tooltip="Atualizar painel",
+                        on_click=atualizar_painel,
+                    ),
+                ],
+                wrap=True,
+            ),
+            msg_status,
+            indicador,
+            total_texto,
+            ft.Text("Receita por período", size=16, weight="bold", color=COR_PRIMARIA),
+            receita_coluna,
+            ft.Divider(),
+            ft.Text(
+                f"{TOP_MARCAS} marcas mais vendidas",
+                size=16,
+                weight="bold",
+                color=COR_PRIMARIA,
+            ),
+            marcas_coluna,
+            ft.Divider(),
+            ft.Text("Vendas por categoria", size=16, weight="bold", color=COR_PRIMARIA),
+            categorias_coluna,
+        ],
+        spacing=15,
+        expand=True,
+        scroll="auto",
+    )
+
+    tela.atualizar = lambda: page.run_task(atualizar_painel)
+    return tela
@@ -2,14 +2,40 @@
 Tela de Edição de Produtos com Tabela tipo Explorer
 """
 
+import string
+
 import flet as ft
-from database import (
-    get_connection,
-    listar_produtos,
-    listar_marcas_produto,
-    atualizar_quantidade_marca,
-)
-from ui.componentes import COR_PRIMARIA
+from banco_assincrono import bd
+from database import ATUALIZACAO, INSERCAO, REMOCAO, assinar
+from datas import para_br
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
+
+LIMITE_BUSCA = 50
+# Linhas montadas na tabela por vez; o resto é navegado por páginas
+TAMANHO_JANELA = 100
+
+# COLLATE NOCASE do SQLite só ignora maiúsculas em ASCII
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _nocase(texto):
+    return (texto or "").translate(_MINUSCULAS_ASCII)
+
+
+def _nulos_primeiro(valor):
+    return (valor is not None, valor)
+
+
+# Mesmas ordenações de ORDEM_PRODUTOS_MARCAS, aplicadas às linhas em memória
+CHAVES_ORDEM = {
+    "Nome": lambda item: _nocase(item["nome"]),
+    "Marca": lambda item: _nocase(item["marca"]),
+    "Valor": lambda item: _nulos_primeiro(item["valor"]),
+    "Categoria": lambda item: _nocase(item["categoria"]),
+    "Estoque": lambda item: _nulos_primeiro(item["estoque"]),
+    "Validade": lambda item: _nulos_primeiro(item["validade"]),
+    "Data Registro": lambda item: _nulos_primeiro(item["data_registro"]),
+}
 
 
 def criar_tela_editar(page, mudar_tela_fn=None):
@@ -19,79 +45,96 @@ def criar_tela_editar(page, mudar_tela_fn=None):
     estado_tabela = {
         "ordem_coluna": None,
         "crescente": True,
-        "linhas_selecionadas": set(),
-        "ultima_clicada": None,
-        "todos_dados": [],
+        "linhas_selecionadas": set(),  # marca_ids
+        "busca": "",
+        "inicio": 0,  # primeira linha da janela exibida
     }
 
-    def get_dados_tabela():
-        """Retorna lista de dados para a tabela"""
-        dados = []
-        produtos = listar_produtos()
-
-        for prod in produtos:
-            marcas = listar_marcas_produto(prod["id"])
-            for marca in marcas:
-                dados.append(
-                    {
-                        "produto_id": prod["id"],
-                        "marca_id": marca["id"],
-                        "nome": prod["nome"],
-                        "marca": marca["marca"],
-                        "valor": marca["preco_unitario"],
-                        "categoria": prod["categoria"],
-                        "estoque": marca["quantidade"],
-                        "validade": marca["data_validade"] or "N/A",
-                        "data_registro": marca["data_cadastro"] or "N/A",
-                    }
-                )
-
-        return dados
-
-    def ordenar_dados(dados, coluna, crescente=True):
-        """Ordena dados pela coluna especificada"""
-        map_colunas = {
-            "Nome": "nome",
-            "Marca": "marca",
-            "Valor": "valor",
-            "Categoria": "categoria",
-            "Estoque": "estoque",
-            "Validade": "validade",
-            "Data Registro": "data_registro",
-        }
-
-        chave = map_colunas.get(coluna, "nome")
-
-        if chave == "valor":
-            return sorted(
-                dados,
-                key=lambda x: float(x[chave]),
-                reverse=not crescente,
-            )
-        elif chave == "estoque":
-            return sorted(
-                dados,
-                key=lambda x: int(x[chave]),
-                reverse=not crescente,
+    # Modelo das linhas, indexado por marca_id
+    itens = {}  # marca_id -> dados da linha
+    linhas = {}  # marca_id -> DataRow já montada
+    ordem = []  # marca_ids na ordem exibida
+    marcas_por_produto = {}  # produto_id -> marca_ids
+
+    indicador = criar_indicador_carregamento()
+
+    async def get_dados_tabela():
+        """Retorna lista de dados para a tabela, já ordenada pelo banco"""
+        # Mesma chave: uma busca nova descarta a anterior ainda em andamento
+        if estado_tabela["busca"]:
+            return await bd.buscar_produtos(
+                estado_tabela["busca"],
+                LIMITE_BUSCA,
+                estado_tabela["ordem_coluna"],
+                estado_tabela["crescente"],
+                chave="editar.tabela",
             )
-        else:
-            return sorted(
-                dados,
-                key=lambda x: str(x[chave]).lower(),
-                reverse=not crescente,
+        return await bd.listar_produtos_marcas(
+            estado_tabela["ordem_coluna"] or "Nome",
+            estado_tabela["crescente"],
+            chave="editar.tabela",
+        )
+
+    def guardar_item(linha):
+        """Guarda os dados da linha; descarta a DataRow se eles mudaram"""
+        item = {
+            chave: linha[chave]
+            for chave in (
+                "produto_id",
+                "marca_id",
+                "nome",
+                "marca",
+                "valor",
+                "categoria",
+                "estoque",
+                "validade",
+                "data_registro",
             )
+        }
+        marca_id = item["marca_id"]
+        if itens.get(marca_id) != item:
+            itens[marca_id] = item
+            linhas.pop(marca_id, None)
+        marcas_por_produto.setdefault(item["produto_id"], set()).add(marca_id)
+
+    def esquecer_item(marca_id):
+        item = itens.pop(marca_id)
+        linhas.pop(marca_id, None)
+        marcas_por_produto[item["produto_id"]].discard(marca_id)
+        estado_tabela["linhas_selecionadas"].discard(marca_id)
+
+    def carregar(dados):
+        """Recarrega o modelo com as linhas lidas, reaproveitando as que não mudaram"""
+        novos = {linha["marca_id"] for linha in dados}
+        for marca_id in [m for m in itens if m not in novos]:
+            esquecer_item(marca_id)
+        for linha in dados:
+            guardar_item(linha)
+        ordem[:] = [linha["marca_id"] for linha in dados]
+        estado_tabela["linhas_selecionadas"] &= novos
+
+    def ordenar():
+        """Reordena as linhas em memória pela coluna escolhida"""
+        coluna = estado_tabela["ordem_coluna"]
+        if coluna is None and estado_tabela["busca"]:
+            return  # mantém a ordem de relevância da busca
+        # Desempate igual ao do banco: marca e id, sempre crescentes
+        ordem.sort(key=lambda m: (_nocase(itens[m]["marca"]), m))
+        ordem.sort(
+            key=lambda m: CHAVES_ORDEM[coluna or "Nome"](itens[m]),
+            reverse=not estado_tabela["crescente"],
+        )
 
-    def abrir_editor(indice):
+    def abrir_editor(marca_id):
         """Abre modal para editar o produto"""
-        if indice >= len(estado_tabela["todos_dados"]):
+        item = itens.get(marca_id)
+        if item is None:
             return
 
-        item = estado_tabela["todos_dados"][indice]
-        marca_id = item["marca_id"]
         marca_nome = item["marca"]
         preco = item["valor"]
         estoque = item["estoque"]
-        validade = item["validade"]
+        validade = para_br(item["validade"]) or ""
 
         novo_preco = ft.TextField(
             label="Preço Unitário", value=str(preco), keyboard_type="number"
@@ -101,44 +144,47 @@ def criar_tela_editar(page, mudar_tela_fn=None):
         )
         nova_validade = ft.TextField(label="Validade (DD/MM/YYYY)", value=validade)
 
-        def salvar_edicao(e):
+        async def salvar_edicao(e):
+            # Desabilitado até gravar: um segundo clique lançaria o ajuste de novo
+            botao_salvar.disabled = True
             try:
                 novo_preco_val = float(novo_preco.value or preco)
                 novo_estoque_val = int(novo_estoque.value or estoque)
                 nova_validade_val = nova_validade.value or validade
 
-                atualizar_quantidade_marca(marca_id, novo_estoque_val)
-
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE produto_marcas SET preco_unitario = ?, data_validade = ? WHERE id = ?",
-                    (novo_preco_val, nova_validade_val, marca_id),
+                # Lança só a diferença para o valor exibido: vendas feitas
+                # com o diálogo aberto continuam descontadas. Preço, validade
+                # e ajuste são gravados numa única transação.
+                sucesso, msg = await bd.atualizar_marca(
+                    marca_id,
+                    novo_preco_val,
+                    nova_validade_val,
+                    novo_estoque_val - estoque,
+                    "Ajuste manual",
                 )
-                conn.commit()
-                conn.close()
+                if not sucesso:
+                    raise Exception(msg)
 
                 page.snack_bar = ft.SnackBar(
                     ft.Text(f"✅ {marca_nome} atualizado com sucesso!")
                 )
                 page.snack_bar.open = True
 
+                # A linha é atualizada pela alteração publicada (ao_alterar_produtos)
                 dlg.open = False
-                atualizar_tabela()
                 page.update()
             except Exception as ex:
+                botao_salvar.disabled = False
                 page.snack_bar = ft.SnackBar(ft.Text(f"❌ Erro: {str(ex)}"))
                 page.snack_bar.open = True
                 page.update()
 
-        def deletar_marca(e):
+        async def deletar_marca(e):
             """Deleta uma marca do produto"""
             try:
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM produto_marcas WHERE id = ?", (marca_id,))
-                conn.commit()
-                conn.close()
+                sucesso, msg = await bd.deletar_marca(marca_id)
+                if not sucesso:
+                    raise Exception(msg)
 
                 page.snack_bar = ft.SnackBar(
                     ft.Text(f"✅ {marca_nome} deletado com sucesso!")
@@ -146,13 +192,18 @@ def criar_tela_editar(page, mudar_tela_fn=None):
                 page.snack_bar.open = True
 
                 dlg.open = False
-                atualizar_tabela()
                 page.update()
             except Exception as ex:
                 page.snack_bar = ft.SnackBar(ft.Text(f"❌ Erro: {str(ex)}"))
                 page.snack_bar.open = True
                 page.update()
 
+        botao_salvar = ft.TextButton(
+            "Salvar",
+            on_click=salvar_edicao,
+            style=ft.ButtonStyle(color=ft.Colors.GREEN),
+        )
+
         dlg = ft.AlertDialog(
             title=ft.Text(f"Editar: {marca_nome}"),
             content=ft.Column(
@@ -173,11 +224,7 @@ def criar_tela_editar(page, mudar_tela_fn=None):
                     style=ft.ButtonStyle(color=ft.Colors.RED),
                 ),
                 ft.TextButton("Cancelar", on_click=lambda e: close_dlg()),
-                ft.TextButton(
-                    "Salvar",
-                    on_click=salvar_edicao,
-                    style=ft.ButtonStyle(color=ft.Colors.GREEN),
-                ),
+                botao_salvar,
             ],
             actions_alignment=ft.MainAxisAlignment.SPACE_AROUND,
         )
@@ -190,128 +237,176 @@ def criar_tela_editar(page, mudar_tela_fn=None):
         dlg.open = True
         page.update()
 
-    def criar_tabela():
-        """Cria a tabela com as linhas de dados"""
-        dados = get_dados_tabela()
-        estado_tabela["todos_dados"] = dados
-
-        if estado_tabela["ordem_coluna"]:
-            dados = ordenar_dados(
-                dados, estado_tabela["ordem_coluna"], estado_tabela["crescente"]
-            )
-            estado_tabela["todos_dados"] = dados
-
-        def ordenar_coluna(nome_coluna):
-            """Alterna ordenação da coluna"""
-            if estado_tabela["ordem_coluna"] == nome_coluna:
-                estado_tabela["crescente"] = not estado_tabela["crescente"]
-            else:
-                estado_tabela["ordem_coluna"] = nome_coluna
-                estado_tabela["crescente"] = True
-            atualizar_tabela()
-
-        colunas = [
-            ft.DataColumn(
-                ft.Text("Nome", weight="bold", size=11),
-                on_sort=lambda e: ordenar_coluna("Nome"),
-            ),
-            ft.DataColumn(
-                ft.Text("Marca", weight="bold", size=11),
-                on_sort=lambda e: ordenar_coluna("Marca"),
-            ),
-            ft.DataColumn(
-                ft.Text("Valor", weight="bold", size=11),
-                numeric=True,
-                on_sort=lambda e: ordenar_coluna("Valor"),
-            ),
-            ft.DataColumn(
-                ft.Text("Categoria", weight="bold", size=11),
-                on_sort=lambda e: ordenar_coluna("Categoria"),
-            ),
-            ft.DataColumn(
-                ft.Text("Estoque", weight="bold", size=11),
-                numeric=True,
-                on_sort=lambda e: ordenar_coluna("Estoque"),
-            ),
-            ft.DataColumn(
-                ft.Text("Validade", weight="bold", size=11),
-                on_sort=lambda e: ordenar_coluna("Validade"),
-            ),
-            ft.DataColumn(
-                ft.Text("Data Registro", weight="bold", size=11),
-                on_sort=lambda e: ordenar_coluna("Data Registro"),
-            ),
-        ]
-
-        linhas = []
-        for idx, item in enumerate(dados):
-
-            def abrir_produto_completo(e, produto_id=item["produto_id"]):
-                """Abre página de edição do produto completo"""
-                from ui.telas.editar_produto import criar_tela_editar_produto
-
-                conteudo = page.data.get("conteudo")
-                if conteudo:
-                    conteudo.controls.clear()
-                    conteudo.controls.append(
-                        criar_tela_editar_produto(
-                            page, produto_id=produto_id, mudar_tela_fn=mudar_tela_fn
-                        )
-                    )
-                    page.update()
-
-            def handle_selection(e, indice=idx):
-                """Handler para seleção de linhas"""
-                if e.control.selected:
-                    estado_tabela["linhas_selecionadas"].add(indice)
-                else:
-                    estado_tabela["linhas_selecionadas"].discard(indice)
-                estado_tabela["ultima_clicada"] = indice
-
-            linhas.append(
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(
-                            ft.TextButton(
-                                item["nome"],
-                                on_click=abrir_produto_completo,
-                                style=ft.ButtonStyle(color=COR_PRIMARIA),
-                            )
-                        ),
-                        ft.DataCell(ft.Text(item["marca"], size=11)),
-                        ft.DataCell(ft.Text(f"R$ {item['valor']:.2f}", size=11)),
-                        ft.DataCell(ft.Text(item["categoria"], size=11)),
-                        ft.DataCell(ft.Text(str(item["estoque"]), size=11)),
-                        ft.DataCell(ft.Text(item["validade"], size=11)),
-                        ft.DataCell(ft.Text(item["data_registro"], size=11)),
-                    ],
-                    selected=idx in estado_tabela["linhas_selecionadas"],
-                    on_select_change=lambda e, indice=idx: handle_selection(e, indice),
+    # Handlers compartilhados por todas as linhas (a linha vem em control.data)
+    def abrir_produto_completo(e):
+        """Abre página de edição do produto completo"""
+        from ui.telas.editar_produto import criar_tela_editar_produto
+
+        conteudo = page.data.get("conteudo")
+        if conteudo:
+            conteudo.controls.clear()
+            conteudo.controls.append(
+                criar_tela_editar_produto(
+                    page, produto_id=e.control.data, mudar_tela_fn=mudar_tela_fn
                 )
             )
+            page.update()
 
-        tabela = ft.DataTable(
-            columns=colunas,
-            rows=linhas,
-            border=ft.border.all(1, ft.Colors.GREY_300),
-            border_radius=8,
-            show_checkbox_column=True,
-            heading_row_color=COR_PRIMARIA,
-            heading_row_height=50,
-            data_row_max_height=40,
-            width=1200,
-            horizontal_lines=ft.CrossAxisAlignment.START,
+    def handle_selection(e):
+        """Handler para seleção de linhas"""
+        if e.control.selected:
+            estado_tabela["linhas_selecionadas"].add(e.control.data)
+        else:
+            estado_tabela["linhas_selecionadas"].discard(e.control.data)
+
+    def criar_linha(item):
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(
+                    ft.TextButton(
+                        item["nome"],
+                        data=item["produto_id"],
+                        on_click=abrir_produto_completo,
+                        style=ft.ButtonStyle(color=COR_PRIMARIA),
+                    )
+                ),
+                ft.DataCell(ft.Text(item["marca"], size=11)),
+                ft.DataCell(ft.Text(f"R$ {item['valor']:.2f}", size=11)),
+                ft.DataCell(ft.Text(item["categoria"], size=11)),
+                ft.DataCell(ft.Text(str(item["estoque"]), size=11)),
+                ft.DataCell(ft.Text(para_br(item["validade"]) or "N/A", size=11)),
+                ft.DataCell(ft.Text(para_br(item["data_registro"]) or "N/A", size=11)),
+            ],
+            data=item["marca_id"],
+            on_select_change=handle_selection,
         )
 
-        return tabela
+    def linha(marca_id):
+        """DataRow da marca, montada só quando entra na janela"""
+        if marca_id not in linhas:
+            linhas[marca_id] = criar_linha(itens[marca_id])
+        row = linhas[marca_id]
+        row.selected = marca_id in estado_tabela["linhas_selecionadas"]
+        return row
+
+    def ordenar_coluna(nome_coluna):
+        """Alterna ordenação da coluna"""
+        if estado_tabela["ordem_coluna"] == nome_coluna:
+            estado_tabela["crescente"] = not estado_tabela["crescente"]
+        else:
+            estado_tabela["ordem_coluna"] = nome_coluna
+            estado_tabela["crescente"] = True
+        ordenar()
+        estado_tabela["inicio"] = 0
+        renderizar()
+
+    def coluna(titulo, numeric=False):
+        return ft.DataColumn(
+            ft.Text(titulo, weight="bold", size=11),
+            numeric=numeric,
+            on_sort=lambda e: ordenar_coluna(titulo),
+        )
+
+    tabela = ft.DataTable(
+        columns=[
+            coluna("Nome"),
+            coluna("Marca"),
+            coluna("Valor", numeric=True),
+            coluna("Categoria"),
+            coluna("Estoque", numeric=True),
+            coluna("Validade"),
+            coluna("Data Registro"),
+        ],
+        rows=[],
+        border=ft.border.all(1, ft.Colors.GREY_300),
+        border_radius=8,
+        show_checkbox_column=True,
+        heading_row_color=COR_PRIMARIA,
+        heading_row_height=50,
+        data_row_max_height=40,
+        width=1200,
+        horizontal_lines=ft.CrossAxisAlignment.START,
+    )
+
+    janela_texto = ft.Text("", size=11, color=ft.Colors.GREY_700)
+
+    def mover_janela(passo):
+        inicio = estado_tabela["inicio"] + passo * TAMANHO_JANELA
+        if 0 <= inicio < max(len(ordem), 1):
+            estado_tabela["inicio"] = inicio
+            renderizar()
+
+    botao_anterior = ft.IconButton(
+        ft.Icons.CHEVRON_LEFT, on_click=lambda e: mover_janela(-1)
+    )
+    botao_proxima = ft.IconButton(
+        ft.Icons.CHEVRON_RIGHT, on_click=lambda e: mover_janela(1)
+    )
 
-    def atualizar_tabela():
-        """Atualiza a tabela na tela"""
-        tabela_container.content = criar_tabela()
+    def renderizar():
+        """Mostra na tabela só as linhas da janela atual"""
+        total = len(ordem)
+        inicio = min(estado_tabela["inicio"], max(total - 1, 0))
+        inicio -= inicio % TAMANHO_JANELA
+        estado_tabela["inicio"] = inicio
+        fim = min(inicio + TAMANHO_JANELA, total)
+
+        tabela.rows = [linha(marca_id) for marca_id in ordem[inicio:fim]]
+        janela_texto.value = f"{inicio + 1 if total else 0}–{fim} de {total}"
+        botao_anterior.disabled = inicio == 0
+        botao_proxima.disabled = fim >= total
         page.update()
 
+    async def atualizar_tabela():
+        """Recarrega as linhas do banco e atualiza a tabela na tela"""
+        async with carregando(page, indicador):
+            carregar(await get_dados_tabela())
+        # A coluna pode ter mudado enquanto a consulta rodava
+        ordenar()
+        renderizar()
+
+    async def ao_alterar_produtos(alteracao):
+        if alteracao.acao not in (INSERCAO, ATUALIZACAO, REMOCAO):
+            await atualizar_tabela()
+            return
+        produtos = set(alteracao.ids)
+        atuais = {
+            dados["marca_id"]: dados
+            for dados in await bd.listar_marcas_dos_produtos(produtos)
+        }
+        removidas = {
+            marca_id
+            for produto_id in produtos
+            for marca_id in marcas_por_produto.get(produto_id, ())
+            if marca_id not in atuais
+        }
+        for marca_id in removidas:
+            esquecer_item(marca_id)
+        if removidas:
+            ordem[:] = [marca_id for marca_id in ordem if marca_id not in removidas]
+        for marca_id, dados in atuais.items():
+            if marca_id in itens:
+                guardar_item(dados)
+            elif not estado_tabela["busca"]:
+                # Marcas novas só entram fora da busca (podem não casar com o termo)
+                guardar_item(dados)
+                ordem.append(marca_id)
+        ordenar()
+        renderizar()
+
+    # O commit chega numa thread do banco: o tratamento roda no loop da interface
+    assinar("produtos", lambda alteracao: page.run_task(ao_alterar_produtos, alteracao))
+
+    page.run_task(atualizar_tabela)
+
     tabela_container = ft.Column(
-        [criar_tabela()],
+        [
+            tabela,
+            ft.Row(
+                [botao_anterior, janela_texto, botao_proxima],
+                alignment=ft.MainAxisAlignment.CENTER,
+            ),
+        ],
         scroll="auto",
         expand=True,
     )
@@ -324,10 +419,11 @@ def criar_tela_editar(page, mudar_tela_fn=None):
             page.update()
             return
 
-        indice = min(estado_tabela["linhas_selecionadas"])
-        abrir_editor(indice)
+        # Primeira selecionada na ordem exibida
+        marca_id = next(m for m in ordem if m in estado_tabela["linhas_selecionadas"])
+        abrir_editor(marca_id)
 
-    def deletar_selecionadas(e):
+    async def deletar_selecionadas(e):
         """Deleta as linhas selecionadas"""
         if not estado_tabela["linhas_selecionadas"]:
             page.snack_bar = ft.SnackBar(ft.Text("❌ Selecione pelo menos uma linha"))
@@ -335,32 +431,33 @@ def criar_tela_editar(page, mudar_tela_fn=None):
             page.update()
             return
 
-        indices = sorted(estado_tabela["linhas_selecionadas"], reverse=True)
-        for indice in indices:
-            if indice < len(estado_tabela["todos_dados"]):
-                item = estado_tabela["todos_dados"][indice]
-                marca_id = item["marca_id"]
-                try:
-                    conn = get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "DELETE FROM produto_marcas WHERE id = ?", (marca_id,)
-                    )
-                    conn.commit()
-                    conn.close()
-                except Exception as ex:
-                    page.snack_bar = ft.SnackBar(ft.Text(f"❌ Erro: {str(ex)}"))
-                    page.snack_bar.open = True
-                    page.update()
-                    return
-
-        page.snack_bar = ft.SnackBar(
-            ft.Text(f"✅ {len(indices)} item(ns) deletado(s) com sucesso!")
-        )
+        async with carregando(page, indicador):
+            resultados = await bd.deletar_marcas(
+                list(estado_tabela["linhas_selecionadas"])
+            )
+        falhas = [msg for sucesso, msg in resultados.values() if not sucesso]
+        deletadas = len(resultados) - len(falhas)
+
+        if falhas:
+            texto = f"⚠️ {deletadas} deletado(s), {len(falhas)} com erro: {falhas[0]}"
+        else:
+            texto = f"✅ {deletadas} item(ns) deletado(s) com sucesso!"
+        page.snack_bar = ft.SnackBar(ft.Text(texto))
         page.snack_bar.open = True
+        page.update()
 
+    async def buscar(e):
+        """Filtra a tabela enquanto o usuário digita"""
+        estado_tabela["busca"] = busca_campo.value.strip()
         estado_tabela["linhas_selecionadas"].clear()
-        atualizar_tabela()
+        estado_tabela["inicio"] = 0
+        await atualizar_tabela()
+
+    busca_campo = ft.TextField(
+        label="🔍 Buscar por nome, categoria, marca ou código",
+        width=400,
+        on_change=buscar,
+    )
 
     info_texto = ft.Text(
         "💡 Use os quadrados para selecionar linhas | Clique no nome do produto para editar todas as informações | Use os botões abaixo para editar ou deletar",
@@ -372,6 +469,8 @@ def criar_tela_editar(page, mudar_tela_fn=None):
         [
             ft.Text("✏️ Editar Produtos", size=22, weight="bold", color=COR_PRIMARIA),
             ft.Divider(),
+            busca_campo,
+            indicador,
             info_texto,
             ft.Row(
                 [
@@ -397,4 +496,5 @@ def criar_tela_editar(page, mudar_tela_fn=None):
         expand=True,
     )
 
+    tela.atualizar = lambda: page.run_task(atualizar_tabela)
     return tela
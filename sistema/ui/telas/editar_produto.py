@@ -3,8 +3,9 @@ Tela de Edição Completa do Produto
 """
 
 import flet as ft
-from database import get_connection, listar_marcas_produto
-from ui.componentes import COR_PRIMARIA
+from banco_assincrono import bd
+from datas import para_br
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
 
 
 def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
@@ -24,10 +25,10 @@ def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
                 conteudo.controls.append(criar_tela_editar(page, mudar_tela_fn))
                 page.update()
 
-    if not produto_id:
+    def criar_aviso(texto):
         return ft.Column(
             [
-                ft.Text("Erro: Produto não selecionado", color=ft.Colors.RED),
+                ft.Text(texto, color=ft.Colors.RED),
                 ft.ElevatedButton(
                     "✅ Voltar",
                     on_click=voltar_a_editar,
@@ -37,100 +38,74 @@ def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
             ]
         )
 
-    # Obter informações do produto
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM produtos WHERE id = ?", (produto_id,))
-    produto = cursor.fetchone()
-    conn.close()
+    if not produto_id:
+        return criar_aviso("Erro: Produto não selecionado")
 
-    if not produto:
-        return ft.Column(
-            [
-                ft.Text("Produto não encontrado", color=ft.Colors.RED),
-                ft.ElevatedButton(
-                    "✅ Voltar",
-                    on_click=voltar_a_editar,
-                    color=ft.Colors.WHITE,
-                    bgcolor=COR_PRIMARIA,
-                ),
-            ]
-        )
+    indicador = criar_indicador_carregamento()
 
-    # Campos editáveis
+    # Campos editáveis (desabilitados até o produto ser carregado)
     campo_nome = ft.TextField(
         label="Nome do Produto",
-        value=produto["nome"],
         width=400,
+        disabled=True,
     )
 
     campo_categoria = ft.TextField(
         label="Categoria",
-        value=produto["categoria"],
         width=400,
+        disabled=True,
     )
 
-    def salvar_produto(e):
+    def mostrar_mensagem(texto):
+        page.snack_bar = ft.SnackBar(ft.Text(texto))
+        page.snack_bar.open = True
+        page.update()
+
+    def habilitar(ativo):
+        """Liga/desliga os campos e botões enquanto o banco é consultado"""
+        for controle in (campo_nome, campo_categoria, botao_salvar, botao_deletar):
+            controle.disabled = not ativo
+
+    async def salvar_produto(e):
         """Salva as alterações do produto"""
+        if not campo_nome.value.strip():
+            mostrar_mensagem("❌ Nome do produto é obrigatório")
+            return
+
+        # Desabilitado até gravar: evita salvar duas vezes
+        habilitar(False)
         try:
-            if not campo_nome.value.strip():
-                page.snack_bar = ft.SnackBar(
-                    ft.Text("❌ Nome do produto é obrigatório")
+            async with carregando(page, indicador):
+                sucesso, msg = await bd.atualizar_produto(
+                    produto_id, campo_nome.value, campo_categoria.value
                 )
-                page.snack_bar.open = True
-                page.update()
-                return
+        finally:
+            habilitar(True)
 
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE produtos SET nome = ?, categoria = ? WHERE id = ?",
-                (campo_nome.value, campo_categoria.value, produto_id),
-            )
-            conn.commit()
-            conn.close()
-
-            page.snack_bar = ft.SnackBar(
-                ft.Text(f"✅ {campo_nome.value} atualizado com sucesso!")
-            )
-            page.snack_bar.open = True
-            page.update()
-        except Exception as ex:
-            page.snack_bar = ft.SnackBar(ft.Text(f"❌ Erro: {str(ex)}"))
-            page.snack_bar.open = True
-            page.update()
+        if sucesso:
+            mostrar_mensagem(f"✅ {campo_nome.value} atualizado com sucesso!")
+        else:
+            mostrar_mensagem(f"❌ Erro: {msg}")
 
     def deletar_produto(e):
         """Abre diálogo de confirmação para deletar o produto"""
 
-        def confirmar_delecao(e):
+        async def confirmar_delecao(e):
+            dlg.open = False
+            habilitar(False)
             try:
-                conn = get_connection()
-                cursor = conn.cursor()
-
-                # Deletar todas as marcas do produto
-                cursor.execute(
-                    "DELETE FROM produto_marcas WHERE produto_id = ?", (produto_id,)
-                )
-
-                # Deletar o produto
-                cursor.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
-
-                conn.commit()
-                conn.close()
-
-                page.snack_bar = ft.SnackBar(
-                    ft.Text(f"✅ {campo_nome.value} deletado com sucesso!")
-                )
-                page.snack_bar.open = True
-                page.update()
+                # Deleta o produto, suas marcas e históricos numa transação
+                async with carregando(page, indicador):
+                    sucesso, msg = await bd.deletar_produto(produto_id)
+            finally:
+                habilitar(True)
+            if not sucesso:
+                mostrar_mensagem(f"❌ Erro: {msg}")
+                return
 
-                # Voltar para editar após deletar
-                voltar_a_editar(None)
-            except Exception as ex:
-                page.snack_bar = ft.SnackBar(ft.Text(f"❌ Erro: {str(ex)}"))
-                page.snack_bar.open = True
-                page.update()
+            mostrar_mensagem(f"✅ {campo_nome.value} deletado com sucesso!")
+            # Voltar para editar após deletar
+            voltar_a_editar(None)
 
         dlg = ft.AlertDialog(
             title=ft.Text(f"Deletar '{campo_nome.value}'?"),
@@ -161,45 +136,57 @@ def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
         dlg.open = True
         page.update()
 
-    # Obter marcas do produto
-    marcas = listar_marcas_produto(produto_id)
+    def criar_cartao_marca(marca):
+        return ft.Container(
+            content=ft.Row(
+                [
+                    ft.Column(
+                        [
+                            ft.Text(marca["marca"], weight="bold", size=12),
+                            ft.Text(
+                                f"Preço: R$ {marca['preco_unitario']:.2f}",
+                                size=11,
+                            ),
+                            ft.Text(f"Qtd: {marca['quantidade']}", size=11),
+                            ft.Text(
+                                f"Validade: {para_br(marca['data_validade']) or 'N/A'}",
+                                size=11,
+                            ),
+                        ],
+                        tight=True,
+                    ),
+                ],
+                expand=True,
+            ),
+            padding=10,
+            bgcolor=ft.Colors.GREY_100,
+            border_radius=5,
+        )
 
+    # Marcas do produto, preenchidas pela carga inicial
     marcas_list = ft.Column(
         [
             ft.Text("Marcas Associadas:", size=14, weight="bold", color=COR_PRIMARIA),
-        ]
-        + [
-            ft.Container(
-                content=ft.Row(
-                    [
-                        ft.Column(
-                            [
-                                ft.Text(marca["marca"], weight="bold", size=12),
-                                ft.Text(
-                                    f"Preço: R$ {marca['preco_unitario']:.2f}",
-                                    size=11,
-                                ),
-                                ft.Text(f"Qtd: {marca['quantidade']}", size=11),
-                                ft.Text(
-                                    f"Validade: {marca['data_validade'] or 'N/A'}",
-                                    size=11,
-                                ),
-                            ],
-                            tight=True,
-                        ),
-                    ],
-                    expand=True,
-                ),
-                padding=10,
-                bgcolor=ft.Colors.GREY_100,
-                border_radius=5,
-            )
-            for marca in marcas
         ],
         spacing=10,
         expand=True,
     )
 
+    botao_salvar = ft.ElevatedButton(
+        "✅ Salvar",
+        on_click=salvar_produto,
+        color=ft.Colors.WHITE,
+        bgcolor=ft.Colors.GREEN,
+        disabled=True,
+    )
+    botao_deletar = ft.ElevatedButton(
+        "🗑️ Deletar Produto",
+        on_click=deletar_produto,
+        color=ft.Colors.WHITE,
+        bgcolor=ft.Colors.RED,
+        disabled=True,
+    )
+
     tela = ft.Container(
         content=ft.Column(
             [
@@ -220,6 +207,7 @@ def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
                     alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
                 ),
                 ft.Divider(),
+                indicador,
                 ft.Text("Informações do Produto", size=14, weight="bold"),
                 ft.Column(
                     [
@@ -238,20 +226,7 @@ def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
                 ),
                 ft.Divider(),
                 ft.Row(
-                    [
-                        ft.ElevatedButton(
-                            "✅ Salvar",
-                            on_click=salvar_produto,
-                            color=ft.Colors.WHITE,
-                            bgcolor=ft.Colors.GREEN,
-                        ),
-                        ft.ElevatedButton(
-                            "🗑️ Deletar Produto",
-                            on_click=deletar_produto,
-                            color=ft.Colors.WHITE,
-                            bgcolor=ft.Colors.RED,
-                        ),
-                    ],
+                    [botao_salvar, botao_deletar],
                     spacing=10,
                 ),
             ],
@@ -262,4 +237,23 @@ def criar_tela_editar_produto(page, produto_id=None, mudar_tela_fn=None):
         expand=True,
     )
 
+    async def carregar_produto():
+        """Carrega o produto e suas marcas e libera a edição"""
+        async with carregando(page, indicador):
+            produto = await bd.obter_produto(produto_id)
+            marcas = await bd.listar_marcas_produto(produto_id) if produto else []
+
+        if not produto:
+            tela.content = criar_aviso("Produto não encontrado")
+            page.update()
+            return
+
+        campo_nome.value = produto["nome"]
+        campo_categoria.value = produto["categoria"]
+        marcas_list.controls[1:] = [criar_cartao_marca(marca) for marca in marcas]
+        habilitar(True)
+        page.update()
+
+    page.run_task(carregar_produto)
+
     return tela
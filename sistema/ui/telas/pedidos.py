@@ -2,31 +2,38 @@
 Tela de Registro de Pedidos
 """
 
+import bisect
+
 import flet as ft
+from banco_assincrono import bd
 from database import (
-    listar_clientes,
-    listar_produtos,
-    listar_marcas_produto,
-    inserir_pedido,
-    adicionar_item_pedido,
+    INSERCAO,
+    ATUALIZACAO,
+    REMOCAO,
+    altera_campos,
+    assinar,
 )
-from ui.componentes import COR_PRIMARIA
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
+
+LIMITE_BUSCA = 10
 
 
 def criar_tela_pedidos(page):
     """Tela para criar pedidos (similar ao oncomandas)"""
 
     clientes_lista_dd = ft.Dropdown(label="Cliente", width=300)
+    indicador = criar_indicador_carregamento()
 
-    def atualizar_clientes_dd(e=None):
+    async def atualizar_clientes_dd(e=None):
+        clientes = await bd.listar_clientes(chave="pedidos.clientes")
         clientes_lista_dd.options.clear()
-        for cliente in listar_clientes():
+        for cliente in clientes:
             clientes_lista_dd.options.append(
                 ft.dropdown.Option(str(cliente["id"]), cliente["nome"])
             )
         page.update()
 
-    atualizar_clientes_dd()
+    page.run_task(atualizar_clientes_dd)
 
     produtos_dd = ft.Dropdown(label="Produto", width=300)
     marcas_dd = ft.Dropdown(label="Marca", width=300)
@@ -40,19 +47,30 @@ def criar_tela_pedidos(page):
 
     total_atual = [0]
     itens_pedido = []
+    # Marcas do produto selecionado, carregadas junto com o dropdown
+    marcas_atuais = {}
 
-    def atualizar_produtos_dd(e=None):
+    async def atualizar_produtos_dd(e=None):
+        produtos = await bd.listar_produtos(chave="pedidos.produtos")
         produtos_dd.options.clear()
-        for prod in listar_produtos():
+        for prod in produtos:
             produtos_dd.options.append(
                 ft.dropdown.Option(str(prod["id"]), prod["nome"])
             )
         page.update()
 
-    def atualizar_marcas_dd(e=None):
+    async def atualizar_marcas_dd(e=None):
+        # Trocar de produto rápido descarta as marcas do produto anterior
+        marcas = []
+        if produtos_dd.value:
+            marcas = await bd.listar_marcas_produto(
+                int(produtos_dd.value), chave="pedidos.marcas"
+            )
         marcas_dd.options.clear()
+        marcas_atuais.clear()
         if produtos_dd.value:
-            for marca in listar_marcas_produto(int(produtos_dd.value)):
+            for marca in marcas:
+                marcas_atuais[marca["id"]] = marca
                 marcas_dd.options.append(
                     ft.dropdown.Option(
                         str(marca["id"]),
@@ -62,91 +80,175 @@ def criar_tela_pedidos(page):
         page.update()
 
     produtos_dd.on_change = atualizar_marcas_dd
-    atualizar_produtos_dd()
+    page.run_task(atualizar_produtos_dd)
 
-    def adicionar_item(e):
-        if not clientes_lista_dd.value or not marcas_dd.value:
-            return
+    busca_resultados = ft.Column(spacing=2)
 
-        try:
-            qtd = int(qtd_ped.value or 1)
-            marca_id = int(marcas_dd.value)
-            marcas = listar_marcas_produto(int(produtos_dd.value))
-            marca_info = [m for m in marcas if m["id"] == marca_id][0]
-            subtotal = qtd * marca_info["preco_unitario"]
+    async def selecionar_busca(resultado):
+        """Preenche produto e marca a partir de um resultado da busca"""
+        produtos_dd.value = str(resultado["produto_id"])
+        await atualizar_marcas_dd()
+        marcas_dd.value = str(resultado["marca_id"])
+        busca_campo.value = ""
+        busca_resultados.controls.clear()
+        page.update()
+
+    async def buscar(e):
+        # Cada tecla dispara uma busca; só a do texto mais recente é exibida
+        resultados = await bd.buscar_produtos(
+            busca_campo.value, LIMITE_BUSCA, chave="pedidos.busca"
+        )
+        busca_resultados.controls.clear()
+        for resultado in resultados:
+            busca_resultados.controls.append(
+                ft.TextButton(
+                    f"{resultado['nome']} - {resultado['marca']} "
+                    f"(R$ {resultado['valor']:.2f}) [{resultado['codigo'] or '-'}]",
+                    on_click=lambda e, r=resultado: page.run_task(selecionar_busca, r),
+                    style=ft.ButtonStyle(color=COR_PRIMARIA),
+                )
+            )
+        page.update()
+
+    busca_campo = ft.TextField(
+        label="🔍 Buscar produto, marca ou código", width=400, on_change=buscar
+    )
+
+    def renderizar_item(item):
+        return ft.Container(
+            content=ft.Row(
+                [
+                    ft.Column(
+                        [
+                            ft.Text(f"{item['nome']} x {item['qtd']}", weight="bold"),
+                            ft.Text(
+                                f"R$ {item['subtotal']:.2f}",
+                                size=12,
+                                color=COR_PRIMARIA,
+                            ),
+                        ],
+                        expand=True,
+                    ),
+                    ft.IconButton(
+                        ft.Icons.DELETE, on_click=lambda e: remover_item(item)
+                    ),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            padding=10,
+            bgcolor=ft.Colors.GREY_100,
+            border_radius=5,
+        )
 
+    def incluir_item(marca_id, nome, preco, qtd, observacao=""):
+        """Inclui um item no pedido, somando à linha da mesma marca se houver"""
+        for indice, item in enumerate(itens_pedido):
+            if item["marca_id"] == marca_id and item["observacao"] == observacao:
+                item["qtd"] += qtd
+                item["subtotal"] = item["qtd"] * preco
+                pedido_itens.controls[indice] = renderizar_item(item)
+                break
+        else:
             item = {
                 "marca_id": marca_id,
-                "nome": marcas_dd.value,
+                "nome": nome,
                 "qtd": qtd,
-                "preco": marca_info["preco_unitario"],
-                "subtotal": subtotal,
+                "preco": preco,
+                "subtotal": qtd * preco,
+                "observacao": observacao,
             }
             itens_pedido.append(item)
+            pedido_itens.controls.append(renderizar_item(item))
 
-            idx = len(pedido_itens.controls)
-            pedido_itens.controls.append(
-                ft.Container(
-                    content=ft.Row(
-                        [
-                            ft.Column(
-                                [
-                                    ft.Text(f"{item['nome']} x {qtd}", weight="bold"),
-                                    ft.Text(
-                                        f"R$ {subtotal:.2f}",
-                                        size=12,
-                                        color=COR_PRIMARIA,
-                                    ),
-                                ],
-                                expand=True,
-                            ),
-                            ft.IconButton(
-                                ft.icons.DELETE, on_click=lambda: remover_item(idx)
-                            ),
-                        ],
-                        alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-                    ),
-                    padding=10,
-                    bgcolor=ft.Colors.GREY_100,
-                    border_radius=5,
-                )
-            )
+        total_atual[0] += qtd * preco
+        total_texto.value = f"Total: R$ {total_atual[0]:.2f}"
 
-            total_atual[0] += subtotal
-            total_texto.value = f"Total: R$ {total_atual[0]:.2f}"
+    def adicionar_item(e):
+        if not clientes_lista_dd.value or not marcas_dd.value:
+            return
 
-            qtd_ped.value = "1"
-            obs_ped.value = ""
-            page.update()
-        except:
-            pass
+        try:
+            qtd = int(qtd_ped.value or 1)
+            marca_info = marcas_atuais[int(marcas_dd.value)]
+        except (ValueError, KeyError):
+            return
+
+        produto_nome = next(
+            (o.text for o in produtos_dd.options if o.key == produtos_dd.value), ""
+        )
+        incluir_item(
+            marca_info["id"],
+            f"{produto_nome} - {marca_info['marca']}",
+            marca_info["preco_unitario"],
+            qtd,
+            obs_ped.value or "",
+        )
 
-    def remover_item(idx):
-        if 0 <= idx < len(pedido_itens.controls) and 0 <= idx < len(itens_pedido):
-            item = itens_pedido.pop(idx)
+        qtd_ped.value = "1"
+        obs_ped.value = ""
+        page.update()
+
+    async def escanear(e):
+        """Adiciona uma unidade do item lido pelo leitor de código de barras"""
+        codigo = codigo_campo.value
+        codigo_campo.value = ""
+        # Após uma alteração do catálogo o índice é recarregado no executor
+        marca = await bd.buscar_por_codigo(codigo)
+        if marca is None:
+            page.snack_bar = ft.SnackBar(ft.Text(f"❌ Código não encontrado: {codigo}"))
+            page.snack_bar.open = True
+        else:
+            incluir_item(
+                marca["marca_id"],
+                f"{marca['nome']} - {marca['marca']}",
+                marca["preco_unitario"],
+                1,
+            )
+        page.update()
+        await codigo_campo.focus()
+
+    codigo_campo = ft.TextField(
+        label="📷 Código de barras",
+        width=300,
+        autofocus=True,
+        on_submit=escanear,
+    )
+
+    def remover_item(item):
+        if item in itens_pedido:
+            indice = itens_pedido.index(item)
+            itens_pedido.pop(indice)
+            pedido_itens.controls.pop(indice)
             total_atual[0] -= item["subtotal"]
             total_texto.value = f"Total: R$ {total_atual[0]:.2f}"
-            pedido_itens.controls.pop(idx)
             page.update()
 
-    def salvar_pedido(e):
+    async def salvar_pedido(e):
         if not clientes_lista_dd.value or not itens_pedido:
             return
 
-        sucesso, msg, pedido_id = inserir_pedido(int(clientes_lista_dd.value))
-        if sucesso:
-            for item in itens_pedido:
-                adicionar_item_pedido(
-                    pedido_id, item["marca_id"], item["qtd"], item["preco"]
+        # Botão desabilitado até gravar: evita salvar o mesmo pedido duas vezes
+        e.control.disabled = True
+        try:
+            async with carregando(page, indicador):
+                # Cópia: a lista pode mudar na tela enquanto o pedido é gravado
+                sucesso, msg, _ = await bd.inserir_pedido_completo(
+                    int(clientes_lista_dd.value), [dict(item) for item in itens_pedido]
                 )
-
-            pedido_itens.controls.clear()
-            itens_pedido.clear()
-            total_atual[0] = 0
-            total_texto.value = "Total: R$ 0,00"
-            clientes_lista_dd.value = ""
-            atualizar_clientes_dd()
+        finally:
+            e.control.disabled = False
+        if not sucesso:
+            page.snack_bar = ft.SnackBar(ft.Text(f"❌ {msg}"))
+            page.snack_bar.open = True
             page.update()
+            return
+
+        pedido_itens.controls.clear()
+        itens_pedido.clear()
+        total_atual[0] = 0
+        total_texto.value = "Total: R$ 0,00"
+        clientes_lista_dd.value = ""
+        page.update()
 
     tela = ft.Column(
         [
@@ -157,6 +259,9 @@ def criar_tela_pedidos(page):
                     content=ft.Column(
                         [
                             clientes_lista_dd,
+                            codigo_campo,
+                            busca_campo,
+                            busca_resultados,
                             ft.Row([produtos_dd, marcas_dd], wrap=True),
                             ft.Row([qtd_ped, obs_ped], wrap=True),
                             ft.ElevatedButton(
@@ -176,6 +281,7 @@ def criar_tela_pedidos(page):
             ft.Text("Itens do Pedido", size=16, weight="bold", color=COR_PRIMARIA),
             ft.Container(content=pedido_itens, expand=True, height=300),
             total_texto,
+            indicador,
             ft.ElevatedButton(
                 "💾 Salvar Pedido",
                 on_click=salvar_pedido,
@@ -190,4 +296,95 @@ def criar_tela_pedidos(page):
         scroll="auto",
     )
 
+    def inserir_opcao(dropdown, chave_ordem, opcao):
+        """Insere a opção mantendo a ordem do dropdown"""
+        chaves = [chave_ordem(o.text) for o in dropdown.options]
+        indice = bisect.bisect_right(chaves, chave_ordem(opcao.text))
+        dropdown.options.insert(indice, opcao)
+
+    async def ao_alterar_clientes(alteracao):
+        if alteracao.acao not in (INSERCAO, ATUALIZACAO, REMOCAO):
+            await atualizar_clientes_dd()
+            return
+        # O dropdown só mostra o nome: a conta corrente de cada pedido e
+        # pagamento não muda nada aqui
+        if not altera_campos(alteracao, ("nome",)):
+            return
+        for cliente_id in alteracao.ids:
+            cliente = None
+            if alteracao.acao != REMOCAO:
+                cliente = await bd.obter_cliente(cliente_id)
+            # Procurada depois da consulta: outro evento pode ter mexido na lista
+            chave = str(cliente_id)
+            existente = next(
+                (o for o in clientes_lista_dd.options if o.key == chave), None
+            )
+            if existente is not None and (
+                cliente is None or existente.text != cliente["nome"]
+            ):
+                clientes_lista_dd.options.remove(existente)
+                existente = None
+            if cliente is None and clientes_lista_dd.value == chave:
+                clientes_lista_dd.value = None
+            if cliente is not None and existente is None:
+                # Mesma ordem de listar_clientes (nome)
+                inserir_opcao(
+                    clientes_lista_dd, str, ft.dropdown.Option(chave, cliente["nome"])
+                )
+        page.update()
+
+    async def ao_alterar_produtos(alteracao):
+        if alteracao.acao not in (INSERCAO, ATUALIZACAO, REMOCAO):
+            await atualizar_produtos_dd()
+            await atualizar_marcas_dd()
+            return
+        # O dropdown só mostra o nome: os totais recalculados a cada venda ou
+        # ajuste de estoque não mudam nada aqui
+        if not altera_campos(alteracao, ("nome",)):
+            return
+        for produto_id in alteracao.ids:
+            prod = None
+            if alteracao.acao != REMOCAO:
+                prod = await bd.obter_produto(produto_id)
+            chave = str(produto_id)
+            existente = next((o for o in produtos_dd.options if o.key == chave), None)
+            if existente is not None and (prod is None or existente.text != prod["nome"]):
+                produtos_dd.options.remove(existente)
+                existente = None
+            if prod is not None and existente is None:
+                # Mesma ordem de listar_produtos (nome COLLATE NOCASE)
+                inserir_opcao(
+                    produtos_dd, str.lower, ft.dropdown.Option(chave, prod["nome"])
+                )
+            if prod is None and produtos_dd.value == chave:
+                produtos_dd.value = None
+                await atualizar_marcas_dd()
+        page.update()
+
+    async def ao_alterar_marcas(alteracao):
+        if not produtos_dd.value:
+            return
+        if alteracao.acao in (ATUALIZACAO, REMOCAO):
+            # Só nome e preço aparecem no dropdown (o estoque muda a cada venda)
+            if not altera_campos(alteracao, ("marca", "preco_unitario", "produto_id")):
+                return
+            # Uma marca trocada de produto pode passar para o selecionado
+            outras = marcas_atuais.keys().isdisjoint(alteracao.ids)
+            if outras and not altera_campos(alteracao, ("produto_id",)):
+                return
+        await atualizar_marcas_dd()
+
+    # O commit chega numa thread do banco: o tratamento roda no loop da interface
+    assinar("clientes", lambda alteracao: page.run_task(ao_alterar_clientes, alteracao))
+    assinar("produtos", lambda alteracao: page.run_task(ao_alterar_produtos, alteracao))
+    assinar(
+        "produto_marcas", lambda alteracao: page.run_task(ao_alterar_marcas, alteracao)
+    )
+
+    async def atualizar():
+        await atualizar_clientes_dd()
+        await atualizar_produtos_dd()
+        await atualizar_marcas_dd()
+
+    tela.atualizar = lambda: page.run_task(atualizar)
     return tela
@@ -2,66 +2,237 @@
 Tela de Registro de Vendas
 """
 import flet as ft
-from database import listar_vendas
-from ui.componentes import COR_PRIMARIA
+from banco_assincrono import bd
+from database import INSERCAO, REMOCAO, assinar
+from datas import para_br
+from ui.componentes import COR_PRIMARIA, carregando, criar_indicador_carregamento
+
+# Paginação da lista: só a janela visível + buffer fica em memória
+TAMANHO_PAGINA = 50
+PAGINAS_MAX = 4
+ALTURA_ITEM = 100
+LIMIAR_ROLAGEM = 300
+
 
 def criar_tela_vendas(page):
     """Tela para visualizar histórico de vendas"""
 
-    vendas_lista = ft.ListView(spacing=10, expand=True)
+    vendas_lista = ft.ListView(spacing=0, expand=True, scroll_interval=100)
+    indicador = criar_indicador_carregamento()
 
-    def atualizar_vendas():
-        vendas_lista.controls.clear()
-        vendas = listar_vendas()
+    # Espaço reservado para as páginas descartadas acima da janela,
+    # mantém a posição da rolagem sem manter os controles em memória
+    espaco_acima = ft.Container(height=0)
 
-        if not vendas:
-            vendas_lista.controls.append(
-                ft.Text("Nenhuma venda registrada", color=ft.Colors.GREY_700)
-            )
-        else:
-            for venda in vendas:
-                vendas_lista.controls.append(
-                    ft.Container(
-                        content=ft.Row(
+    # descartadas: ids das vendas de cada página acima da janela (topo primeiro)
+    estado = {
+        "paginas": [],
+        "descartadas": [],
+        "fim": False,
+    }
+
+    def criar_item(venda):
+        return ft.Container(
+            content=ft.Container(
+                content=ft.Row(
+                    [
+                        ft.Column(
                             [
-                                ft.Column(
-                                    [
-                                        ft.Text(
-                                            f"{venda['nome']} - {venda['marca']}",
-                                            weight="bold",
-                                        ),
-                                        ft.Text(
-                                            f"Cliente: {venda['cliente']}",
-                                            size=11,
-                                            color=ft.Colors.GREY_700,
-                                        ),
-                                        ft.Text(
-                                            f"Entrada: {venda['data_cadastro']} | Quantidade: {venda['quantidade']} un",
-                                            size=10,
-                                            color=ft.Colors.GREY_700,
-                                        ),
-                                        ft.Text(
-                                            f"Subtotal: R$ {venda['subtotal']:.2f}",
-                                            weight="bold",
-                                            color=COR_PRIMARIA,
-                                        ),
-                                    ],
-                                    spacing=3,
-                                    expand=True,
+                                ft.Text(
+                                    f"{venda['nome']} - {venda['marca']}",
+                                    weight="bold",
+                                ),
+                                ft.Text(
+                                    f"Cliente: {venda['cliente']}",
+                                    size=11,
+                                    color=ft.Colors.GREY_700,
+                                ),
+                                ft.Text(
+                                    f"Entrada: {para_br(venda['data_cadastro'])} | Quantidade: {venda['quantidade']} un",
+                                    size=10,
+                                    color=ft.Colors.GREY_700,
+                                ),
+                                ft.Text(
+                                    f"Subtotal: R$ {venda['subtotal']:.2f}",
+                                    weight="bold",
+                                    color=COR_PRIMARIA,
                                 ),
                             ],
-                            alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                            spacing=3,
+                            expand=True,
                         ),
-                        border=ft.border.all(1, ft.Colors.GREY_300),
-                        border_radius=8,
-                        padding=10,
-                        bgcolor=ft.Colors.WHITE,
-                    )
-                )
+                    ],
+                    alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                ),
+                border=ft.border.all(1, ft.Colors.GREY_300),
+                border_radius=8,
+                padding=10,
+                bgcolor=ft.Colors.WHITE,
+            ),
+            height=ALTURA_ITEM,
+            padding=ft.padding.only(bottom=10),
+        )
+
+    def chave(venda):
+        return (venda["data_hora"], venda["id"])
+
+    def ajustar_espaco_acima():
+        descartadas = sum(len(ids) for ids in estado["descartadas"])
+        espaco_acima.height = descartadas * ALTURA_ITEM
+
+    async def carregar_proxima():
+        """Busca a próxima página abaixo da janela"""
+        paginas = estado["paginas"]
+        if estado["fim"]:
+            return
+        apos = chave(paginas[-1][-1]) if paginas else None
+        async with carregando(page, indicador):
+            vendas = await bd.listar_vendas_pagina(
+                TAMANHO_PAGINA, apos=apos, chave="vendas.proxima"
+            )
+        # A janela mudou durante a consulta (recarga ou remoção): descarta
+        if paginas is not estado["paginas"] or apos != (
+            chave(paginas[-1][-1]) if paginas else None
+        ):
+            return
+        if len(vendas) < TAMANHO_PAGINA:
+            estado["fim"] = True
+        if not vendas:
+            return
+
+        paginas.append(vendas)
+        vendas_lista.controls.extend(criar_item(v) for v in vendas)
+
+        # Descarta a página do topo quando a janela passa do limite
+        if len(paginas) > PAGINAS_MAX:
+            topo = paginas.pop(0)
+            del vendas_lista.controls[1 : 1 + len(topo)]
+            estado["descartadas"].append([venda["id"] for venda in topo])
+            ajustar_espaco_acima()
+
+    async def carregar_anterior():
+        """Recarrega a página descartada logo acima da janela"""
+        paginas = estado["paginas"]
+        descartadas = estado["descartadas"]
+        if not descartadas or not paginas:
+            return
+        ids = descartadas[-1]
+        quantidade = len(ids)
+        antes = chave(paginas[0][0])
+        async with carregando(page, indicador):
+            vendas = await bd.listar_vendas_pagina(
+                quantidade, antes=antes, chave="vendas.anterior"
+            )
+        # Só consome a página descartada se a janela ainda é a mesma da consulta
+        if (
+            paginas is not estado["paginas"]
+            or not paginas
+            or chave(paginas[0][0]) != antes
+            or not descartadas
+            or descartadas[-1] is not ids
+            or len(ids) != quantidade
+        ):
+            return
+        descartadas.pop()
+        ajustar_espaco_acima()
+
+        paginas.insert(0, vendas)
+        vendas_lista.controls[1:1] = [criar_item(v) for v in vendas]
+
+        # Descarta a página do fim; ela é buscada de novo ao rolar para baixo
+        if len(paginas) > PAGINAS_MAX:
+            fundo = paginas.pop()
+            del vendas_lista.controls[-len(fundo) :]
+            estado["fim"] = False
+
+    async def ao_rolar(e):
+        # Eventos de rolagem chegam em rajadas: só a última página pedida vale
+        if e.pixels >= e.max_scroll_extent - LIMIAR_ROLAGEM:
+            if not estado["fim"]:
+                await carregar_proxima()
+                page.update()
+        elif estado["descartadas"] and e.pixels <= espaco_acima.height + LIMIAR_ROLAGEM:
+            await carregar_anterior()
+            page.update()
+
+    vendas_lista.on_scroll = ao_rolar
+
+    async def atualizar_vendas():
+        estado["paginas"] = []
+        estado["descartadas"] = []
+        estado["fim"] = False
+        espaco_acima.height = 0
+        vendas_lista.controls.clear()
+        vendas_lista.controls.append(espaco_acima)
+
+        await carregar_proxima()
+        if not estado["paginas"]:
+            vendas_lista.controls.append(
+                ft.Text("Nenhuma venda registrada", color=ft.Colors.GREY_700)
+            )
 
         page.update()
 
-    atualizar_vendas()
+    async def incluir_novas(ids):
+        """Põe no topo as vendas registradas depois da primeira exibida"""
+        paginas = estado["paginas"]
+        if estado["descartadas"]:
+            # Topo fora da janela: as novas vendas ficam no espaço reservado
+            estado["descartadas"][0][:0] = ids
+            ajustar_espaco_acima()
+            return
+        antes = chave(paginas[0][0])
+        vendas = await bd.listar_vendas_pagina(len(ids), antes=antes)
+        if paginas is not estado["paginas"]:
+            # Recarregada durante a consulta: já traz as vendas novas
+            return
+        if not paginas or chave(paginas[0][0]) != antes or estado["descartadas"]:
+            # O topo mudou durante a consulta: recarrega do início
+            await atualizar_vendas()
+            return
+        paginas[0][:0] = vendas
+        vendas_lista.controls[1:1] = [criar_item(v) for v in vendas]
+
+    def remover_vendas(ids):
+        """Retira as vendas removidas da janela e das páginas descartadas"""
+        ids = set(ids)
+        # Sem isso a página descartada seria buscada de novo com o tamanho
+        # antigo e traria vendas de fora dela
+        for pagina in estado["descartadas"]:
+            pagina[:] = [venda_id for venda_id in pagina if venda_id not in ids]
+        estado["descartadas"][:] = [
+            pagina for pagina in estado["descartadas"] if pagina
+        ]
+        ajustar_espaco_acima()
+
+        inicio = 1
+        for pagina in estado["paginas"]:
+            for indice in range(len(pagina) - 1, -1, -1):
+                if pagina[indice]["id"] in ids:
+                    del pagina[indice]
+                    del vendas_lista.controls[inicio + indice]
+            inicio += len(pagina)
+        estado["paginas"][:] = [pagina for pagina in estado["paginas"] if pagina]
+        if not estado["paginas"] and estado["descartadas"]:
+            page.run_task(atualizar_vendas)
+
+    async def ao_alterar_itens(alteracao):
+        if not estado["paginas"]:
+            await atualizar_vendas()
+            return
+        if alteracao.acao == INSERCAO:
+            await incluir_novas(list(alteracao.ids))
+        elif alteracao.acao == REMOCAO:
+            remover_vendas(alteracao.ids)
+        else:
+            await atualizar_vendas()
+            return
+        page.update()
+
+    # O commit chega numa thread do banco: o tratamento roda no loop da interface
+    assinar("pedido_itens", lambda alteracao: page.run_task(ao_alterar_itens, alteracao))
+
+    page.run_task(atualizar_vendas)
 
     tela = ft.Column(
         [
@@ -69,6 +240,7 @@ def criar_tela_vendas(page):
                 "📊 Registro de Vendas", size=22, weight="bold", color=COR_PRIMARIA
             ),
             ft.Divider(),
+            indicador,
             ft.Container(content=vendas_lista, expand=True, height=500),
         ],
         spacing=15,
@@ -76,4 +248,5 @@ def criar_tela_vendas(page):
         scroll="auto",
     )
 
+    tela.atualizar = lambda: page.run_task(atualizar_vendas)
     return tela